@@ -0,0 +1,134 @@
+# api/client.py
+
+import threading
+import time
+
+import requests
+import streamlit as st
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from core.config import (
+    API_BASE,
+    API_POOL_SIZE,
+    API_CONNECT_TIMEOUT,
+    API_READ_TIMEOUT,
+    API_MAX_RETRIES,
+    API_RETRY_BACKOFF,
+)
+from core.metrics import record_request
+from api.response_cache import ResponseCache
+
+# 只有冪等方法會自動重試，POST（上傳 / 送出）不重試以免重複寫入
+IDEMPOTENT_METHODS = frozenset(["GET", "HEAD", "OPTIONS", "PUT", "DELETE"])
+RETRY_STATUS = (429, 502, 503, 504)
+
+
+def _session_token():
+    """從 st.session_state 取出 access_token；背景執行緒中取不到時回傳 None"""
+    try:
+        return st.session_state.get("access_token")
+    except Exception:
+        return None
+
+
+class ApiClient:
+    """共用的後端 HTTP client：keep-alive 連線池、逾時、冪等重試與自動帶入 token"""
+
+    def __init__(self, base_url=API_BASE, pool_size=API_POOL_SIZE,
+                 timeout=(API_CONNECT_TIMEOUT, API_READ_TIMEOUT),
+                 max_retries=API_MAX_RETRIES, backoff=API_RETRY_BACKOFF):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.cache = ResponseCache()
+
+        retry = Retry(
+            total=max_retries,
+            backoff_factor=backoff,
+            status_forcelist=RETRY_STATUS,
+            allowed_methods=IDEMPOTENT_METHODS,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def url(self, path):
+        return f"{self.base_url}/{path.lstrip('/')}"
+
+    def request(self, method, path, token=None, auth=True, headers=None, **kwargs):
+        """送出請求並回傳 requests.Response
+
+        token 未指定時會從 st.session_state 取用；在背景執行緒呼叫時請明確傳入 token。
+        每次呼叫的耗時、狀態碼與傳輸位元組都會記錄到 core.metrics。
+        """
+        headers = dict(headers or {})
+        if auth:
+            token = token or _session_token()
+            if token:
+                headers.setdefault("Authorization", f"Bearer {token}")
+        kwargs.setdefault("timeout", self.timeout)
+
+        start = time.perf_counter()
+        try:
+            res = self.session.request(method, self.url(path), headers=headers, **kwargs)
+        except requests.RequestException:
+            record_request(method, path, time.perf_counter() - start)
+            raise
+        body = res.request.body
+        record_request(
+            method, path, time.perf_counter() - start, res.status_code,
+            len(body) if isinstance(body, (bytes, str)) else 0,
+            len(res.content),
+        )
+        return res
+
+    def get_json(self, path, scope, params=None, **kwargs):
+        """GET 並快取 JSON 回應，回傳 (status_code, data)；失敗時 data 為 None
+
+        scope 為使用者 / 租戶識別（例如 "users:alice"），會成為快取 key 的一部分。
+        已快取且有 ETag / Last-Modified 時送出條件式請求，304 直接回傳快取內容。
+        """
+        key = self.cache.key(scope, path, params)
+        entry, fresh = self.cache.lookup(key)
+        if fresh:
+            return 200, entry["data"]
+
+        headers = {**(kwargs.pop("headers", None) or {}), **self.cache.conditional_headers(entry)}
+        res = self.request("GET", path, params=params, headers=headers, **kwargs)
+        if res.status_code == 304 and entry is not None:
+            self.cache.not_modified(key)
+            return 200, entry["data"]
+        if res.status_code != 200:
+            return res.status_code, None
+        data = res.json()
+        self.cache.store(key, res, data)
+        return 200, data
+
+    def get(self, path, **kwargs):
+        return self.request("GET", path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request("POST", path, **kwargs)
+
+    def put(self, path, **kwargs):
+        return self.request("PUT", path, **kwargs)
+
+    def delete(self, path, **kwargs):
+        return self.request("DELETE", path, **kwargs)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """取得整個 process 共用的 ApiClient（Streamlit rerun 之間也會沿用同一個連線池）"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = ApiClient()
+    return _client
@@ -0,0 +1,247 @@
+# api/limiter.py
+
+import threading
+import time
+
+import requests
+
+from core.config import (
+    OCR_CONCURRENCY,
+    OCR_POOL_SIZE,
+    OCR_LATENCY_TARGET,
+    WHISPER_SEGMENT_CONCURRENCY,
+    WHISPER_LATENCY_TARGET,
+    LIMITER_BACKOFF,
+    LIMITER_ACQUIRE_TIMEOUT,
+    BREAKER_FAILURE_THRESHOLD,
+    BREAKER_OPEN_SECONDS,
+    BREAKER_HALF_OPEN_PROBES,
+)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+OK = "ok"
+SLOW = "slow"
+OVERLOAD = "overload"
+ERROR = "error"
+NEUTRAL = "neutral"
+
+# 代表後端過載的狀態碼：降低併發上限並計入斷路器
+OVERLOAD_STATUS = frozenset([429, 502, 503, 504])
+
+
+class BackendUnavailable(Exception):
+    """斷路器開啟中，或在時限內等不到可用的併發名額"""
+
+
+def classify(status_code):
+    """把回應狀態碼分成 OK / OVERLOAD / ERROR / NEUTRAL
+
+    4xx（429 以外）是請求本身的問題（401、413 等）：不算後端失敗，但也不代表後端還有餘裕，
+    不會讓上限增加。
+    """
+    if status_code in OVERLOAD_STATUS:
+        return OVERLOAD
+    if status_code >= 500:
+        return ERROR
+    if status_code >= 400:
+        return NEUTRAL
+    return OK
+
+
+class AdaptiveLimiter:
+    """單一後端端點的 AIMD 併發上限與斷路器（整個 process 共用）
+
+    - 在 latency_target 內成功：每累積約 limit 次成功，上限 +1（加法增加）；4xx 不影響上限
+    - 過載（429 / 502 / 503 / 504、逾時、連線錯誤）或回應慢於 latency_target：上限乘以 backoff
+      （乘法減少）；只有在上次調降之後才送出的請求會再觸發調降，同一波失敗只減一次
+    - 連續 failure_threshold 次失敗時斷路器開啟，open_seconds 內直接拒絕；之後進入半開，
+      只放行 half_open_probes 個探測請求，全部成功才關閉，任一失敗就重新開啟
+    """
+
+    def __init__(self, name, initial=8, min_limit=1, max_limit=32, latency_target=10.0,
+                 backoff=LIMITER_BACKOFF, failure_threshold=BREAKER_FAILURE_THRESHOLD,
+                 open_seconds=BREAKER_OPEN_SECONDS, half_open_probes=BREAKER_HALF_OPEN_PROBES,
+                 acquire_timeout=LIMITER_ACQUIRE_TIMEOUT, clock=time.monotonic):
+        self.name = name
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = float(min(self.max_limit, max(self.min_limit, initial)))
+        self.latency_target = latency_target
+        self.backoff = backoff
+        self.failure_threshold = max(1, failure_threshold)
+        self.open_seconds = open_seconds
+        self.half_open_probes = max(1, half_open_probes)
+        self.acquire_timeout = acquire_timeout
+        self._clock = clock
+        self._cond = threading.Condition()
+
+        self.state = CLOSED
+        self.inflight = 0
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        self._probe_successes = 0
+        self._last_decrease = float("-inf")
+
+        self.successes = 0
+        self.failures = 0
+        self.rejected = 0
+        self.decreases = 0
+        self.opens = 0
+
+    def _transition(self, state):
+        self.state = state
+        if state == OPEN:
+            self._opened_at = self._clock()
+            self.opens += 1
+        elif state == HALF_OPEN:
+            self._probes = 0
+            self._probe_successes = 0
+        else:
+            self._consecutive_failures = 0
+        self._cond.notify_all()
+
+    def acquire(self, timeout=None):
+        """取得一個名額，回傳 (開始時間, 是否為探測請求)；斷路器開啟或等待逾時時丟出 BackendUnavailable"""
+        timeout = self.acquire_timeout if timeout is None else timeout
+        deadline = self._clock() + timeout
+        with self._cond:
+            while True:
+                now = self._clock()
+                if self.state == OPEN and now - self._opened_at >= self.open_seconds:
+                    self._transition(HALF_OPEN)
+                if self.state == OPEN:
+                    self.rejected += 1
+                    retry_in = self.open_seconds - (now - self._opened_at)
+                    raise BackendUnavailable(f"{self.name} 暫時無法使用，約 {retry_in:.0f} 秒後再試")
+                if self.state == HALF_OPEN:
+                    if self._probes < self.half_open_probes:
+                        self._probes += 1
+                        self.inflight += 1
+                        return now, True
+                elif self.inflight < int(self.limit):
+                    self.inflight += 1
+                    return now, False
+
+                remaining = deadline - now
+                if remaining <= 0:
+                    self.rejected += 1
+                    raise BackendUnavailable(f"{self.name} 忙碌中（併發上限 {int(self.limit)}），請稍後再試")
+                self._cond.wait(remaining)
+
+    def release(self, started, probe, outcome):
+        """回報一個請求的結果（OK / OVERLOAD / ERROR / NEUTRAL），調整上限與斷路器狀態"""
+        now = self._clock()
+        if outcome == OK and now - started > self.latency_target:
+            outcome = SLOW
+        with self._cond:
+            self.inflight -= 1
+            if outcome in (OK, SLOW, NEUTRAL):
+                # NEUTRAL 代表後端有正常回應：清除連續失敗、可以當作探測成功，但不增加上限
+                if outcome != NEUTRAL:
+                    self.successes += 1
+                self._consecutive_failures = 0
+                if probe and self.state == HALF_OPEN:
+                    self._probe_successes += 1
+                    if self._probe_successes >= self.half_open_probes:
+                        self._transition(CLOSED)
+                elif outcome == OK and self.state == CLOSED:
+                    self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+            else:
+                self.failures += 1
+                self._consecutive_failures += 1
+                if probe and self.state == HALF_OPEN:
+                    self._transition(OPEN)
+                elif self.state == CLOSED and self._consecutive_failures >= self.failure_threshold:
+                    self._transition(OPEN)
+
+            # 嚴格大於：時鐘解析度不足時，同一波請求的 started 可能等於上次調降的時間
+            if outcome in (SLOW, OVERLOAD) and started > self._last_decrease:
+                self.limit = max(self.min_limit, self.limit * self.backoff)
+                self._last_decrease = now
+                self.decreases += 1
+            self._cond.notify_all()
+
+    def call(self, send, timeout=None):
+        """在名額內執行 send()（回傳 requests.Response），依狀態碼、延遲與例外調整上限
+
+        逾時與連線錯誤視為過載，其他例外視為後端錯誤，都會原樣往上丟。
+        """
+        started, probe = self.acquire(timeout)
+        outcome = ERROR
+        try:
+            res = send()
+            outcome = classify(res.status_code)
+            return res
+        except (requests.Timeout, requests.ConnectionError):
+            outcome = OVERLOAD
+            raise
+        finally:
+            self.release(started, probe, outcome)
+
+    def stats(self):
+        with self._cond:
+            state = self.state
+            if state == OPEN and self._clock() - self._opened_at >= self.open_seconds:
+                state = HALF_OPEN
+            return {
+                "endpoint": self.name,
+                "state": state,
+                "limit": int(self.limit),
+                "inflight": self.inflight,
+                "successes": self.successes,
+                "failures": self.failures,
+                "rejected": self.rejected,
+                "decreases": self.decreases,
+                "opens": self.opens,
+            }
+
+
+# 每個端點的預設值：初始上限沿用原本的併發數，上限為共用執行緒池大小
+ENDPOINTS = {
+    "/ocr/": {"initial": OCR_CONCURRENCY, "max_limit": max(OCR_CONCURRENCY, OCR_POOL_SIZE),
+              "latency_target": OCR_LATENCY_TARGET},
+    "/whisper": {"initial": WHISPER_SEGMENT_CONCURRENCY, "max_limit": WHISPER_SEGMENT_CONCURRENCY,
+                 "latency_target": WHISPER_LATENCY_TARGET},
+}
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(path):
+    """取得端點共用的 AdaptiveLimiter（所有 session 與背景執行緒共用）"""
+    with _limiters_lock:
+        limiter = _limiters.get(path)
+        if limiter is None:
+            limiter = _limiters[path] = AdaptiveLimiter(path, **ENDPOINTS.get(path, {}))
+        return limiter
+
+
+def limiter_stats():
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    return [limiter.stats() for limiter in limiters]
+
+
+def prometheus(prefix="card_app"):
+    """併發上限與斷路器狀態的 Prometheus text exposition format"""
+    rows = limiter_stats()
+    lines = []
+    for suffix, key, metric_type in (("limit", "limit", "gauge"), ("inflight", "inflight", "gauge"),
+                                     ("rejected_total", "rejected", "counter"),
+                                     ("limit_decreases_total", "decreases", "counter"),
+                                     ("breaker_opens_total", "opens", "counter")):
+        name = f"{prefix}_backend_{suffix}"
+        lines.append(f"# TYPE {name} {metric_type}")
+        for row in rows:
+            lines.append(f'{name}{{endpoint="{row["endpoint"]}"}} {row[key]}')
+    name = f"{prefix}_backend_breaker_state"
+    lines.append(f"# TYPE {name} gauge")
+    for row in rows:
+        for state in (CLOSED, HALF_OPEN, OPEN):
+            lines.append(f'{name}{{endpoint="{row["endpoint"]}",state="{state}"}} {int(row["state"] == state)}')
+    return "\n".join(lines) + "\n"
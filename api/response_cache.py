@@ -0,0 +1,82 @@
+# api/response_cache.py
+
+import threading
+import time
+from collections import OrderedDict
+
+from core.config import HTTP_CACHE_MAX_ENTRIES, HTTP_CACHE_TTL
+
+
+class ResponseCache:
+    """GET 回應快取，key 為 (scope, path, params)
+
+    scope 是使用者 / 租戶識別，不同帳號不會共用同一份資料。有 ETag / Last-Modified 的
+    回應每次都以 If-None-Match / If-Modified-Since 重新驗證（未變更時後端只回 304）；
+    沒有驗證資訊的回應在 ttl 秒內直接沿用。資料異動後以 invalidate() 明確清除。
+    """
+
+    def __init__(self, max_entries=HTTP_CACHE_MAX_ENTRIES, ttl=HTTP_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0           # 未發出請求
+        self.revalidated = 0    # 304
+
+    @staticmethod
+    def key(scope, path, params=None):
+        return (scope, "/" + path.lstrip("/"), tuple(sorted((params or {}).items())))
+
+    def lookup(self, key):
+        """回傳 (entry, 是否可直接使用)；entry 為 None 代表沒有快取"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None, False
+            self._entries.move_to_end(key)
+            validated = entry["etag"] or entry["last_modified"]
+            fresh = not validated and time.time() - entry["stored"] < self.ttl
+            if fresh:
+                self.hits += 1
+            return entry, fresh
+
+    def conditional_headers(self, entry):
+        headers = {}
+        if entry and entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+        if entry and entry["last_modified"]:
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def store(self, key, res, data):
+        entry = {
+            "etag": res.headers.get("ETag"),
+            "last_modified": res.headers.get("Last-Modified"),
+            "data": data,
+            "stored": time.time(),
+        }
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def not_modified(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry["stored"] = time.time()
+            self.revalidated += 1
+
+    def invalidate(self, scope=None, prefix=None):
+        """清除 scope 完全相同、或 scope 以 prefix 開頭的項目，回傳清除筆數"""
+        with self._lock:
+            victims = [k for k in self._entries
+                       if k[0] == scope or (prefix is not None and k[0].startswith(prefix))]
+            for k in victims:
+                del self._entries[k]
+        return len(victims)
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "not_modified": self.revalidated}
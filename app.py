@@ -1,6 +1,13 @@
+import os
+
+from core.profiler import install_import_profiler
+
+if os.getenv("IMPORT_PROFILE") == "1":
+    install_import_profiler()
+
 import streamlit as st
-import requests
-from core.config import API_BASE
+from api.client import get_client
+from frontend.registry import render_page
 
 st.set_page_config(page_title="名片辨識系統", layout="centered")
 
@@ -21,7 +28,7 @@ if st.session_state["current_page"] == "login":
     with col1:
         if st.button("登入"):
             try:
-                res = requests.post(f"{API_BASE}/login", json={"username": username, "password": password})
+                res = get_client().post("/login", json={"username": username, "password": password}, auth=False)
                 if res.status_code == 200:
                     result = res.json()
                     st.session_state["access_token"] = result["access_token"]
@@ -74,7 +81,7 @@ elif st.session_state["current_page"] == "register":
             "is_admin": is_admin
         }
         try:
-            res = requests.post(f"{API_BASE}/register", json=payload)
+            res = get_client().post("/register", json=payload, auth=False)
             if res.status_code == 200:
                 st.success("✅ 註冊成功，請回到登入頁")
             else:
@@ -100,6 +107,9 @@ elif st.session_state["current_page"] == "home":
         if st.button("👥 帳號管理"):
             st.session_state["current_page"] = "account_manage"
             st.rerun()
+        if st.button("📈 效能監控"):
+            st.session_state["current_page"] = "performance"
+            st.rerun()
         if st.button("➕ 新增名片"):
             st.session_state["current_page"] = "add_card"
             st.rerun()
@@ -119,24 +129,8 @@ elif st.session_state["current_page"] == "home":
             st.rerun()
 
 # ------------------------
-# 各功能導向（延遲載入）
+# 各功能導向（頁面模組只載入一次，每次 rerun 都呼叫 run()）
 # ------------------------
-elif st.session_state["current_page"] == "account_manage":
-    import importlib
-    acc_page = importlib.import_module("frontend.pages.account_manager")
-    acc_page.run()
-
-elif st.session_state["current_page"] == "add_card":
-    import importlib
-    add_page = importlib.import_module("frontend.pages.add_card")
-    add_page.run()
-
-elif st.session_state["current_page"] == "card_list":
-    import importlib
-    card_page = importlib.import_module("frontend.pages.card_list")
-    card_page.run()
-
-elif st.session_state["current_page"] == "change_password":
-    import importlib
-    change_page = importlib.import_module("frontend.pages.change_password")
-    change_page.run()
+elif not render_page(st.session_state["current_page"], st.session_state.get("role", "user")):
+    st.error("❌ 找不到頁面")
+    st.session_state["current_page"] = "home"
@@ -0,0 +1,234 @@
+"""對本機假後端執行端到端 benchmark
+
+每個情境在獨立的子行程中執行（API_BASE 指向 bench.stub_backend，OCR 快取關閉），
+輸出 JSON 供不同版本之間比較：
+
+    ingest    add_card 的流程：背景工作（前處理 + /ocr/）後以 submit_records 送出
+    card_list 名片清單：逐頁讀取 /cards、建立搜尋索引並查詢
+    accounts  帳號管理：diff_users 比對表格後併發 PUT /update_user/{id}
+
+    python -m bench.bench_backend --images 200 --latency 0.2 --error-rate 0.01 > before.json
+"""
+
+import argparse
+import io
+import json
+import multiprocessing
+import os
+import queue as queue_module
+import resource
+import sys
+import time
+import zipfile
+
+from bench.stub_backend import StubBackend
+
+
+def _peak_mb():
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def _endpoint_stats(*names):
+    """從 core.metrics 取出指定端點的 p50 / p95 / 錯誤率"""
+    from core.metrics import get_metrics
+
+    rows = {row["name"]: row for row in get_metrics().summary()}
+    return {
+        name: {key: rows[name][key] for key in ("count", "p50_ms", "p95_ms", "p99_ms", "error_rate")}
+        for name in names if name in rows
+    }
+
+
+def synthetic_images(n, width=2400, height=1400, as_zip=False):
+    """產生 n 張雜訊 JPEG（內容各不相同，不會被雜湊去重），回傳 [(filename, bytes)]"""
+    from PIL import Image
+
+    images = []
+    for i in range(n):
+        img = Image.effect_noise((width, height), 40 + i % 50).convert("RGB")
+        out = io.BytesIO()
+        img.save(out, format="JPEG", quality=90)
+        images.append((f"card_{i:04d}.jpg", out.getvalue()))
+    if not as_zip:
+        return images
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_STORED) as zf:
+        for name, data in images:
+            zf.writestr(name, data)
+    return [("cards.zip", buf.getvalue())]
+
+
+def scenario_ingest(args):
+    from services.batch_submit import submit_records
+    from services.job_scheduler import get_scheduler, DONE
+    from services.ocr_jobs import make_ocr_upload_job
+    from services.upload_ledger import content_hash
+
+    uploads = synthetic_images(args.images, as_zip=args.zip)
+    files = [(name, data, content_hash(data)) for name, data in uploads]
+    token = "stub-bench"
+
+    start = time.perf_counter()
+    job = get_scheduler().submit("bench", make_ocr_upload_job(files, frozenset(), token),
+                                 kind="ocr", payload_bytes=sum(len(d) for _, d, _ in files))
+    while not job.finished:
+        time.sleep(0.05)
+    ocr_elapsed = time.perf_counter() - start
+    if job.status != DONE:
+        return {"error": job.error or job.status}
+
+    records = [result for _, _, _, result, error in job.result["outcomes"] if result is not None]
+    report = submit_records(records, uid=1, token=token)
+    elapsed = time.perf_counter() - start
+
+    return {
+        "files": args.images,
+        "recognized": len(records),
+        "submitted": report.success,
+        "ocr_seconds": round(ocr_elapsed, 2),
+        "files_per_sec": round(args.images / ocr_elapsed, 2) if ocr_elapsed else 0.0,
+        "submit_records_per_sec": round(report.records_per_sec, 2),
+        "total_seconds": round(elapsed, 2),
+        "summary": job.result["summary"],
+        "endpoints": _endpoint_stats("POST /ocr/", "POST /ocr", "POST /ocr/bulk"),
+    }
+
+
+def scenario_card_list(args):
+    from services.card_service import fetch_card_page, iter_all_cards, search_cards
+
+    token = "stub-bench"
+    start = time.perf_counter()
+    pages = 0
+    for page in range(args.pages):
+        result = fetch_card_page("admin", "admin", page=page, token=token)
+        pages += 1
+        if not result["has_more"]:
+            break
+    paging = time.perf_counter() - start
+
+    start = time.perf_counter()
+    total = sum(1 for _ in iter_all_cards("user", "user1", token=token))
+    hits = len(search_cards("user", "user1", "業務", token=token))
+    search = time.perf_counter() - start
+
+    return {
+        "pages": pages,
+        "pages_per_sec": round(pages / paging, 2) if paging else 0.0,
+        "user_cards": total,
+        "search_hits": hits,
+        "index_and_search_seconds": round(search, 2),
+        "endpoints": _endpoint_stats("GET /cards"),
+    }
+
+
+def scenario_accounts(args):
+    import pandas as pd
+
+    from api.client import get_client
+    from services.user_service import diff_users, build_update_payloads, update_users
+
+    token = "stub-bench"
+    users = get_client().get("/users", token=token).json()
+    original = pd.DataFrame([{
+        "ID": u["id"],
+        "使用者帳號": u["username"],
+        "是否為管理員": bool(u.get("is_admin")),
+        "使用者狀況": "啟用" if u.get("is_active") else "停用",
+        "備註": u.get("note", ""),
+    } for u in users])
+    edited = original.copy()
+    edited.loc[: args.edits - 1, "備註"] = "bench"
+
+    start = time.perf_counter()
+    updates = build_update_payloads(diff_users(original, edited))
+    outcomes = update_users(updates, token=token)
+    elapsed = time.perf_counter() - start
+
+    return {
+        "users": len(users),
+        "updates": len(updates),
+        "succeeded": sum(1 for _, ok, _ in outcomes if ok),
+        "seconds": round(elapsed, 2),
+        "endpoints": _endpoint_stats("GET /users", "PUT /update_user/{id}"),
+    }
+
+
+SCENARIOS = {
+    "ingest": scenario_ingest,
+    "card_list": scenario_card_list,
+    "accounts": scenario_accounts,
+}
+
+
+def _run(name, url, args, queue):
+    # 必須在 import core.config 之前設定
+    os.environ["API_BASE"] = url
+    os.environ["OCR_CACHE_ENABLED"] = "0"
+    before = _peak_mb()
+    try:
+        result = SCENARIOS[name](args)
+    except Exception as e:
+        result = {"error": f"{type(e).__name__}: {e}"}
+    finally:
+        # 前處理的 process pool 不關閉時，子行程結束時會一直等它的 worker
+        preprocess = sys.modules.get("services.image_preprocess")
+        if preprocess is not None:
+            preprocess.shutdown_pool()
+    result["peak_rss_mb"] = _peak_mb()
+    result["peak_rss_growth_mb"] = round(result["peak_rss_mb"] - before, 1)
+    queue.put((name, result))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), action="append",
+                        help="只執行指定情境，可重複指定；預設全部")
+    parser.add_argument("--images", type=int, default=100, help="ingest 的圖片張數")
+    parser.add_argument("--zip", action="store_true", help="ingest 時把圖片包成一個 ZIP 上傳")
+    parser.add_argument("--pages", type=int, default=20, help="card_list 讀取的頁數上限")
+    parser.add_argument("--edits", type=int, default=20, help="accounts 修改的使用者數")
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--jitter", type=float, default=0.02)
+    parser.add_argument("--ocr-latency", type=float, default=0.5, help="/ocr/ 的回應延遲（秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--cards", type=int, default=5000)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--text-size", type=int, default=400)
+    parser.add_argument("--bulk", action="store_true", help="假後端支援 /ocr/bulk")
+    parser.add_argument("--timeout", type=float, default=600.0, help="每個情境的時間上限（秒）")
+    args = parser.parse_args()
+
+    backend = StubBackend(
+        latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+        endpoint_latency={"/ocr/": args.ocr_latency}, cards=args.cards, users=args.users,
+        text_size=args.text_size, bulk=args.bulk
+    )
+    ctx = multiprocessing.get_context("spawn")
+    results = {}
+    with backend as url:
+        for name in args.scenario or list(SCENARIOS):
+            queue = ctx.Queue()
+            proc = ctx.Process(target=_run, args=(name, url, args, queue))
+            proc.start()
+            try:
+                key, result = queue.get(timeout=args.timeout)
+            except queue_module.Empty:
+                key, result = name, {"error": f"情境在 {args.timeout:g} 秒內沒有完成"}
+            proc.join(timeout=30)
+            if proc.is_alive():
+                proc.terminate()
+                proc.join()
+                result.setdefault("error", "子行程沒有正常結束，已強制終止")
+            results[key] = result
+
+    print(json.dumps({
+        "config": {k: v for k, v in vars(args).items() if k != "scenario"},
+        "results": results,
+    }, ensure_ascii=False, indent=2))
+    if any("error" in result for result in results.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
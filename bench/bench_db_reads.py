@@ -0,0 +1,84 @@
+"""比較直接讀 PostgreSQL 與經後端 HTTP API 的讀取延遲，並檢查兩者結果一致
+
+需要可連線的資料庫（本機 PostgreSQL 或測試用副本）與後端 access_token：
+
+    DB_URL=postgresql://localhost/cards python -m bench.bench_db_reads --token <admin access_token> --company acme
+
+輸出 JSON；兩條路徑回傳的名片 / 使用者 id 不一致時以非 0 結束。
+沒有資料庫時可以先以 python -m bench.check_db_reads 檢查送出的 SQL 與退回 HTTP 的路徑。
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+from core.stats import percentile
+
+
+def _timed(func, repeat):
+    latencies = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        latencies.append(time.perf_counter() - start)
+    return result, {
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+    }
+
+
+def main():
+    from api.client import get_client
+    from services.db_reads import get_db_reader
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--token", default=os.getenv("API_TOKEN", ""), help="後端 access_token")
+    parser.add_argument("--company", required=True, help="比較該公司（租戶）的名片與使用者；token 須為該公司的管理員")
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    reader = get_db_reader()
+    if reader is None:
+        raise SystemExit("未設定 DB_URL 或無法連線資料庫")
+    client = get_client()
+    params = {"limit": args.page_size, "offset": 0}
+
+    def http_page():
+        data = client.get("/cards", params=params, token=args.token).json()
+        return data.get("items", data) if isinstance(data, dict) else data
+
+    def http_users():
+        return client.get("/users", token=args.token).json()
+
+    db_page, db_page_stats = _timed(lambda: reader.card_page(args.company, args.page_size)["items"], args.repeat)
+    api_page, api_page_stats = _timed(http_page, args.repeat)
+    db_users, db_users_stats = _timed(lambda: reader.users(args.company), args.repeat)
+    api_users, api_users_stats = _timed(http_users, args.repeat)
+
+    start = time.perf_counter()
+    streamed = sum(1 for _ in reader.iter_cards(args.company))
+    stream_seconds = time.perf_counter() - start
+
+    mismatches = []
+    if sorted(c["id"] for c in db_page) != sorted(c["id"] for c in api_page[:args.page_size]):
+        mismatches.append("card_page")
+    if sorted(u["id"] for u in db_users) != sorted(u["id"] for u in api_users):
+        mismatches.append("users")
+
+    print(json.dumps({
+        "card_page": {"db": db_page_stats, "http": api_page_stats, "rows": len(db_page)},
+        "users": {"db": db_users_stats, "http": api_users_stats, "rows": len(db_users)},
+        "stream": {"rows": streamed, "seconds": round(stream_seconds, 2),
+                   "rows_per_sec": round(streamed / stream_seconds, 1) if stream_seconds else 0.0},
+        "mismatches": mismatches,
+    }, ensure_ascii=False, indent=2))
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""名片匯出的峰值 RSS 量測
+
+每種格式在獨立的子行程中匯出 N 張合成名片（預設 100k），記錄匯出前後的峰值 RSS，
+並與「整份清單載入記憶體再 json.dumps」的舊做法比較。
+
+    python -m bench.bench_export --cards 100000
+"""
+
+import argparse
+import json
+import multiprocessing
+import resource
+import time
+
+from services.export_service import export_cards
+
+
+def synthetic_cards(n):
+    for i in range(n):
+        yield {
+            "id": i,
+            "name": f"測試人員{i}",
+            "company_name": f"範例科技股份有限公司 {i % 500}",
+            "title": "業務經理",
+            "phone": f"09{i:08d}",
+            "email": f"user{i}@example.com",
+            "note": "",
+            "raw_text": "台北市信義區信義路五段7號 " * 4,
+        }
+
+
+def _peak_kb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _run(mode, n, compress, queue):
+    before = _peak_kb()
+    start = time.perf_counter()
+    if mode == "naive":
+        data = json.dumps(list(synthetic_cards(n)), ensure_ascii=False).encode("utf-8")
+        size = len(data)
+    else:
+        out, _, _, _ = export_cards(synthetic_cards(n), mode, compress=compress)
+        out.seek(0, 2)
+        size = out.tell()
+        out.close()
+    queue.put({
+        "mode": mode,
+        "gzip": compress,
+        "seconds": round(time.perf_counter() - start, 2),
+        "output_bytes": size,
+        "peak_rss_growth_mb": round((_peak_kb() - before) / 1024, 1),
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cards", type=int, default=100000)
+    args = parser.parse_args()
+
+    ctx = multiprocessing.get_context("spawn")
+    results = []
+    for mode, compress in (("naive", False), ("jsonl", False), ("csv", False), ("vcf", False), ("jsonl", True)):
+        queue = ctx.Queue()
+        proc = ctx.Process(target=_run, args=(mode, args.cards, compress, queue))
+        proc.start()
+        results.append(queue.get())
+        proc.join()
+
+    print(json.dumps({"cards": args.cards, "results": results}, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""模擬後端劣化，檢查 /ocr/ 的自適應併發上限與斷路器
+
+假後端依序經過四個階段（每段 --phase-seconds 秒），期間持續以 --workers 個執行緒呼叫 ocr_image：
+
+    healthy   容量充足、延遲低
+    degraded  容量變小、延遲變長，超過兩倍容量時回 429
+    outage    全部回 503
+    recovered 恢復正常
+
+adaptive 為預設設定；fixed 關掉調降與斷路器（固定併發，等同加入限制前的行為）作為對照。
+每個模式在獨立的子行程與假後端中執行，輸出 JSON；adaptive 沒有在劣化時降低上限、
+沒有在中斷時開啟斷路器，或恢復後沒有關閉時以非 0 結束。
+
+    python -m bench.bench_limiter --workers 24 --phase-seconds 5
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+
+import requests
+
+from bench.stub_backend import StubBackend
+from core.stats import percentile
+
+PHASES = (
+    ("healthy", {"capacity": 16, "latency": 0.1, "error_rate": 0.0}),
+    ("degraded", {"capacity": 3, "latency": 0.3, "error_rate": 0.0}),
+    ("outage", {"capacity": 16, "latency": 0.1, "error_rate": 1.0, "error_status": 503}),
+    ("recovered", {"capacity": 16, "latency": 0.1, "error_rate": 0.0}),
+)
+
+
+def _mode_env(mode, args):
+    env = {
+        "OCR_CACHE_ENABLED": "0",
+        "API_POOL_SIZE": str(args.workers),
+        "OCR_TIMEOUT": "5",
+        "OCR_LATENCY_TARGET": str(args.latency_target),
+        "LIMITER_ACQUIRE_TIMEOUT": "2",
+        "BREAKER_OPEN_SECONDS": str(args.open_seconds),
+        "OCR_CONCURRENCY": str(args.initial),
+        "OCR_POOL_SIZE": str(args.workers),
+    }
+    if mode == "fixed":
+        env.update({"LIMITER_BACKOFF": "1", "BREAKER_FAILURE_THRESHOLD": str(10 ** 9),
+                    "OCR_CONCURRENCY": str(args.workers)})
+    return env
+
+
+def _simulate(url, args):
+    from api.limiter import get_limiter, BackendUnavailable
+    from services.ocr_pipeline import ocr_image, OcrError
+
+    limiter = get_limiter("/ocr/")
+    phase = [PHASES[0][0]]
+    stop = threading.Event()
+    lock = threading.Lock()
+    stats = {name: {"ok": 0, "fast_fail": 0, "backend_error": 0, "latencies": [], "limits": [], "states": set()}
+             for name, _ in PHASES}
+
+    def worker():
+        while not stop.is_set():
+            start = time.perf_counter()
+            try:
+                ocr_image("bench.jpg", os.urandom(2048), token="stub-bench")
+                outcome = "ok"
+            except OcrError as e:
+                outcome = "fast_fail" if isinstance(e.__cause__, BackendUnavailable) else "backend_error"
+            latency = time.perf_counter() - start
+            with lock:
+                row = stats[phase[0]]
+                row[outcome] += 1
+                if outcome == "ok":
+                    row["latencies"].append(latency)
+            if outcome == "fast_fail":
+                time.sleep(0.05)
+
+    def sampler():
+        while not stop.is_set():
+            snapshot = limiter.stats()
+            with lock:
+                row = stats[phase[0]]
+                row["limits"].append(snapshot["limit"])
+                row["states"].add(snapshot["state"])
+            time.sleep(0.1)
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(args.workers)]
+    threads.append(threading.Thread(target=sampler, daemon=True))
+    for i, (name, config) in enumerate(PHASES):
+        requests.post(f"{url}/_stub/config", json=config, timeout=5)
+        with lock:
+            phase[0] = name
+        if i == 0:
+            for t in threads:
+                t.start()
+        time.sleep(args.phase_seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+
+    report = {}
+    for name, row in stats.items():
+        report[name] = {
+            "ok": row["ok"],
+            "ok_per_sec": round(row["ok"] / args.phase_seconds, 1),
+            "fast_fail": row["fast_fail"],
+            "backend_error": row["backend_error"],
+            "p95_ms": round(percentile(row["latencies"], 95) * 1000, 1),
+            "limit_min": min(row["limits"], default=None),
+            "limit_max": max(row["limits"], default=None),
+            "states": sorted(row["states"]),
+        }
+    report["final"] = limiter.stats()
+    return report
+
+
+def _run(mode, args, queue):
+    # 必須在 import core.config 之前設定
+    os.environ.update(_mode_env(mode, args))
+    with StubBackend(latency=0.1, jitter=0.02, capacity=16) as url:
+        os.environ["API_BASE"] = url
+        try:
+            result = _simulate(url, args)
+        except Exception as e:
+            result = {"error": f"{type(e).__name__}: {e}"}
+    queue.put((mode, result))
+
+
+def _check(report):
+    """adaptive 模式應有的行為，回傳不符合的項目"""
+    problems = []
+    if "error" in report:
+        return [report["error"]]
+    if not report["degraded"]["limit_min"] < report["healthy"]["limit_max"]:
+        problems.append("劣化時併發上限沒有下降")
+    if "open" not in report["outage"]["states"]:
+        problems.append("後端中斷時斷路器沒有開啟")
+    if report["outage"]["fast_fail"] == 0:
+        problems.append("斷路器開啟時沒有快速失敗")
+    if report["final"]["state"] != "closed" or report["recovered"]["ok"] == 0:
+        problems.append("後端恢復後斷路器沒有關閉")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mode", choices=("adaptive", "fixed"), action="append",
+                        help="只執行指定模式，可重複指定；預設兩者")
+    parser.add_argument("--workers", type=int, default=24, help="同時呼叫 ocr_image 的執行緒數")
+    parser.add_argument("--phase-seconds", type=float, default=5.0)
+    parser.add_argument("--initial", type=int, default=8, help="adaptive 的初始併發上限")
+    parser.add_argument("--latency-target", type=float, default=0.5, help="目標延遲（秒）")
+    parser.add_argument("--open-seconds", type=float, default=1.0, help="斷路器開啟秒數")
+    args = parser.parse_args()
+
+    ctx = multiprocessing.get_context("spawn")
+    results = {}
+    for mode in args.mode or ["adaptive", "fixed"]:
+        queue = ctx.Queue()
+        proc = ctx.Process(target=_run, args=(mode, args, queue))
+        proc.start()
+        key, result = queue.get()
+        proc.join()
+        results[key] = result
+
+    problems = _check(results["adaptive"]) if "adaptive" in results else []
+    print(json.dumps({
+        "config": {k: v for k, v in vars(args).items() if k != "mode"},
+        "results": results,
+        "problems": problems,
+    }, ensure_ascii=False, indent=2))
+    if problems:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
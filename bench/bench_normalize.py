@@ -0,0 +1,69 @@
+"""欄位正規化的批次耗時
+
+產生 N 張帶有常見 OCR 問題的合成辨識結果（全形字元、O/0 與 l/1 混淆、缺 @、fields 為空），
+量測 normalize_batch 處理整批的耗時與需要人工確認的欄位數。
+
+    python -m bench.bench_normalize --cards 1000 --repeat 20
+"""
+
+import argparse
+import copy
+import json
+import time
+
+from core.stats import percentile
+from services.field_normalizer import normalize_batch
+
+RAW_TEXT = "範例科技股份有限公司\n業務經理\n王小明\nTEL：０２－２３４５－６７８９ 分機 12\nwang@example.com.tw"
+
+
+def synthetic_results(n):
+    results = []
+    for i in range(n):
+        kind = i % 4
+        if kind == 0:
+            fields = {"name": "王小明", "phone": f"09{i:08d}", "email": f"user{i}@example.com",
+                      "company_name": "範例科技", "title": "經理"}
+        elif kind == 1:
+            fields = {"name": "ＡＬＩＣＥ　ＷＡＮＧ", "phone": f"(０２)２３４５-{i % 10000:04d}",
+                      "email": f"Alice{i}＠Gmai1.c0m", "company_name": "範例科技", "title": "ＰＭ"}
+        elif kind == 2:
+            fields = {"name": "陳大文", "phone": f"O9l2-345-{i % 1000:03d}", "email": f"chen{i}.gmail.com",
+                      "company_name": "範例科技", "title": "工程師"}
+        else:
+            fields = {}
+        results.append({"filename": f"card_{i:05d}.jpg", "raw_text": RAW_TEXT, "fields": fields})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cards", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    template = synthetic_results(args.cards)
+    timings = []
+    for _ in range(args.repeat):
+        batch = copy.deepcopy(template)
+        start = time.perf_counter()
+        normalize_batch(batch)
+        timings.append(time.perf_counter() - start)
+
+    review = {}
+    for result in batch:
+        for key in result["review"]:
+            review[key] = review.get(key, 0) + 1
+    print(json.dumps({
+        "cards": args.cards,
+        "p50_ms": round(percentile(timings, 50) * 1000, 2),
+        "p95_ms": round(percentile(timings, 95) * 1000, 2),
+        "us_per_card": round(percentile(timings, 50) / args.cards * 1e6, 2),
+        "needs_review": sum(1 for result in batch if result["review"]),
+        "review_fields": review,
+        "sample": batch[:4],
+    }, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""影像前處理 benchmark
+
+比較原始圖片與前處理後圖片的上傳大小、/ocr/ 延遲與辨識文字相似度。
+
+    python -m bench.bench_preprocess samples/ --ocr --token <access_token>
+
+不加 --ocr 時只量測前處理本身的耗時與節省的 bytes。
+"""
+
+import argparse
+import difflib
+import json
+import os
+import time
+
+from core.stats import percentile
+from services.image_preprocess import preprocess_image, preprocess_items
+
+IMAGE_EXTS = (".jpg", ".jpeg", ".png")
+
+
+def load_samples(folder):
+    items = []
+    for name in sorted(os.listdir(folder)):
+        if name.lower().endswith(IMAGE_EXTS):
+            with open(os.path.join(folder, name), "rb") as f:
+                items.append((name, f.read()))
+    return items
+
+
+def ocr_text(filename, image_bytes, token):
+    from api.client import get_client
+
+    start = time.perf_counter()
+    res = get_client().post("/ocr/", files={"file": (filename, image_bytes)}, token=token)
+    latency = time.perf_counter() - start
+    text = res.json().get("text", "") if res.status_code == 200 else ""
+    return text, latency
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("folder", help="名片樣本圖片資料夾")
+    parser.add_argument("--ocr", action="store_true", help="同時呼叫後端 /ocr/ 比較延遲與準確度")
+    parser.add_argument("--token", default=os.getenv("API_TOKEN", ""), help="後端 access_token")
+    args = parser.parse_args()
+
+    items = load_samples(args.folder)
+    if not items:
+        raise SystemExit("資料夾內沒有 JPG / PNG 圖片")
+
+    # 單張耗時（單執行緒）與整批 process pool 耗時
+    single = []
+    for _, data in items:
+        start = time.perf_counter()
+        preprocess_image(data)
+        single.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    processed, stats = preprocess_items(items)
+    pool_elapsed = time.perf_counter() - start
+
+    report = {
+        "files": len(items),
+        "original_bytes": stats.original_bytes,
+        "processed_bytes": stats.processed_bytes,
+        "saved_ratio": stats.saved_bytes / stats.original_bytes if stats.original_bytes else 0.0,
+        "preprocess_p50_ms": percentile(single, 50) * 1000,
+        "preprocess_p95_ms": percentile(single, 95) * 1000,
+        "pool_files_per_sec": len(items) / pool_elapsed if pool_elapsed else 0.0,
+    }
+
+    if args.ocr:
+        raw_latency, prep_latency, similarity = [], [], []
+        for (name, original), (_, smaller) in zip(items, processed):
+            raw_text, t_raw = ocr_text(name, original, args.token)
+            prep_text, t_prep = ocr_text(name, smaller, args.token)
+            raw_latency.append(t_raw)
+            prep_latency.append(t_prep)
+            similarity.append(difflib.SequenceMatcher(None, raw_text, prep_text).ratio())
+        report.update({
+            "ocr_raw_p50_ms": percentile(raw_latency, 50) * 1000,
+            "ocr_raw_p95_ms": percentile(raw_latency, 95) * 1000,
+            "ocr_preprocessed_p50_ms": percentile(prep_latency, 50) * 1000,
+            "ocr_preprocessed_p95_ms": percentile(prep_latency, 95) * 1000,
+            "text_similarity_mean": sum(similarity) / len(similarity),
+            "text_similarity_min": min(similarity),
+        })
+
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""本機名片搜尋索引的建立時間與查詢延遲
+
+以 N 張合成名片（預設 100k）建立 CardSearchIndex，每種查詢各跑 --repeat 次（每次先清掉查詢快取），
+量測 search_page 的 p50 / p95。任何查詢的 p95 超過 --budget-ms，或電話 / 總筆數的檢查不符時以非 0 結束。
+
+    python -m bench.bench_search --cards 100000 --budget-ms 50
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+
+from core.stats import percentile
+from services.search_index import CardSearchIndex
+
+SURNAMES = "王李張劉陳楊黃趙吳周徐孫馬朱胡郭何林羅高"
+GIVEN = "小明大文家豪志偉淑芬美玲俊傑雅婷冠宇怡君"
+COMPANIES = ("範例科技股份有限公司", "台灣資訊有限公司", "大同貿易公司", "Acme Trading Co., Ltd.", "Globex Inc.")
+TITLES = ("業務經理", "工程師", "專案經理", "Sales Manager", "總經理")
+
+
+def synthetic_cards(n, seed=1):
+    rng = random.Random(seed)
+    for i in range(n):
+        name = rng.choice(SURNAMES) + rng.choice(GIVEN) + rng.choice(GIVEN)
+        company = f"{rng.choice(COMPANIES)} {i % 997}"
+        yield {
+            "id": i,
+            "name": name,
+            "company_name": company,
+            "title": rng.choice(TITLES),
+            "phone": f"+886-9{i:08d}",
+            "email": f"user{i}@example{i % 50}.com",
+            "raw_text": f"{company}\n{name}\n地址：台北市信義區信義路五段{i % 300}號",
+        }
+
+
+def queries(n):
+    probe = n // 2
+    return {
+        "broad_cjk": "經理",
+        "name": "王小明",
+        "simplified": "王小明 台湾资讯",
+        "company_en": "acme trading",
+        "email": f"user{probe}@",
+        "phone_spaced": f"+886 9{probe // 10000:04d} {probe % 10000:04d}",
+        "phone_digits": f"09{probe:08d}",
+        "miss": "不存在的關鍵字",
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cards", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--budget-ms", type=float, default=50.0, help="每種查詢 p95 的上限")
+    args = parser.parse_args()
+
+    index = CardSearchIndex()
+    start = time.perf_counter()
+    index.add_many(synthetic_cards(args.cards))
+    build_sec = time.perf_counter() - start
+
+    results = {}
+    problems = []
+    for label, query in queries(args.cards).items():
+        timings = []
+        for _ in range(args.repeat):
+            index._cache.clear()
+            start = time.perf_counter()
+            page = index.search_page(query, 0, args.page_size)
+            timings.append(time.perf_counter() - start)
+        p95_ms = percentile(timings, 95) * 1000
+        results[label] = {
+            "query": query,
+            "total": page["total"],
+            "p50_ms": round(percentile(timings, 50) * 1000, 2),
+            "p95_ms": round(p95_ms, 2),
+        }
+        if p95_ms > args.budget_ms:
+            problems.append(f"{label} p95 {p95_ms:.1f} ms 超過 {args.budget_ms} ms")
+
+    probe = args.cards // 2
+    for label in ("phone_spaced", "phone_digits"):
+        if results[label]["total"] != 1:
+            problems.append(f"{label} 應只找到 id {probe}，實際 {results[label]['total']} 筆")
+    if results["broad_cjk"]["total"] <= args.page_size:
+        problems.append("broad_cjk 的 total 應是全部符合的筆數，不是單頁筆數")
+
+    print(json.dumps({
+        "cards": args.cards,
+        "build_sec": round(build_sec, 2),
+        "postings": len(index.postings),
+        "queries": results,
+        "problems": problems,
+    }, ensure_ascii=False, indent=2))
+    if problems:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
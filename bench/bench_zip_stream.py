@@ -0,0 +1,114 @@
+"""ZIP 串流解壓縮的記憶體量測
+
+以合成的大型 ZIP（預設 200 張 × 2MB 不可壓縮圖片）比較：
+- 舊做法：一次讀出所有成員
+- ZipStream + run_ocr_batch：邊解壓縮邊辨識，受 max_inflight_bytes 限制
+
+另外檢查 zip bomb / 巢狀 ZIP / 成員過多會被拒絕。超出預算時以非 0 結束。
+
+    python -m bench.bench_zip_stream --members 200 --member-mb 2 --inflight-mb 16
+"""
+
+import argparse
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import zipfile
+
+from services.ocr_pipeline import run_ocr_batch
+from services.zip_stream import ZipStream, ZipRejected
+
+
+def build_archive(path, members, member_bytes):
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_STORED) as zf:
+        for i in range(members):
+            zf.writestr(f"cards/card_{i:05d}.jpg", os.urandom(member_bytes))
+        zf.writestr("__MACOSX/cards/._card_00000.jpg", b"x")
+        zf.writestr(".DS_Store", b"x")
+
+
+def fake_ocr(filename, image_bytes, token):
+    time.sleep(0.002)
+    return {"filename": filename, "raw_text": "", "fields": {}}
+
+
+def measure(func):
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def check_rejections():
+    cases = {}
+
+    bomb = io.BytesIO()
+    with zipfile.ZipFile(bomb, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("bomb.jpg", b"\0" * (20 * 1024 * 1024))
+    nested = io.BytesIO()
+    with zipfile.ZipFile(nested, "w") as zf:
+        zf.writestr("inner.zip", b"PK")
+    many = io.BytesIO()
+    with zipfile.ZipFile(many, "w") as zf:
+        for i in range(20):
+            zf.writestr(f"{i}.jpg", b"x")
+
+    for name, buf, kwargs in (("zip_bomb", bomb, {}), ("nested_zip", nested, {}), ("too_many", many, {"max_members": 10})):
+        try:
+            ZipStream(buf, **kwargs)
+            cases[name] = False
+        except ZipRejected:
+            cases[name] = True
+    return cases
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--members", type=int, default=200)
+    parser.add_argument("--member-mb", type=float, default=2)
+    parser.add_argument("--inflight-mb", type=float, default=16)
+    args = parser.parse_args()
+
+    member_bytes = int(args.member_mb * 1024 * 1024)
+    inflight = int(args.inflight_mb * 1024 * 1024)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "cards.zip")
+        build_archive(path, args.members, member_bytes)
+
+        def eager():
+            with zipfile.ZipFile(path) as zf:
+                data = [zf.read(n) for n in zf.namelist() if n.lower().endswith(".jpg")]
+            return len(data)
+
+        def streaming():
+            with open(path, "rb") as f, ZipStream(f) as archive:
+                run_ocr_batch(archive, concurrency=8, func=fake_ocr, max_inflight_bytes=inflight)
+
+        eager_peak = measure(eager)
+        stream_peak = measure(streaming)
+
+    # 在途上限 + 一張讀取中的圖片 + 一些額外開銷
+    budget = inflight + 2 * member_bytes + 8 * 1024 * 1024
+    rejections = check_rejections()
+    report = {
+        "members": args.members,
+        "member_bytes": member_bytes,
+        "eager_peak_bytes": eager_peak,
+        "streaming_peak_bytes": stream_peak,
+        "streaming_budget_bytes": budget,
+        "rejections": rejections,
+    }
+    print(json.dumps(report, indent=2))
+
+    if stream_peak > budget or not all(rejections.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+"""不需要資料庫的 db_reads 檢查：以假的 psycopg2 連線池 / cursor 驗證送出的 SQL 與退回 HTTP 的路徑
+
+bench_db_reads 需要可連線的 PostgreSQL；這個腳本在沒有資料庫（也不需安裝 psycopg2）時檢查：
+
+    - 分頁 / 使用者清單在每條連線上只 PREPARE 一次，之後以 EXECUTE 執行，且都帶公司條件
+    - 搜尋字串中的 % _ \\ 已跳脫
+    - 匯出 / 建立索引以 named cursor 串流，itersize 為 DB_FETCH_SIZE
+    - 連線設為唯讀，用完歸還連線池
+    - 資料庫讀取失敗時 iter_all_cards / list_users 改走後端 API，一般使用者完全不碰資料庫
+
+    python -m bench.check_db_reads
+
+輸出 JSON；任何一項不符合時以非 0 結束。
+"""
+
+import json
+import os
+import sys
+import types
+
+COMPANY = "acme"
+CARD_ROWS = [
+    {"id": 3, "name": "王小明", "company_name": "範例科技", "username": "alice"},
+    {"id": 2, "name": "陳大文", "company_name": "範例科技", "username": "bob"},
+]
+USER_ROWS = [{"id": 1, "username": "alice", "company_name": COMPANY}]
+
+
+# --- 假的 psycopg2 ---
+class _Composable:
+    def __init__(self, text):
+        self.text = text
+
+    def __add__(self, other):
+        return _Composable(self.text + other.text)
+
+    def join(self, parts):
+        return _Composable(self.text.join(part.text for part in parts))
+
+    def format(self, **kwargs):
+        return _Composable(self.text.format(**{k: v.text for k, v in kwargs.items()}))
+
+    def as_string(self, conn):
+        return self.text
+
+
+def _identifier(name):
+    return _Composable(f'"{name}"')
+
+
+class _Cursor:
+    def __init__(self, conn, name=None):
+        self.conn = conn
+        self.name = name
+        self.itersize = None
+        self._rows = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=None):
+        text = query.as_string(self.conn) if isinstance(query, _Composable) else query
+        self.conn.log.append({"cursor": self.name, "itersize": self.itersize, "sql": text, "params": params})
+        if self.conn.fail:
+            raise RuntimeError("模擬的資料庫錯誤")
+        if text.startswith("EXECUTE card_page"):
+            self._rows = [dict(row, _total=len(CARD_ROWS)) for row in CARD_ROWS]
+        elif text.startswith("EXECUTE user_list"):
+            self._rows = [dict(row) for row in USER_ROWS]
+        elif self.name:
+            self._rows = [dict(row) for row in CARD_ROWS]
+        else:
+            self._rows = []
+
+    def fetchall(self):
+        return self._rows
+
+    def __iter__(self):
+        return iter(self._rows)
+
+
+class _BaseConnection:
+    instances = []
+
+    def __init__(self, dsn):
+        self.dsn = dsn
+        self.closed = 0
+        self.log = []
+        self.session = {}
+        self.fail = False
+        _BaseConnection.instances.append(self)
+
+    def set_session(self, **kwargs):
+        self.session.update(kwargs)
+
+    def cursor(self, name=None, cursor_factory=None):
+        return _Cursor(self, name)
+
+
+class _Pool:
+    def __init__(self, minconn, maxconn, dsn, connection_factory):
+        self._factory = connection_factory
+        self._dsn = dsn
+        self._idle = []
+        self.out = 0
+
+    def getconn(self):
+        self.out += 1
+        return self._idle.pop() if self._idle else self._factory(self._dsn)
+
+    def putconn(self, conn, close=False):
+        self.out -= 1
+        if not close:
+            self._idle.append(conn)
+
+    def closeall(self):
+        self._idle = []
+
+
+def _install_fake_psycopg2():
+    modules = {name: types.ModuleType(name) for name in
+               ("psycopg2", "psycopg2.sql", "psycopg2.extensions", "psycopg2.pool", "psycopg2.extras")}
+    modules["psycopg2.sql"].SQL = _Composable
+    modules["psycopg2.sql"].Identifier = _identifier
+    modules["psycopg2.extensions"].connection = _BaseConnection
+    modules["psycopg2.pool"].ThreadedConnectionPool = _Pool
+    modules["psycopg2.extras"].RealDictCursor = object
+    for name, module in modules.items():
+        if "." in name:
+            setattr(modules["psycopg2"], name.split(".", 1)[1], module)
+    sys.modules.update(modules)
+
+
+# --- 假的後端 ---
+class _Response:
+    def __init__(self, data, status_code=200):
+        self._data = data
+        self.status_code = status_code
+
+    def json(self):
+        return self._data
+
+
+class _Client:
+    def __init__(self):
+        self.calls = []
+
+    def get(self, path, params=None, token=None):
+        self.calls.append(path)
+        return _Response({"items": [{"id": 9, "name": "HTTP"}], "total": 1})
+
+    def get_json(self, path, scope, params=None, token=None):
+        self.calls.append(path)
+        return 200, [{"id": 9, "username": "http"}]
+
+
+class _Spy:
+    """記錄是否被呼叫；fail=True 時模擬資料庫錯誤"""
+
+    def __init__(self, fail=False):
+        self.calls = []
+        self.fail = fail
+
+    def iter_cards(self, company):
+        self.calls.append(("iter_cards", company))
+        if self.fail:
+            raise RuntimeError("模擬的資料庫錯誤")
+        yield from CARD_ROWS
+
+    def users(self, company):
+        self.calls.append(("users", company))
+        if self.fail:
+            raise RuntimeError("模擬的資料庫錯誤")
+        return USER_ROWS
+
+
+def check_reader(problems):
+    from core.config import DB_FETCH_SIZE
+    from services.db_reads import DbReader
+
+    reader = DbReader(dsn="postgresql://stand-in/cards", minconn=1, maxconn=1)
+    page = reader.card_page(COMPANY, 10, 0, "50%_off")
+    reader.card_page(COMPANY, 10, 10)
+    users = reader.users(COMPANY)
+    streamed = list(reader.iter_cards(COMPANY))
+
+    conn = _BaseConnection.instances[-1]
+    log = conn.log
+    prepares = [entry["sql"] for entry in log if entry["sql"].startswith("PREPARE")]
+    executes = [entry for entry in log if entry["sql"].startswith("EXECUTE")]
+    streams = [entry for entry in log if entry["cursor"]]
+
+    if len(_BaseConnection.instances) != 1 or reader._pool.out != 0:
+        problems.append("連線沒有歸還連線池")
+    if conn.session.get("readonly") is not True:
+        problems.append("連線沒有設為唯讀")
+    if [p.split()[1] for p in prepares] != ["card_page", "user_list"]:
+        problems.append(f"每條連線應只 PREPARE 一次：{prepares}")
+    if not all("company_name = $1" in p for p in prepares):
+        problems.append("PREPARE 的查詢沒有公司條件")
+    if [e["params"][0] for e in executes] != [COMPANY] * 3:
+        problems.append("EXECUTE 沒有帶公司參數")
+    if executes[0]["params"][1] != "%50\\%\\_off%" or executes[1]["params"][1] is not None:
+        problems.append(f"ILIKE 樣式沒有正確跳脫：{executes[0]['params']}")
+    if page["total"] != len(CARD_ROWS) or any("_total" in item for item in page["items"]):
+        problems.append("card_page 沒有移除 _total 欄位")
+    if users != USER_ROWS:
+        problems.append("users 回傳的資料不一致")
+    if len(streams) != 1 or not streams[0]["cursor"].startswith("cards_"):
+        problems.append("iter_cards 沒有使用 named cursor")
+    elif streams[0]["itersize"] != DB_FETCH_SIZE or streams[0]["params"] != {"company": COMPANY}:
+        problems.append(f"named cursor 的 itersize / 參數不正確：{streams[0]}")
+    elif "%(company)s" not in streams[0]["sql"]:
+        problems.append("串流查詢沒有公司條件")
+    if streamed != CARD_ROWS:
+        problems.append("iter_cards 回傳的資料不一致")
+    return {"statements": [entry["sql"].split(" AS ")[0] for entry in log], "itersize": DB_FETCH_SIZE}
+
+
+def check_fallback(problems):
+    from services import card_service, user_service
+
+    client = _Client()
+    card_service.get_client = user_service.get_client = lambda: client
+    broken, untouched = _Spy(fail=True), _Spy()
+
+    card_service.get_db_reader = user_service.get_db_reader = lambda: broken
+    cards = list(card_service.iter_all_cards("admin", "boss", COMPANY))
+    users = user_service.list_users("users:acme:boss", company=COMPANY)
+    if broken.calls != [("iter_cards", COMPANY), ("users", COMPANY)] or cards[0]["name"] != "HTTP" \
+            or users[0]["username"] != "http":
+        problems.append("資料庫讀取失敗時沒有改走後端 API")
+
+    card_service.get_db_reader = user_service.get_db_reader = lambda: untouched
+    list(card_service.iter_all_cards("user", "alice", COMPANY))
+    list(card_service.iter_all_cards("admin", "boss", ""))
+    user_service.list_users("users:acme:alice")
+    if untouched.calls:
+        problems.append(f"一般使用者或沒有公司的範圍讀了資料庫：{untouched.calls}")
+    return {"http_calls": client.calls}
+
+
+def main():
+    _install_fake_psycopg2()
+    os.environ.setdefault("DB_URL", "postgresql://stand-in/cards")
+    problems = []
+    report = {"reader": check_reader(problems), "fallback": check_fallback(problems), "problems": problems}
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    if problems:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+"""以 streamlit.testing.v1.AppTest 模擬多個 session 同時使用 app.py
+
+每個 session：登入 → 首頁 → 新增名片（上傳圖片、等背景辨識完成）→ 名片清單（翻頁、搜尋）。
+所有 session 在同一個行程中交錯執行（與正式環境相同，共用連線池、排程器與快取），
+後端為 bench.stub_backend。依序以不同的 N 執行，記錄：
+
+    - 每個 session 的 st.session_state 大小（遞迴估算）
+    - 行程 RSS
+    - 每次 rerun 耗時的 p50 / p95 / p99
+
+超過預算時以非 0 結束：
+
+    python -m bench.load_sessions --sessions 1,5,10,20 --max-session-mb 20 --max-rss-mb 1500 --max-p95-ms 3000
+
+AppTest 無法操作 st.file_uploader，執行期間會把它換成回傳目前 session 記憶體中的檔案，
+其餘流程（上傳帳本、背景工作、預覽）都走正式程式碼。
+"""
+
+import argparse
+import io
+import json
+import os
+import resource
+import sys
+import time
+from unittest import mock
+
+from bench.stub_backend import StubBackend
+from core.stats import percentile
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+
+
+def deep_sizeof(obj, seen=None):
+    """遞迴估算物件佔用的記憶體（bytes），共用的物件只算一次"""
+    if seen is None:
+        seen = set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(k, seen) + deep_sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_sizeof(item, seen) for item in obj)
+    elif hasattr(obj, "__dict__"):
+        size += deep_sizeof(vars(obj), seen)
+    elif hasattr(obj, "__slots__"):
+        size += sum(deep_sizeof(getattr(obj, name), seen)
+                    for name in obj.__slots__ if hasattr(obj, name))
+    return size
+
+
+def session_state_bytes(at):
+    state = dict(at.session_state.items())
+    seen = set()
+    return sum(deep_sizeof(k, seen) + deep_sizeof(v, seen) for k, v in state.items())
+
+
+def rss_mb():
+    """目前 RSS；沒有 /proc 時以峰值代替"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class _FakeUpload(io.BytesIO):
+    """模擬 st.file_uploader 回傳的 UploadedFile"""
+
+    def __init__(self, name, data, file_id):
+        super().__init__(data)
+        self.name = name
+        self.size = len(data)
+        self.file_id = file_id
+        self.type = "image/jpeg"
+
+
+def synthetic_uploads(session, count, width=1200, height=700):
+    from PIL import Image
+
+    uploads = []
+    for i in range(count):
+        img = Image.effect_noise((width, height), 30 + (session * 7 + i) % 60).convert("RGB")
+        out = io.BytesIO()
+        img.save(out, format="JPEG", quality=85)
+        uploads.append(_FakeUpload(f"s{session}_card_{i:03d}.jpg", out.getvalue(), f"s{session}-{i}"))
+    return uploads
+
+
+# 目前執行中的 session 所上傳的檔案；Session.step() 執行前設定
+_active_uploads = []
+
+
+def _fake_file_uploader(label, type=None, accept_multiple_files=False, **kwargs):
+    """名片上傳框回傳目前 session 的檔案，語音上傳框維持空白"""
+    if type and "zip" in type:
+        return list(_active_uploads)
+    return None
+
+
+class Session:
+    """一個模擬使用者；每個 step 只做一次互動，方便多個 session 交錯執行"""
+
+    def __init__(self, index, images, timeout):
+        from streamlit.testing.v1 import AppTest
+
+        self.index = index
+        self.at = AppTest.from_file(APP, default_timeout=timeout)
+        self.uploads = synthetic_uploads(index, images)
+        self.timings = []
+        self.steps = self._steps()
+        self.error = None
+
+    def _timed(self, action):
+        start = time.perf_counter()
+        action()
+        self.timings.append(time.perf_counter() - start)
+        if self.at.exception:
+            raise RuntimeError(self.at.exception[0].message)
+
+    def _click(self, label):
+        for button in self.at.button:
+            if button.label == label:
+                return lambda: button.click().run()
+        raise RuntimeError(f"找不到按鈕：{label}")
+
+    def _pending_jobs(self):
+        try:
+            return self.at.session_state["ocr_jobs"]
+        except KeyError:
+            return []
+
+    def _steps(self):
+        at = self.at
+        yield self._timed(at.run)
+        at.text_input[0].input(f"user{self.index % 20 + 1}")
+        at.text_input[1].input("bench")
+        yield self._timed(self._click("登入"))
+
+        # 新增名片：上傳後輪詢背景工作直到結果出現在預覽中
+        yield self._timed(self._click("➕ 新增名片"))
+        deadline = time.time() + 120
+        while self._pending_jobs() and time.time() < deadline:
+            time.sleep(0.1)
+            yield self._timed(at.run)
+        yield self._timed(self._click("🔙 返回首頁"))
+
+        # 名片清單：翻頁、搜尋
+        yield self._timed(self._click("📂 名片清單"))
+        for _ in range(3):
+            try:
+                yield self._timed(self._click("下一頁 ➡️"))
+            except RuntimeError:
+                break
+        at.text_input(key="card_query").input("業務")
+        yield self._timed(at.run)
+
+    def step(self):
+        """執行下一個互動；流程結束回傳 False"""
+        _active_uploads[:] = self.uploads
+        try:
+            next(self.steps)
+            return True
+        except StopIteration:
+            return False
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+            return False
+
+
+def run_sessions(n, images, timeout):
+    import streamlit as st
+    from services.result_store import store_usage
+
+    sessions = [Session(i, images, timeout) for i in range(n)]
+    active = list(sessions)
+    start = time.perf_counter()
+    with mock.patch.object(st, "file_uploader", _fake_file_uploader):
+        while active:
+            active = [s for s in active if s.step()]
+    elapsed = time.perf_counter() - start
+
+    timings = [t for s in sessions for t in s.timings]
+    state_sizes = [session_state_bytes(s.at) for s in sessions]
+    return {
+        "sessions": n,
+        "seconds": round(elapsed, 2),
+        "reruns": len(timings),
+        "rerun_p50_ms": round(percentile(timings, 50) * 1000, 1),
+        "rerun_p95_ms": round(percentile(timings, 95) * 1000, 1),
+        "rerun_p99_ms": round(percentile(timings, 99) * 1000, 1),
+        "session_state_avg_mb": round(sum(state_sizes) / n / 1024 / 1024, 2),
+        "session_state_max_mb": round(max(state_sizes) / 1024 / 1024, 2),
+        "rss_mb": round(rss_mb(), 1),
+        "result_store": {k: v for k, v in store_usage().items() if k != "sessions"},
+        "errors": [f"session {s.index}: {s.error}" for s in sessions if s.error],
+    }
+
+
+def check_budget(result, args):
+    failures = []
+    if args.max_session_mb and result["session_state_max_mb"] > args.max_session_mb:
+        failures.append(f"session_state {result['session_state_max_mb']}MB > {args.max_session_mb}MB")
+    if args.max_rss_mb and result["rss_mb"] > args.max_rss_mb:
+        failures.append(f"RSS {result['rss_mb']}MB > {args.max_rss_mb}MB")
+    if args.max_p95_ms and result["rerun_p95_ms"] > args.max_p95_ms:
+        failures.append(f"rerun p95 {result['rerun_p95_ms']}ms > {args.max_p95_ms}ms")
+    if result["errors"]:
+        failures.append(f"{len(result['errors'])} 個 session 發生錯誤")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", default="1,5,10", help="以逗號分隔的 session 數，依序執行")
+    parser.add_argument("--images", type=int, default=5, help="每個 session 上傳的圖片張數")
+    parser.add_argument("--timeout", type=float, default=60, help="單次 rerun 逾時（秒）")
+    parser.add_argument("--latency", type=float, default=0.05, help="假後端的預設延遲（秒）")
+    parser.add_argument("--ocr-latency", type=float, default=0.3, help="假後端 /ocr/ 延遲（秒）")
+    parser.add_argument("--cards", type=int, default=2000)
+    parser.add_argument("--max-session-mb", type=float, default=0, help="單一 session_state 上限，0 代表不檢查")
+    parser.add_argument("--max-rss-mb", type=float, default=0, help="行程 RSS 上限，0 代表不檢查")
+    parser.add_argument("--max-p95-ms", type=float, default=0, help="rerun p95 上限，0 代表不檢查")
+    args = parser.parse_args()
+
+    results = []
+    failures = []
+    with StubBackend(latency=args.latency, endpoint_latency={"/ocr/": args.ocr_latency},
+                     cards=args.cards) as url:
+        # 必須在 app.py 第一次 import core.config 之前設定
+        os.environ["API_BASE"] = url
+        os.environ["OCR_CACHE_ENABLED"] = "0"
+        for n in (int(x) for x in args.sessions.split(",") if x.strip()):
+            result = run_sessions(n, args.images, args.timeout)
+            results.append(result)
+            failures += [f"N={n}：{msg}" for msg in check_budget(result, args)]
+
+    print(json.dumps({
+        "config": vars(args),
+        "results": results,
+        "failures": failures,
+    }, ensure_ascii=False, indent=2))
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,322 @@
+"""本機假後端：模擬 /login、/register、/ocr/、/ocr、/whisper、/cards、/users、/update_user
+
+延遲、錯誤率與回應大小皆可設定，供壓力測試使用，不會打到正式環境的 API_BASE。
+
+    python -m bench.stub_backend --port 8765 --latency 0.05 --error-rate 0.02
+    python -m bench.stub_backend --endpoint-latency /ocr/=0.8 --endpoint-latency /whisper=2
+    python -m bench.stub_backend --capacity 8
+
+--capacity 模擬後端容量：同時處理超過 capacity 個請求時延遲等比例變長，超過兩倍時回 429。
+執行中可以 POST /_stub/config（JSON，例如 {"capacity": 2, "error_rate": 1}）改變設定，模擬後端劣化與恢復。
+
+啟動後會在 stdout 印出一行 JSON：{"url": "http://127.0.0.1:8765"}
+"""
+
+import argparse
+import hashlib
+import itertools
+import json
+import random
+import re
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+_ID_PATH = re.compile(r"^(/[a-z_]+)/(\d+)$")
+
+
+class StubState:
+    """假後端的資料與設定；所有請求執行緒共用"""
+
+    CONFIGURABLE = ("latency", "jitter", "error_rate", "error_status", "endpoint_latency", "capacity")
+
+    def __init__(self, latency=0.05, jitter=0.02, error_rate=0.0, error_status=503,
+                 endpoint_latency=None, cards=1000, users=50, text_size=400, bulk=False, seed=0, capacity=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.endpoint_latency = dict(endpoint_latency or {})
+        self.capacity = capacity
+        self.inflight = 0
+        self.text_size = text_size
+        self.bulk = bulk
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.ids = itertools.count(cards + 1)
+        self.cards = [self._card(i) for i in range(1, cards + 1)]
+        self.users = {
+            i: {"id": i, "username": f"user{i}", "is_admin": i == 1, "is_active": True, "note": ""}
+            for i in range(1, users + 1)
+        }
+
+    def _text(self, seed):
+        line = f"範例科技股份有限公司 業務經理 測試人員{seed} 02-2345-6789 user{seed}@example.com "
+        return (line * (self.text_size // len(line) + 1))[:self.text_size]
+
+    def _card(self, i):
+        return {
+            "id": i,
+            "username": f"user{i % 20 + 1}",
+            "name": f"測試人員{i}",
+            "company_name": f"範例科技 {i % 50}",
+            "title": "業務經理",
+            "phone": f"09{i:08d}",
+            "email": f"user{i}@example.com",
+            "raw_text": self._text(i),
+        }
+
+    def configure(self, values):
+        """執行中修改延遲 / 錯誤率 / 容量，回傳目前設定"""
+        with self.lock:
+            for key in self.CONFIGURABLE:
+                if key in values:
+                    setattr(self, key, dict(values[key]) if key == "endpoint_latency" else values[key])
+            return {key: getattr(self, key) for key in self.CONFIGURABLE}
+
+    def overloaded(self, inflight):
+        return bool(self.capacity) and inflight > self.capacity * 2
+
+    def delay(self, path, inflight=1):
+        base = self.endpoint_latency.get(path, self.latency)
+        if self.capacity:
+            base *= max(1.0, inflight / self.capacity)
+        with self.lock:
+            jitter = self.random.uniform(-self.jitter, self.jitter) if self.jitter else 0.0
+            fail = self.random.random() < self.error_rate
+        time.sleep(max(0.0, base + jitter))
+        return fail
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    state = None
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body):
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        etag = None
+        if self.command == "GET" and status == 200:
+            # 與真實後端相同，GET 回應帶 ETag，內容未變更時回 304
+            etag = '"' + hashlib.md5(data).hexdigest() + '"'
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        if etag:
+            self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _json(self, raw):
+        try:
+            return json.loads(raw or b"{}")
+        except ValueError:
+            return {}
+
+    def _handle(self, method):
+        url = urlparse(self.path)
+        path = url.path
+        raw = self._body()
+        if path == "/_stub/config" and method == "post":
+            return self._send(200, self.state.configure(self._json(raw)))
+        match = _ID_PATH.match(path)
+        route = match.group(1) if match else path
+
+        with self.state.lock:
+            self.state.inflight += 1
+            inflight = self.state.inflight
+        try:
+            if self.state.overloaded(inflight):
+                return self._send(429, {"message": "stub 模擬過載"})
+            if self.state.delay(route, inflight):
+                return self._send(self.state.error_status, {"message": "stub 模擬錯誤"})
+            handler = getattr(self, f"_{method}_{route.lstrip('/').replace('/', '_')}", None)
+            if handler is None:
+                return self._send(404, {"message": "Not Found"})
+            args = (int(match.group(2)),) if match else ()
+            return handler(parse_qs(url.query), raw, *args)
+        finally:
+            with self.state.lock:
+                self.state.inflight -= 1
+
+    def do_GET(self):
+        self._handle("get")
+
+    def do_POST(self):
+        self._handle("post")
+
+    def do_PUT(self):
+        self._handle("put")
+
+    def do_DELETE(self):
+        self._handle("delete")
+
+    # --- 端點 ---
+    def _post_login(self, query, raw):
+        username = self._json(raw).get("username", "")
+        role = "admin" if username.startswith("admin") else "user"
+        self._send(200, {"access_token": f"stub-{username}", "role": role, "company_name": "", "id": 1})
+
+    def _post_register(self, query, raw):
+        self._send(200, {"message": "ok"})
+
+    def _post_ocr_(self, query, raw):
+        seed = len(raw)
+        self._send(200, {
+            "text": self.state._text(seed),
+            "fields": {"name": f"測試人員{seed}", "phone": "0912345678", "email": f"user{seed}@example.com"},
+        })
+
+    def _post_ocr(self, query, raw):
+        with self.state.lock:
+            card_id = next(self.state.ids)
+        self._send(200, {"id": card_id})
+
+    def _post_ocr_bulk(self, query, raw):
+        if not self.state.bulk:
+            return self._send(404, {"message": "Not Found"})
+        records = self._json(raw).get("records", [])
+        with self.state.lock:
+            results = [{"ok": True, "card": {"id": next(self.state.ids)}} for _ in records]
+        self._send(200, {"results": results})
+
+    def _post_whisper(self, query, raw):
+        self._send(200, {"text": self.state._text(len(raw))})
+
+    def _get_cards(self, query, raw):
+        cards = self.state.cards
+        if "username" in query:
+            cards = [c for c in cards if c["username"] == query["username"][0]]
+        if "q" in query:
+            q = query["q"][0]
+            cards = [c for c in cards if q in c["name"] or q in c["company_name"]]
+        offset = int(query.get("offset", ["0"])[0])
+        limit = int(query.get("limit", [str(len(cards))])[0])
+        self._send(200, {"items": cards[offset:offset + limit], "total": len(cards)})
+
+    def _delete_cards(self, query, raw, card_id):
+        with self.state.lock:
+            self.state.cards = [c for c in self.state.cards if c["id"] != card_id]
+        self._send(200, {"message": "deleted"})
+
+    def _get_users(self, query, raw):
+        self._send(200, list(self.state.users.values()))
+
+    _get_get_users = _get_users
+
+    def _put_update_user(self, query, raw, user_id):
+        if user_id not in self.state.users:
+            return self._send(404, {"message": "使用者不存在"})
+        with self.state.lock:
+            self.state.users[user_id].update(self._json(raw))
+        self._send(200, {"message": "updated"})
+
+    def _put_update_password(self, query, raw):
+        self._send(200, {"message": "updated"})
+
+
+def serve(state, host="127.0.0.1", port=0):
+    """在目前行程建立假後端（尚未開始服務），回傳 ThreadingHTTPServer"""
+    handler = type("StubHandler", (_Handler,), {"state": state})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+class StubBackend:
+    """在子行程中啟動假後端，避免與受測程式爭搶 GIL 或混入記憶體量測
+
+        with StubBackend(latency=0.05) as url:
+            os.environ["API_BASE"] = url
+    """
+
+    def __init__(self, **options):
+        self.options = options
+        self.proc = None
+        self.url = None
+
+    def start(self):
+        cmd = [sys.executable, "-m", "bench.stub_backend"]
+        for key, value in self.options.items():
+            flag = "--" + key.replace("_", "-")
+            if key == "endpoint_latency":
+                for path, seconds in value.items():
+                    cmd += [flag, f"{path}={seconds}"]
+            elif isinstance(value, bool):
+                if value:
+                    cmd.append(flag)
+            else:
+                cmd += [flag, str(value)]
+        self.proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, text=True)
+        self.url = json.loads(self.proc.stdout.readline())["url"]
+        return self.url
+
+    def stop(self):
+        if self.proc is not None:
+            self.proc.terminate()
+            self.proc.wait()
+            self.proc = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def _endpoint_latency(value):
+    path, _, seconds = value.partition("=")
+    return path, float(seconds)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=0, help="0 代表自動選擇")
+    parser.add_argument("--latency", type=float, default=0.05, help="預設回應延遲（秒）")
+    parser.add_argument("--jitter", type=float, default=0.02, help="延遲隨機增減範圍（秒）")
+    parser.add_argument("--endpoint-latency", type=_endpoint_latency, action="append", default=[],
+                        help="個別端點延遲，例如 /ocr/=0.8，可重複指定")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="隨機回傳錯誤的比例")
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--cards", type=int, default=1000, help="/cards 預先產生的名片數")
+    parser.add_argument("--users", type=int, default=50, help="/users 預先產生的使用者數")
+    parser.add_argument("--text-size", type=int, default=400, help="OCR / 名片 raw_text 字元數")
+    parser.add_argument("--bulk", action="store_true", help="支援 /ocr/bulk（預設回傳 404）")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--capacity", type=int, default=0,
+                        help="同時處理量上限，超過時延遲變長、超過兩倍回 429；0 代表不限")
+    args = parser.parse_args()
+
+    state = StubState(
+        latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+        error_status=args.error_status, endpoint_latency=dict(args.endpoint_latency),
+        cards=args.cards, users=args.users, text_size=args.text_size, bulk=args.bulk, seed=args.seed,
+        capacity=args.capacity
+    )
+    server = serve(state, args.host, args.port)
+    host, port = server.server_address[:2]
+    print(json.dumps({"url": f"http://{host}:{port}"}), flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
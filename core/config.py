@@ -1,3 +1,114 @@
 import os
+import tempfile
 
 API_BASE = os.getenv("API_BASE", "https://ocr-whisper-production-2.up.railway.app")
+
+# 後端連線設定（連線池 / 逾時 / 重試）
+API_POOL_SIZE = int(os.getenv("API_POOL_SIZE", "20"))
+API_CONNECT_TIMEOUT = float(os.getenv("API_CONNECT_TIMEOUT", "5"))
+API_READ_TIMEOUT = float(os.getenv("API_READ_TIMEOUT", "60"))
+API_MAX_RETRIES = int(os.getenv("API_MAX_RETRIES", "3"))
+API_RETRY_BACKOFF = float(os.getenv("API_RETRY_BACKOFF", "0.5"))
+
+# OCR 批次辨識的同時併發數
+OCR_CONCURRENCY = int(os.getenv("OCR_CONCURRENCY", "8"))
+
+# OCR 結果快取（SQLite，跨 session / 重啟共用）
+OCR_CACHE_ENABLED = os.getenv("OCR_CACHE_ENABLED", "1") == "1"
+OCR_CACHE_PATH = os.getenv("OCR_CACHE_PATH", os.path.join(os.path.expanduser("~"), ".cache", "card_ocr", "ocr_cache.sqlite3"))
+OCR_CACHE_TTL = int(os.getenv("OCR_CACHE_TTL", str(30 * 24 * 3600)))
+OCR_CACHE_MAX_BYTES = int(os.getenv("OCR_CACHE_MAX_BYTES", str(200 * 1024 * 1024)))
+
+# 上傳前影像前處理（EXIF 轉正 / 縮圖 / 灰階 / 重新壓縮）
+PREPROCESS_ENABLED = os.getenv("PREPROCESS_ENABLED", "1") == "1"
+PREPROCESS_MAX_SIDE = int(os.getenv("PREPROCESS_MAX_SIDE", "2000"))
+PREPROCESS_FORMAT = os.getenv("PREPROCESS_FORMAT", "JPEG").upper()
+PREPROCESS_QUALITY = int(os.getenv("PREPROCESS_QUALITY", "85"))
+PREPROCESS_GRAYSCALE = os.getenv("PREPROCESS_GRAYSCALE", "1") == "1"
+PREPROCESS_WORKERS = int(os.getenv("PREPROCESS_WORKERS", str(os.cpu_count() or 2)))
+
+# ZIP 上傳限制（防 zip bomb / 記憶體用量）
+ZIP_MAX_MEMBERS = int(os.getenv("ZIP_MAX_MEMBERS", "1000"))
+ZIP_MAX_RATIO = float(os.getenv("ZIP_MAX_RATIO", "100"))
+ZIP_MAX_MEMBER_BYTES = int(os.getenv("ZIP_MAX_MEMBER_BYTES", str(30 * 1024 * 1024)))
+ZIP_MAX_TOTAL_BYTES = int(os.getenv("ZIP_MAX_TOTAL_BYTES", str(1024 * 1024 * 1024)))
+# 同時在途（已解壓縮、尚未辨識完成）的圖片位元組上限
+OCR_MAX_INFLIGHT_BYTES = int(os.getenv("OCR_MAX_INFLIGHT_BYTES", str(64 * 1024 * 1024)))
+
+# 一鍵送出（批次寫入資料庫）
+SUBMIT_CONCURRENCY = int(os.getenv("SUBMIT_CONCURRENCY", "8"))
+# 每個 /ocr/bulk 請求的筆數，只在 SUBMIT_BULK 開啟時使用
+SUBMIT_CHUNK_SIZE = int(os.getenv("SUBMIT_CHUNK_SIZE", "50"))
+SUBMIT_MAX_ATTEMPTS = int(os.getenv("SUBMIT_MAX_ATTEMPTS", "4"))
+SUBMIT_BACKOFF = float(os.getenv("SUBMIT_BACKOFF", "0.5"))
+# 後端支援 POST /ocr/bulk 時可開啟，一次送出整個 chunk
+SUBMIT_BULK = os.getenv("SUBMIT_BULK", "0") == "1"
+
+# 名片清單分頁
+CARD_PAGE_SIZE = int(os.getenv("CARD_PAGE_SIZE", "100"))
+CARD_CACHE_TTL = int(os.getenv("CARD_CACHE_TTL", "300"))
+
+# 帳號管理批次更新的同時併發數
+USER_UPDATE_CONCURRENCY = int(os.getenv("USER_UPDATE_CONCURRENCY", "8"))
+
+# Whisper 語音轉文字（背景工作 / 長音檔切段）
+WHISPER_SEGMENT_CONCURRENCY = int(os.getenv("WHISPER_SEGMENT_CONCURRENCY", "4"))
+WHISPER_RESAMPLE = os.getenv("WHISPER_RESAMPLE", "1") == "1"
+WHISPER_MIN_SEGMENT_SEC = float(os.getenv("WHISPER_MIN_SEGMENT_SEC", "30"))
+WHISPER_MAX_SEGMENT_SEC = float(os.getenv("WHISPER_MAX_SEGMENT_SEC", "90"))
+# mp3 / m4a 等壓縮格式切段後重新壓縮的格式與位元率（轉成 WAV 反而比原檔大）
+WHISPER_SEGMENT_FORMAT = os.getenv("WHISPER_SEGMENT_FORMAT", "mp3")
+WHISPER_SEGMENT_BITRATE = os.getenv("WHISPER_SEGMENT_BITRATE", "48k")
+WHISPER_CACHE_SIZE = int(os.getenv("WHISPER_CACHE_SIZE", "256"))
+
+# 背景工作排程（所有使用者共用固定數量的 worker）
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_MAX_QUEUED_BYTES = int(os.getenv("JOB_MAX_QUEUED_BYTES", str(1024 * 1024 * 1024)))
+JOB_MAX_USER_QUEUED_BYTES = int(os.getenv("JOB_MAX_USER_QUEUED_BYTES", str(512 * 1024 * 1024)))
+JOB_RESULT_TTL = int(os.getenv("JOB_RESULT_TTL", "3600"))
+# 有背景工作進行中時，頁面自動更新進度的間隔（秒）
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "1"))
+# 所有 OCR 批次共用的連線執行緒數
+OCR_POOL_SIZE = int(os.getenv("OCR_POOL_SIZE", "32"))
+
+# 暫存辨識結果（尚未送出的名片）的記憶體預算，超過時移到暫存目錄的 SQLite 檔
+RESULT_STORE_SESSION_BYTES = int(os.getenv("RESULT_STORE_SESSION_BYTES", str(4 * 1024 * 1024)))
+RESULT_STORE_GLOBAL_BYTES = int(os.getenv("RESULT_STORE_GLOBAL_BYTES", str(128 * 1024 * 1024)))
+RESULT_STORE_SPILL_DIR = os.getenv("RESULT_STORE_SPILL_DIR", tempfile.gettempdir())
+
+# 近似重複圖片偵測（dHash 感知雜湊，64 bits 中相異位元數 <= 門檻即視為重複；<= 7 時可走索引快速查詢）
+DEDUP_ENABLED = os.getenv("DEDUP_ENABLED", "1") == "1"
+DEDUP_MAX_DISTANCE = int(os.getenv("DEDUP_MAX_DISTANCE", "6"))
+# skip：略過不送 OCR；flag：照常辨識，只提示疑似重複
+DEDUP_ACTION = os.getenv("DEDUP_ACTION", "skip")
+# 每位使用者保留多少張已辨識圖片的雜湊，供之後的批次比對
+DEDUP_MAX_ENTRIES = int(os.getenv("DEDUP_MAX_ENTRIES", "20000"))
+
+# 直接讀取 PostgreSQL（名片清單 / 使用者清單 / 匯出）；未設定 DB_URL 時走後端 HTTP API
+DB_URL = os.getenv("DB_URL")
+DB_READS_ENABLED = os.getenv("DB_READS_ENABLED", "1") == "1"
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", "1"))
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", "10"))
+# server-side cursor 每次從資料庫取回的筆數
+DB_FETCH_SIZE = int(os.getenv("DB_FETCH_SIZE", "2000"))
+DB_CARDS_TABLE = os.getenv("DB_CARDS_TABLE", "ocr_cards")
+DB_USERS_TABLE = os.getenv("DB_USERS_TABLE", "users")
+
+# GET 回應快取（/cards、/users）：有 ETag / Last-Modified 時以條件式請求重新驗證
+HTTP_CACHE_MAX_ENTRIES = int(os.getenv("HTTP_CACHE_MAX_ENTRIES", "500"))
+# 後端沒有提供 ETag / Last-Modified 時，回應直接沿用的秒數
+HTTP_CACHE_TTL = int(os.getenv("HTTP_CACHE_TTL", "60"))
+
+# /ocr/ 與 /whisper 的請求逾時（秒，讀取逾時；連線逾時沿用 API_CONNECT_TIMEOUT）
+OCR_TIMEOUT = float(os.getenv("OCR_TIMEOUT", "60"))
+WHISPER_TIMEOUT = float(os.getenv("WHISPER_TIMEOUT", "180"))
+# 自適應併發上限（AIMD）：回應慢於目標延遲或過載（429 / 5xx / 逾時）時減半，順利時逐步加回
+OCR_LATENCY_TARGET = float(os.getenv("OCR_LATENCY_TARGET", "10"))
+WHISPER_LATENCY_TARGET = float(os.getenv("WHISPER_LATENCY_TARGET", "60"))
+LIMITER_BACKOFF = float(os.getenv("LIMITER_BACKOFF", "0.5"))
+# 等待併發名額的上限秒數，超過就放棄，不讓 script 執行緒無限等待
+LIMITER_ACQUIRE_TIMEOUT = float(os.getenv("LIMITER_ACQUIRE_TIMEOUT", "30"))
+# 斷路器：連續失敗幾次後開啟、開啟幾秒後進入半開、半開時放行幾個探測請求
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))
+BREAKER_OPEN_SECONDS = float(os.getenv("BREAKER_OPEN_SECONDS", "30"))
+BREAKER_HALF_OPEN_PROBES = int(os.getenv("BREAKER_HALF_OPEN_PROBES", "2"))
@@ -0,0 +1,154 @@
+# core/metrics.py
+
+import itertools
+import re
+import threading
+import time
+
+from core.stats import percentile
+
+BUFFER_SIZE = 10000
+# Prometheus histogram 的 bucket 上界（秒）
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+_ID_SEGMENT = re.compile(r"/\d+(?=/|$)")
+
+REQUEST = "request"
+RERUN = "rerun"
+
+
+def endpoint_name(method, path):
+    """/update_user/12 -> PUT /update_user/{id}，避免每個 id 各自成為一個指標"""
+    path = "/" + path.split("?", 1)[0].lstrip("/")
+    return f"{method} {_ID_SEGMENT.sub('/{id}', path)}"
+
+
+class MetricsBuffer:
+    """整個 process 共用的環狀緩衝區
+
+    寫入環狀緩衝區只取一次 itertools.count（GIL 下為原子操作）再覆寫固定位置，不需要鎖；
+    彙總時才複製一份快照計算百分位數。另外維護單調遞增的計數器供 Prometheus 使用：
+    計數器的 += 不是原子操作，更新時會短暫持有 _totals_lock（只做幾次整數加法）。
+    """
+
+    def __init__(self, size=BUFFER_SIZE):
+        self.size = size
+        self._buf = [None] * size
+        self._counter = itertools.count()
+        self._totals = {}           # (kind, name) -> [count, errors, 秒數總和, bytes_out, bytes_in, buckets...]
+        self._totals_lock = threading.Lock()
+
+    def record(self, kind, name, duration, status=None, bytes_out=0, bytes_in=0):
+        """status 為 None 代表連線失敗；>= 400 視為錯誤
+
+        環狀緩衝區的寫入不需要鎖；累計計數器在 _totals_lock 內更新，避免多執行緒同時 += 時遺失計數。
+        """
+        error = status is None or status >= 400 if kind == REQUEST else False
+        self._buf[next(self._counter) % self.size] = (
+            time.time(), kind, name, duration, status, bytes_out, bytes_in, error
+        )
+        with self._totals_lock:
+            row = self._totals.get((kind, name))
+            if row is None:
+                row = self._totals[(kind, name)] = [0, 0, 0.0, 0, 0] + [0] * len(LATENCY_BUCKETS)
+            row[0] += 1
+            row[1] += error
+            row[2] += duration
+            row[3] += bytes_out
+            row[4] += bytes_in
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if duration <= bound:
+                    row[5 + i] += 1
+
+    def snapshot(self):
+        return [r for r in list(self._buf) if r is not None]
+
+    def summary(self, kind=REQUEST):
+        """最近 BUFFER_SIZE 筆紀錄依名稱彙總：次數、錯誤率、p50/p95/p99、位元組"""
+        groups = {}
+        for ts, k, name, duration, status, bytes_out, bytes_in, error in self.snapshot():
+            if k != kind:
+                continue
+            g = groups.setdefault(name, {"durations": [], "errors": 0, "bytes_out": 0, "bytes_in": 0, "status": {}})
+            g["durations"].append(duration)
+            g["errors"] += error
+            g["bytes_out"] += bytes_out
+            g["bytes_in"] += bytes_in
+            if status is not None:
+                g["status"][status] = g["status"].get(status, 0) + 1
+
+        rows = []
+        for name, g in sorted(groups.items()):
+            count = len(g["durations"])
+            rows.append({
+                "name": name,
+                "count": count,
+                "p50_ms": round(percentile(g["durations"], 50) * 1000, 1),
+                "p95_ms": round(percentile(g["durations"], 95) * 1000, 1),
+                "p99_ms": round(percentile(g["durations"], 99) * 1000, 1),
+                "error_rate": round(g["errors"] / count, 4),
+                "bytes_out": g["bytes_out"],
+                "bytes_in": g["bytes_in"],
+                "status": ", ".join(f"{code}×{n}" for code, n in sorted(g["status"].items())),
+            })
+        return rows
+
+    def slowest(self, n=20, kind=REQUEST):
+        records = [r for r in self.snapshot() if r[1] == kind]
+        records.sort(key=lambda r: r[3], reverse=True)
+        return [
+            {
+                "time": time.strftime("%H:%M:%S", time.localtime(r[0])),
+                "name": r[2],
+                "ms": round(r[3] * 1000, 1),
+                "status": r[4],
+                "bytes_out": r[5],
+                "bytes_in": r[6],
+            }
+            for r in records[:n]
+        ]
+
+    def prometheus(self, prefix="card_app"):
+        """Prometheus text exposition format（單調遞增計數器 + 延遲 histogram）"""
+        with self._totals_lock:
+            totals = {key: list(row) for key, row in self._totals.items()}
+
+        lines = []
+        for kind, metric in ((REQUEST, "backend_request"), (RERUN, "page_rerun")):
+            name = f"{prefix}_{metric}_duration_seconds"
+            label = "endpoint" if kind == REQUEST else "page"
+            lines.append(f"# TYPE {name} histogram")
+            for (k, key), row in sorted(totals.items()):
+                if k != kind:
+                    continue
+                key = key.replace('"', '\\"')
+                for i, bound in enumerate(LATENCY_BUCKETS):
+                    lines.append(f'{name}_bucket{{{label}="{key}",le="{bound}"}} {row[5 + i]}')
+                lines.append(f'{name}_bucket{{{label}="{key}",le="+Inf"}} {row[0]}')
+                lines.append(f'{name}_sum{{{label}="{key}"}} {row[2]:.6f}')
+                lines.append(f'{name}_count{{{label}="{key}"}} {row[0]}')
+
+        for suffix, idx, help_type in (("errors_total", 1, "counter"), ("sent_bytes_total", 3, "counter"),
+                                       ("received_bytes_total", 4, "counter")):
+            name = f"{prefix}_backend_request_{suffix}"
+            lines.append(f"# TYPE {name} {help_type}")
+            for (k, key), row in sorted(totals.items()):
+                if k == REQUEST:
+                    key = key.replace('"', '\\"')
+                    lines.append(f'{name}{{endpoint="{key}"}} {row[idx]}')
+        return "\n".join(lines) + "\n"
+
+
+_metrics = MetricsBuffer()
+
+
+def get_metrics():
+    return _metrics
+
+
+def record_request(method, path, duration, status=None, bytes_out=0, bytes_in=0):
+    _metrics.record(REQUEST, endpoint_name(method, path), duration, status, bytes_out, bytes_in)
+
+
+def record_rerun(page, duration):
+    _metrics.record(RERUN, page, duration)
@@ -0,0 +1,175 @@
+"""import 耗時分析
+
+設定 IMPORT_PROFILE=1 時 app.py 會在啟動時安裝 ImportProfiler，記錄每個模組的
+import 時間（self / 累計）。也可以直接量測冷啟動：
+
+    python -m core.profiler --budget-ms 1500
+
+會在全新的 Python 行程中 import 所有頁面模組，輸出 JSON，超過預算時以非 0 結束。
+"""
+
+import argparse
+import importlib
+import json
+import subprocess
+import sys
+import threading
+import time
+
+
+class _TimedLoader:
+    """包住原本的 loader，只在 exec_module 前後計時，其餘屬性原樣轉交"""
+
+    def __init__(self, loader, profiler):
+        self._loader = loader
+        self._profiler = profiler
+
+    def create_module(self, spec):
+        create = getattr(self._loader, "create_module", None)
+        return create(spec) if create else None
+
+    def exec_module(self, module):
+        self._profiler._enter(module.__name__)
+        try:
+            self._loader.exec_module(module)
+        finally:
+            self._profiler._exit(module.__name__)
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+
+class ImportProfiler:
+    """以 meta path finder 記錄每個模組的 import 耗時"""
+
+    def __init__(self):
+        self.records = {}           # module -> [self 秒數, 累計秒數]
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    # --- MetaPathFinder ---
+    def find_spec(self, fullname, path, target=None):
+        if getattr(self._local, "finding", False):
+            return None
+        self._local.finding = True
+        try:
+            for finder in sys.meta_path:
+                if finder is self or not hasattr(finder, "find_spec"):
+                    continue
+                spec = finder.find_spec(fullname, path, target)
+                if spec is not None:
+                    break
+            else:
+                return None
+        finally:
+            self._local.finding = False
+
+        if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+            spec.loader = _TimedLoader(spec.loader, self)
+        return spec
+
+    def _enter(self, name):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        stack.append([name, time.perf_counter(), 0.0])
+
+    def _exit(self, name):
+        stack = self._local.stack
+        _, start, children = stack.pop()
+        total = time.perf_counter() - start
+        if stack:
+            stack[-1][2] += total
+        with self._lock:
+            self.records[name] = [total - children, total]
+
+    def install(self):
+        if self not in sys.meta_path:
+            sys.meta_path.insert(0, self)
+        return self
+
+    def uninstall(self):
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+
+    def report(self, top=30):
+        """依 self 耗時排序，回傳 [{module, self_ms, cumulative_ms}]"""
+        with self._lock:
+            items = sorted(self.records.items(), key=lambda kv: kv[1][0], reverse=True)
+        return [
+            {"module": name, "self_ms": round(s * 1000, 2), "cumulative_ms": round(c * 1000, 2)}
+            for name, (s, c) in items[:top]
+        ]
+
+    def top_level_cost(self):
+        """依頂層套件彙總 self 耗時（毫秒）"""
+        totals = {}
+        with self._lock:
+            for name, (s, _) in self.records.items():
+                root = name.split(".")[0]
+                totals[root] = totals.get(root, 0.0) + s * 1000
+        return dict(sorted(((k, round(v, 2)) for k, v in totals.items()), key=lambda kv: kv[1], reverse=True))
+
+
+_profiler = None
+
+
+def install_import_profiler():
+    global _profiler
+    if _profiler is None:
+        _profiler = ImportProfiler().install()
+    return _profiler
+
+
+def get_import_profiler():
+    return _profiler
+
+
+def _measure_in_process():
+    profiler = install_import_profiler()
+    timings = {}
+
+    def timed_import(name):
+        start = time.perf_counter()
+        importlib.import_module(name)
+        timings[name] = round((time.perf_counter() - start) * 1000, 2)
+
+    # 先載入 streamlit 本身（每個 session 都會用到），其後各頁面的數字即為額外成本；
+    # registry 也會 import streamlit，要在 profiler 安裝並量完 streamlit 之後才載入
+    timed_import("streamlit")
+    from frontend.registry import PAGES
+
+    for page in PAGES.values():
+        timed_import(page.module)
+
+    return {
+        "modules": timings,
+        "total_ms": round(sum(timings.values()), 2),
+        "by_package": profiler.top_level_cost(),
+        "slowest": profiler.report(top=20),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="量測頁面模組的冷啟動 import 耗時")
+    parser.add_argument("--budget-ms", type=float, default=0, help="總 import 時間上限，0 代表不檢查")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(_measure_in_process(), ensure_ascii=False))
+        return
+
+    # 在全新行程中量測，避免目前行程已載入的模組影響結果
+    out = subprocess.run(
+        [sys.executable, "-m", "core.profiler", "--child"],
+        capture_output=True, text=True, check=True
+    )
+    report = json.loads(out.stdout)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    if args.budget_ms and report["total_ms"] > args.budget_ms:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
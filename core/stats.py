@@ -0,0 +1,10 @@
+import math
+
+
+def percentile(values, q):
+    """以 nearest-rank 計算百分位數（q 為 0~100），空序列回傳 0.0"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(q / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
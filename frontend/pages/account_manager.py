@@ -1,26 +1,64 @@
 import streamlit as st
 import pandas as pd
-import requests
 from st_aggrid import AgGrid, GridOptionsBuilder, GridUpdateMode
-from services.auth_service import is_logged_in, logout_button
+from services.auth_service import is_logged_in, logout_button, logout
+from services.user_service import diff_users, build_update_payloads, update_users, list_users, users_scope, UserApiError
 
-backend_url = "https://ocr-whisper-production-2.up.railway.app"
+@st.fragment
+def render_user_grid(df):
+    """可編輯的帳號表格與儲存按鈕；編輯儲存格只重跑這一塊，不重新讀取使用者或重建 DataFrame"""
+    gb = GridOptionsBuilder.from_dataframe(df)
+    gb.configure_pagination(paginationAutoPageSize=False, paginationPageSize=5)
+    gb.configure_default_column(wrapText=True, autoHeight=True)
+    gb.configure_column("ID", editable=False, pinned="left", width=80)
+    gb.configure_column("使用者帳號", editable=False, pinned="left", width=160)
+    gb.configure_column("是否為管理員", editable=False, width=100)
+    gb.configure_column("使用者狀況", editable=True, cellEditor='agSelectCellEditor',
+                        cellEditorParams={'values': ["啟用", "停用", "刪除"]}, width=100)
+    gb.configure_column("備註", editable=True)
 
-def update_user(user_id, data):
-    try:
-        response = requests.put(
-            f"{backend_url}/update_user/{user_id}",
-            json=data,
-            headers={"Authorization": f"Bearer {st.session_state['access_token']}"}
-        )
-        if response.status_code == 200:
-            return True
+    grid_options = gb.build()
+
+    # 不在每次 rerun 重新載入資料（會蓋掉編輯中的內容）；儲存後換 key 讓表格載入新資料
+    grid_response = AgGrid(
+        df,
+        gridOptions=grid_options,
+        update_mode=GridUpdateMode.MODEL_CHANGED,
+        allow_unsafe_jscode=True,
+        theme="streamlit",
+        height=380,
+        fit_columns_on_grid_load=True,
+        editable=True,
+        single_click_edit=True,
+        reload_data=False,
+        key=f"user_grid_{st.session_state.get('user_grid_version', 0)}"
+    )
+
+    edited_df = pd.DataFrame(grid_response["data"])
+
+    st.markdown("#### 📥 點選表格進行編輯，完成後按下「儲存變更」")
+
+    if st.button("儲存變更"):
+        changed = diff_users(df, edited_df)
+        if changed.empty:
+            st.info("沒有資料變更")
         else:
-            st.error(f"更新失敗（ID: {user_id}）：{response.text}")
-            return False
-    except Exception as e:
-        st.error(f"更新時發生錯誤：{e}")
-        return False
+            with st.spinner(f"儲存 {len(changed)} 筆變更中..."):
+                results = update_users(
+                    build_update_payloads(changed),
+                    token=st.session_state.get("access_token")
+                )
+            change_count = sum(1 for _, ok, _ in results if ok)
+            failures = [(user_id, error) for user_id, ok, error in results if not ok]
+            if change_count > 0 and not failures:
+                # 使用者快取已清除，整頁重跑重新讀取
+                st.session_state["user_grid_version"] = st.session_state.get("user_grid_version", 0) + 1
+                st.session_state["user_flash"] = f"✅ 成功儲存 {change_count} 筆變更"
+                st.rerun()
+            for user_id, error in failures:
+                st.error(f"更新失敗（ID: {user_id}）：{error}")
+            if change_count > 0:
+                st.success(f"✅ 成功儲存 {change_count} 筆變更")
 
 def run():
     st.set_page_config(page_title="帳號管理", page_icon="👥")
@@ -31,92 +69,37 @@ def run():
     logout_button()
 
     st.markdown("## 👥 帳號管理")
+    flash = st.session_state.pop("user_flash", None)
+    if flash:
+        st.success(flash)
     st.markdown("### 使用者帳號列表")
 
-    @st.cache_data(ttl=60)
+    # 依帳號 / 租戶快取，以 ETag 重新驗證；儲存變更後會清除快取
     def get_user_list():
+        company = st.session_state.get("company_name", "")
         try:
-            response = requests.get(
-                f"{backend_url}/users",
-                headers={"Authorization": f"Bearer {st.session_state['access_token']}"}
-            )
-            if response.status_code == 200:
-                return response.json()
-            else:
-                st.error("無法取得使用者資料。")
-                return []
+            # 只有管理員可以直接讀資料庫（依公司篩選），其他人走後端由 token 檢查權限
+            return list_users(users_scope(st.session_state.get("username", ""), company),
+                              company=company if st.session_state.get("role") == "admin" else None)
+        except UserApiError:
+            st.error("無法取得使用者資料。")
+            return []
         except Exception as e:
             st.error(f"發生錯誤：{e}")
             return []
 
     users = get_user_list()
     if users:
-        for user in users:
-            user["是否為管理員"] = bool(user.get("is_admin", False))
-            user["使用者狀況"] = "啟用" if user.get("is_active", False) else "停用"
-            user["備註"] = user.get("note", "")
-
+        # users 是快取中的物件，不直接修改
         df = pd.DataFrame([{
             "ID": u["id"],
             "使用者帳號": u["username"],
-            "是否為管理員": u["是否為管理員"],
-            "使用者狀況": u["使用者狀況"],
-            "備註": u["備註"]
+            "是否為管理員": bool(u.get("is_admin", False)),
+            "使用者狀況": "啟用" if u.get("is_active", False) else "停用",
+            "備註": u.get("note", "")
         } for u in users])
 
-        gb = GridOptionsBuilder.from_dataframe(df)
-        gb.configure_pagination(paginationAutoPageSize=False, paginationPageSize=5)
-        gb.configure_default_column(wrapText=True, autoHeight=True)
-        gb.configure_column("ID", editable=False, pinned="left", width=80)
-        gb.configure_column("使用者帳號", editable=False, pinned="left", width=160)
-        gb.configure_column("是否為管理員", editable=False, width=100)
-        gb.configure_column("使用者狀況", editable=True, cellEditor='agSelectCellEditor',
-                            cellEditorParams={'values': ["啟用", "停用", "刪除"]}, width=100)
-        gb.configure_column("備註", editable=True)
-
-        grid_options = gb.build()
-
-        grid_response = AgGrid(
-            df,
-            gridOptions=grid_options,
-            update_mode=GridUpdateMode.MODEL_CHANGED,
-            allow_unsafe_jscode=True,
-            theme="streamlit",
-            height=380,
-            fit_columns_on_grid_load=True,
-            editable=True,
-            single_click_edit=True,
-            reload_data=True
-        )
-
-        edited_df = pd.DataFrame(grid_response["data"])
-
-        st.markdown("#### 📥 點選表格進行編輯，完成後按下「儲存變更」")
-
-        if st.button("儲存變更"):
-            change_count = 0
-            for i in range(len(df)):
-                old_row = df.iloc[i]
-                new_row = edited_df.iloc[i]
-        
-                if (
-                    old_row["使用者狀況"] != new_row["使用者狀況"]
-                    or old_row["是否為管理員"] != new_row["是否為管理員"]
-                    or old_row["備註"] != new_row["備註"]
-                ):
-                    user_id = new_row["ID"]
-                    updated_data = {
-                        "note": str(new_row["備註"]) if pd.notna(new_row["備註"]) else "",
-                        "is_admin": bool(new_row["是否為管理員"]),
-                        "is_active": new_row["使用者狀況"] == "啟用"
-                    }
-                    if update_user(user_id, updated_data):
-                        change_count += 1
-        
-            if change_count > 0:
-                st.success(f"✅ 成功儲存 {change_count} 筆變更")
-            else:
-                st.info("沒有資料變更")
+        render_user_grid(df)
 
     st.markdown("---")
     col1, col2 = st.columns(2)
@@ -126,6 +109,6 @@ def run():
             st.rerun()
     with col2:
         if st.button("🚪 登出"):
-            st.session_state.clear()
+            logout()
             st.session_state["current_page"] = "login"
             st.rerun()
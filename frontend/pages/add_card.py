@@ -1,12 +1,30 @@
 # frontend/pages/add_card.py
 
 import streamlit as st
-import requests
-from PIL import Image
-import io
-import zipfile
-import base64
-from core.config import API_BASE
+from services.upload_ledger import get_ledger
+from services.ocr_jobs import make_ocr_upload_job
+from services.job_scheduler import get_scheduler, SchedulerFull, QUEUED as JOB_QUEUED, FAILED as JOB_FAILED
+from services.batch_submit import submit_records
+from services.card_service import cards_added
+from services.result_store import get_result_store
+from services.field_normalizer import normalize_batch
+from services.image_dedup import get_dedup_index
+from core.config import DEDUP_ACTION, JOB_POLL_SECONDS
+from services.auth_service import logout
+from services.transcription import start_transcription, DONE, FAILED
+
+
+UPLOADER_KEY = "card_uploader"
+
+
+def on_uploads_change():
+    """使用者在上傳框增刪檔案時才會呼叫：移除被刪掉的檔案的辨識結果
+
+    換頁回來時上傳框會被清空但不會觸發 on_change，暫存結果與進行中的工作都會保留。
+    """
+    ledger = get_ledger()
+    files = st.session_state.get(UPLOADER_KEY) or []
+    ledger.uploader_changed([ledger.source_key(file) for file in files], get_result_store())
 
 
 def add_card_page():
@@ -17,36 +35,55 @@ def add_card_page():
         "拖曳檔案至此，或點選選取檔案",
         type=["jpg", "jpeg", "png", "zip"],
         accept_multiple_files=True,
-        label_visibility="collapsed"
+        label_visibility="collapsed",
+        key=UPLOADER_KEY,
+        on_change=on_uploads_change
     )
 
-    if "extracted_results" not in st.session_state:
-        st.session_state["extracted_results"] = []
-
-    if uploaded_files:
-        for file in uploaded_files:
-            if file.name.endswith(".zip"):
-                with zipfile.ZipFile(io.BytesIO(file.read()), "r") as zip_ref:
-                    for name in zip_ref.namelist():
-                        if name.lower().endswith((".jpg", ".jpeg", ".png")):
-                            img_bytes = zip_ref.read(name)
-                            process_and_store(name, img_bytes)
-            else:
-                img_bytes = file.read()
-                process_and_store(file.name, img_bytes)
+    # 暫存的辨識結果：精簡紀錄，超過記憶體預算時移到磁碟
+    results = get_result_store()
+
+    # 以內容雜湊比對，rerun 時只辨識新加入的檔案
+    ledger = get_ledger()
+    ledger.begin_run()
+    sources = [ledger.source_key(file) for file in uploaded_files or []]
+    ledger.shown = set(sources)
+    ledger.publish(results)
+
+    # 辨識在背景工作中執行，換頁或 rerun 都不會中斷；回到本頁時再取回結果
+    collect_upload_jobs(ledger, results)
+    new_files = [(file, source) for file, source in zip(uploaded_files or [], sources)
+                 if not ledger.is_expanded(source) and source not in ledger.cancelled]
+    if new_files:
+        submit_upload_job(new_files, ledger)
+    render_upload_jobs(ledger, results)
+
+    cancelled = [source for source in sources if source in ledger.cancelled]
+    if cancelled:
+        st.info(f"⏹️ 已取消 {len(cancelled)} 個檔案的辨識")
+        if st.button("🔁 重新辨識"):
+            ledger.retry_sources(cancelled)
+            st.rerun()
+
+    # 辨識失敗的圖片：重送所在的上傳檔案，已辨識完成的圖片會被略過
+    failed_sources = ledger.failed_sources()
+    failed = [source for source in sources if source in failed_sources]
+    if failed and not st.session_state.get("ocr_jobs") and st.button("🔁 重試辨識失敗的圖片"):
+        ledger.retry_sources(failed)
+        st.rerun()
 
     # 顯示萃取結果（已美化）
-    if st.session_state["extracted_results"]:
+    if results:
         st.markdown("### 🔍 預覽辨識結果")
-        for i, r in enumerate(st.session_state["extracted_results"]):
+        for i, r in enumerate(results):
             col1, col2 = st.columns([10, 1])
             with col1:
-                st.markdown(f"**📝 {r['filename']}**")
-                st.markdown(format_fields(r["fields"]), unsafe_allow_html=True)
+                st.markdown(f"**📝 {r.filename}**")
+                st.markdown(format_fields(r.fields, r.review), unsafe_allow_html=True)
             with col2:
                 if st.button("🗑️", key=f"del_{i}"):
-                    st.session_state["extracted_results"].pop(i)
-                    st.experimental_rerun()
+                    results.pop(i)
+                    st.rerun()
 
     # 語音備註（選填）
     st.markdown("---")
@@ -56,61 +93,205 @@ def add_card_page():
 
     if audio_file:
         st.audio(audio_file)
-        headers = {"Authorization": f"Bearer {st.session_state['access_token']}"}
-        files = {"file": (audio_file.name, audio_file.read())}
-        res = requests.post(f"{API_BASE}/whisper", files=files, headers=headers)
-        if res.status_code == 200:
-            note_text = res.json().get("text", "")
+        # 背景轉錄，以音檔內容雜湊快取；rerun 時不會重新上傳
+        token = st.session_state.get("access_token")
+        owner = st.session_state.get("username", "")
+        job = start_transcription(audio_file.name, audio_file.getvalue(), token=token, owner=owner)
+        if job.status == DONE:
+            note_text = job.text
             st.success("✅ 語音辨識成功！")
             st.text_area("📝 語音內容", value=note_text, height=100)
+        elif job.status == FAILED:
+            st.error(f"❌ 語音辨識失敗：{job.error}")
+            if st.button("🔁 重新辨識語音"):
+                start_transcription(audio_file.name, audio_file.getvalue(), token=token, owner=owner, retry=True)
+                st.rerun()
         else:
-            st.error("❌ 語音辨識失敗")
+            transcription_progress(job)
 
     # 一鍵送出
-    if st.session_state["extracted_results"] and st.button("✅ 一鍵送出到資料庫"):
+    if results and st.button("✅ 一鍵送出到資料庫"):
         uid = st.session_state["user"].get("id")
-        token = st.session_state.get("access_token", "")
-        headers = {"Authorization": f"Bearer {token}"}
-        success = 0
+        # 送出前再正規化一次（已正規化的值不會改變），確保寫入資料庫的格式一致
+        records = normalize_batch(results.to_dicts())
+        progress = st.progress(0.0, text=f"送出中 0 / {len(records)}")
+
+        def on_progress(done, total):
+            progress.progress(done / total, text=f"送出中 {done} / {total}")
 
-        for r in st.session_state["extracted_results"]:
-            payload = {
-                "user_id": uid,
-                "raw_text": r["raw_text"],
-                "filename": r["filename"],
-                "fields": r["fields"]
-            }
-            if note_text:
-                payload["note"] = note_text
+        report = submit_records(
+            records,
+            uid,
+            note=note_text,
+            token=st.session_state.get("access_token"),
+            on_progress=on_progress
+        )
+        progress.empty()
 
-            res = requests.post(f"{API_BASE}/ocr", json=payload, headers=headers)
-            if res.status_code == 200:
-                success += 1
+        if report.success:
+            created = report.created if len(report.created) == report.success else None
+            cards_added(st.session_state.get("username", ""), st.session_state.get("company_name", ""), created)
+            remember_submitted(ledger, records, report)
 
-        st.success(f"✅ 成功送出 {success} 筆資料！")
-        st.session_state["extracted_results"] = []
+        # 只保留失敗的紀錄，方便再按一次重送
+        failed = report.failed_indexes
+        results.keep(failed)
+        st.success(f"✅ 成功送出 {report.success} 筆資料！（{report.records_per_sec:.1f} 筆/秒）")
+        if failed:
+            st.error(f"❌ {len(failed)} 筆送出失敗，已保留在上方清單，可再次送出")
+            with st.expander("查看失敗明細"):
+                for i in failed:
+                    ok, detail = report.statuses[i] or (False, "未送出")
+                    st.write(f"📝 {records[i]['filename']}：{detail}")
 
 
-def process_and_store(filename, image_bytes):
+def remember_submitted(ledger, records, report):
+    """送出成功的圖片從上傳帳本移到已送出名片的比對索引（以名片 id 登記，刪除名片時移除）"""
+    keys = {}
+    for i, status in enumerate(report.statuses):
+        digest = records[i].get("hash")
+        if status and status[0] and digest:
+            keys[digest] = report.card_ids.get(i, digest)
+    taken = ledger.forget(keys) if keys else {}
+    index = get_dedup_index(st.session_state.get("username", ""))
+    if index is not None:
+        for digest, (h, name) in taken.items():
+            index.add(h, name, keys[digest])
+
+
+def submit_upload_job(new_files, ledger):
+    """把新上傳的檔案交給背景排程器辨識"""
+    files = [(file.name, file.getvalue(), source) for file, source in new_files]
+    # 只和暫存中的圖片與已送出的名片比對；移除的檔案與刪除的名片不會再擋住重新上傳
+    submitted = get_dedup_index(st.session_state.get("username", ""))
+    dedup_indexes = (ledger.dedup, submitted) if submitted is not None else ()
     try:
-        headers = {"Authorization": f"Bearer {st.session_state['access_token']}"}
-        files = {"file": (filename, image_bytes)}
-        res = requests.post(f"{API_BASE}/ocr/", files=files, headers=headers)
-
-        if res.status_code == 200:
-            data = res.json()
-            st.session_state["extracted_results"].append({
-                "filename": filename,
-                "raw_text": data.get("text", ""),
-                "fields": data.get("fields", {})
-            })
+        job = get_scheduler().submit(
+            st.session_state.get("username", ""),
+            make_ocr_upload_job(
+                files,
+                ledger.done_digests(),
+                token=st.session_state.get("access_token"),
+                dedup_indexes=dedup_indexes
+            ),
+            kind="ocr",
+            payload_bytes=sum(len(data) for _, data, _ in files)
+        )
+    except SchedulerFull as e:
+        st.warning(f"⏳ {e}")
+        return
+
+    st.session_state.setdefault("ocr_jobs", []).append({
+        "id": job.id,
+        "sources": [source for _, source in new_files]
+    })
+    st.session_state["ocr_job_notes"] = []
+    for _, source in new_files:
+        ledger.mark_expanded(source)
+
+
+def collect_upload_jobs(ledger, results):
+    """取回已完成的背景辨識結果，依上傳順序存入 results（ResultStore）
+
+    只略過 / 取消使用者已從上傳框移除或按下取消的檔案（ledger.expanded 中已沒有的來源）；
+    上傳框因換頁被清空時，工作與結果都照常保留。
+    """
+    scheduler = get_scheduler()
+    current = ledger.expanded
+    notes = st.session_state.setdefault("ocr_job_notes", [])
+    remaining = []
+
+    for entry in st.session_state.get("ocr_jobs", []):
+        job = scheduler.get(entry["id"])
+        if job is None:
+            continue
+        if not current & set(entry["sources"]):
+            # 檔案已被使用者從上傳框移除或取消，取消還沒做完的工作
+            scheduler.cancel(job.id)
+            continue
+        if not job.finished:
+            remaining.append(entry)
+            continue
+        if job.status == JOB_FAILED:
+            notes.append(("error", f"❌ 批次辨識失敗：{job.error}"))
+        elif job.result:
+            for digest, name, source, result, error in job.result["outcomes"]:
+                if source not in current:
+                    continue
+                if result is None and error is None:
+                    # 已辨識過的圖片，只登記多了一個來源
+                    if digest in ledger.entries:
+                        ledger.claim(digest, name, source)
+                    continue
+                if not ledger.claim(digest, name, source):
+                    continue
+                if error is None and result is not None:
+                    ledger.complete(digest, result, job.result.get("hashes", {}).get(digest))
+                elif error is not None:
+                    ledger.fail(digest, error)
+                    notes.append(("error", f"❌ 辨識失敗：{name}，{error}"))
+            for filename, error in job.result["errors"]:
+                notes.append(("error", f"❌ 無法處理 {filename}：{error}"))
+            for name, other, distance in job.result.get("duplicates", []):
+                action = "已略過" if DEDUP_ACTION == "skip" else "仍已辨識"
+                notes.append(("warning", f"⚠️ {name} 與 {other} 疑似重複（差異 {distance}），{action}"))
+            notes.append(("caption", f"📊 {job.result['summary']}"))
+        scheduler.discard(job.id)
+
+    st.session_state["ocr_jobs"] = remaining
+    ledger.publish(results)
+
+
+def render_upload_jobs(ledger, results):
+    """顯示背景辨識進度與上一批的結果摘要"""
+    if st.session_state.get("ocr_jobs"):
+        upload_jobs_progress(ledger, results)
+
+    for kind, message in st.session_state.get("ocr_job_notes", []):
+        if kind == "error":
+            st.error(message)
+        elif kind == "warning":
+            st.warning(message)
         else:
-            st.error(f"❌ API 回傳失敗：{filename}，狀態碼 {res.status_code}")
-    except Exception as e:
-        st.error(f"❌ 辨識失敗：{filename}，錯誤訊息：{str(e)}")
+            st.caption(message)
 
 
-def format_fields(fields: dict) -> str:
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def upload_jobs_progress(ledger, results):
+    """有背景辨識進行中時定期自動更新進度；有工作結束時重跑整頁，顯示辨識結果與摘要"""
+    pending = len(st.session_state.get("ocr_jobs", []))
+    collect_upload_jobs(ledger, results)
+    if len(st.session_state.get("ocr_jobs", [])) < pending:
+        st.rerun()
+
+    scheduler = get_scheduler()
+    for entry in st.session_state.get("ocr_jobs", []):
+        job = scheduler.get(entry["id"])
+        if job is None:
+            continue
+        col1, col2 = st.columns([10, 2])
+        with col1:
+            if job.status == JOB_QUEUED:
+                st.progress(0.0, text="⏳ 排隊中，可以先到其他頁面，稍後回來查看結果")
+            else:
+                st.progress(job.progress, text=f"辨識中 {job.done} / {job.total or '?'}（⚡ {job.rate:.2f} 張/秒）")
+        with col2:
+            if st.button("取消", key=f"cancel_{job.id}"):
+                scheduler.cancel(job.id)
+                # 清除已展開標記，下次 collect_upload_jobs 會捨棄這個工作，之後可以重新辨識
+                ledger.cancel_sources(entry["sources"])
+                st.rerun()
+
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def transcription_progress(job):
+    """語音辨識進行中時定期自動更新進度；完成後重跑整頁，讓轉錄文字帶入送出"""
+    if job.finished:
+        st.rerun()
+    st.progress(job.progress, text=f"🎧 語音辨識中（{job.done} / {job.total or '?'} 段），可以先繼續操作")
+
+
+def format_fields(fields: dict, review=()) -> str:
     if not fields:
         return "_無萃取欄位_"
 
@@ -125,7 +306,11 @@ def format_fields(fields: dict) -> str:
 
     for key, value in fields.items():
         icon = icon_map.get(key, "🔹")
-        html += f"<b>{icon} {key}</b>：{value}<br>"
+        if key in review:
+            # 正規化時無法確定的欄位（OCR 修正、格式不符或從原始文字萃取），提醒使用者確認
+            html += f"<b>{icon} {key}</b>：<span style='background-color:#fff3cd;'>{value}</span> ⚠️ 請確認<br>"
+        else:
+            html += f"<b>{icon} {key}</b>：{value}<br>"
 
     html += "</div>"
     return html
@@ -148,7 +333,7 @@ def run():
             st.rerun()
     with col2:
         if st.button("🚪 登出"):
-            st.session_state.clear()
+            logout()
             st.session_state["current_page"] = "login"
             st.rerun()
 
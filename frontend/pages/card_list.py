@@ -1,54 +1,205 @@
 import streamlit as st
-import requests
-from core.config import API_BASE
-
-st.subheader("📇 名片清單")
-
-# 根據身分決定是否顯示所有名片
-role = st.session_state.get("role", "user")
-username = st.session_state.get("username", "")
-headers = {"Authorization": f"Bearer {st.session_state['access_token']}"}
-
-# 查詢名片
-try:
-    if role == "admin":
-        res = requests.get(f"{API_BASE}/cards", headers=headers)
-    else:
-        res = requests.get(f"{API_BASE}/cards?username={username}", headers=headers)
-
-    cards = res.json()
-    if not cards:
-        st.info("尚未有名片資料")
-    else:
-        for card in cards:
-            with st.expander(f"📛 {card.get('name', '(無名)')} - {card.get('company_name', '(無公司)')}"):
-                st.write(f"✉️ Email: {card.get('email')}")
-                st.write(f"📞 Phone: {card.get('phone')}")
-                st.write(f"🏷️ Title: {card.get('title')}")
-                st.write(f"🏢 Company: {card.get('company_name')}")
-                st.write(f"📝 Raw Text: {card.get('raw_text')}")
-
-                col1, col2 = st.columns(2)
-                with col1:
-                    if st.button(f"✏️ 編輯 - {card['id']}", key=f"edit_{card['id']}"):
-                        st.session_state["edit_card_id"] = card['id']
-                        st.session_state["current_page"] = "ocr"  # 重新導向到編輯頁
-                        st.rerun()
-                with col2:
-                    if st.button(f"🗑️ 刪除 - {card['id']}", key=f"delete_{card['id']}"):
-                        confirm = st.radio(f"確定刪除 {card['name']} 的名片？", ("否", "是"), key=f"confirm_{card['id']}")
-                        if confirm == "是":
-                            del_res = requests.delete(f"{API_BASE}/cards/{card['id']}", headers=headers)
-                            if del_res.status_code == 200:
-                                st.success("✅ 已成功刪除名片")
-                                st.rerun()
-                            else:
-                                st.error("❌ 名片刪除失敗")
-
-except Exception as e:
-    st.error("❌ 讀取名片清單失敗")
-    st.code(str(e))
-
-# 匯出功能（未來可擴充）
-st.markdown("---")
-st.download_button("📤 匯出所有名片資料（JSON）", data=str(cards), file_name="cards.json")
+import pandas as pd
+from st_aggrid import AgGrid, GridOptionsBuilder, GridUpdateMode
+from services.card_service import fetch_card_page, search_card_page, iter_all_cards, delete_card
+from services.export_service import export_cards
+from core.config import CARD_PAGE_SIZE
+
+GRID_COLUMNS = {
+    "id": "ID",
+    "name": "姓名",
+    "company_name": "公司",
+    "title": "職稱",
+    "phone": "電話",
+    "email": "Email",
+}
+EXPORT_LABELS = {
+    "JSON Lines": "jsonl",
+    "CSV（Excel）": "csv",
+    "vCard 3.0": "vcf",
+}
+
+
+def render_card_detail(card, username):
+    st.markdown(f"#### 📛 {card.get('name', '(無名)')} - {card.get('company_name', '(無公司)')}")
+    st.write(f"✉️ Email: {card.get('email')}")
+    st.write(f"📞 Phone: {card.get('phone')}")
+    st.write(f"🏷️ Title: {card.get('title')}")
+    st.write(f"🏢 Company: {card.get('company_name')}")
+    st.write(f"📝 Raw Text: {card.get('raw_text')}")
+
+    col1, col2 = st.columns(2)
+    with col1:
+        if st.button(f"✏️ 編輯 - {card['id']}", key=f"edit_{card['id']}"):
+            st.session_state["edit_card_id"] = card['id']
+            st.session_state["current_page"] = "ocr"  # 重新導向到編輯頁
+            st.rerun()
+    with col2:
+        if st.button(f"🗑️ 刪除 - {card['id']}", key=f"delete_{card['id']}"):
+            st.session_state["confirm_delete_id"] = card["id"]
+
+    # 確認狀態存在 session_state；按下刪除後同一次 fragment rerun 就會顯示確認
+    if st.session_state.get("confirm_delete_id") == card["id"]:
+        st.warning(f"確定刪除 {card.get('name', '(無名)')} 的名片？")
+        c1, c2 = st.columns(2)
+        with c1:
+            if st.button("是，刪除", key=f"confirm_yes_{card['id']}"):
+                owner = card.get("username") or username
+                if delete_card(card["id"], owner):
+                    st.session_state.pop("confirm_delete_id", None)
+                    st.session_state["card_flash"] = f"✅ 已成功刪除名片 {card.get('name', '(無名)')}"
+                    # 清單內容變了，整頁重跑重新讀取
+                    st.rerun()
+                else:
+                    st.error("❌ 名片刪除失敗")
+        with c2:
+            if st.button("否", key=f"confirm_no_{card['id']}"):
+                st.session_state.pop("confirm_delete_id", None)
+                st.rerun(scope="fragment")
+
+
+@st.fragment
+def render_card_grid(cards, page, username):
+    """表格與選取的名片明細；選取、編輯、刪除確認都只重跑這一塊，不重新讀取名片與分頁"""
+    df = pd.DataFrame([{label: c.get(key, "") for key, label in GRID_COLUMNS.items()} for c in cards])
+    gb = GridOptionsBuilder.from_dataframe(df)
+    gb.configure_default_column(resizable=True, sortable=True, filter=True)
+    gb.configure_column("ID", width=80, pinned="left")
+    gb.configure_selection("single")
+    grid_response = AgGrid(
+        df,
+        gridOptions=gb.build(),
+        update_mode=GridUpdateMode.SELECTION_CHANGED,
+        theme="streamlit",
+        height=420,
+        fit_columns_on_grid_load=True,
+        key=f"card_grid_{page}"
+    )
+
+    selected = grid_response["selected_rows"]
+    if isinstance(selected, pd.DataFrame):
+        selected = selected.to_dict("records")
+    if selected:
+        card_id = selected[0]["ID"]
+        card = next((c for c in cards if c["id"] == card_id), None)
+        if card:
+            render_card_detail(card, username)
+
+
+def discard_export():
+    """關閉並移除產生好的匯出檔（下載後、重新產生或匯出選項改變時）"""
+    export = st.session_state.pop("card_export", None)
+    if export:
+        export["file"].close()
+
+
+def run():
+    st.subheader("📇 名片清單")
+
+    # 根據身分決定是否顯示所有名片
+    role = st.session_state.get("role", "user")
+    username = st.session_state.get("username", "")
+    company_name = st.session_state.get("company_name", "")
+    token = st.session_state.get("access_token")
+
+    flash = st.session_state.pop("card_flash", None)
+    if flash:
+        st.success(flash)
+
+    query = st.text_input("🔍 搜尋（姓名 / 公司 / 電話 / Email，支援繁簡）", key="card_query")
+    if st.session_state.get("card_last_query") != query:
+        st.session_state["card_last_query"] = query
+        st.session_state["card_page"] = 0
+    page = st.session_state.get("card_page", 0)
+
+    # 查詢名片：有關鍵字時查本機搜尋索引，否則只抓目前這一頁（依使用者快取）
+    cards = []
+    try:
+        if query.strip():
+            with st.spinner("🔍 搜尋中..."):
+                result = search_card_page(
+                    role,
+                    username,
+                    query,
+                    company_name=company_name,
+                    page=page,
+                    page_size=CARD_PAGE_SIZE,
+                    token=token
+                )
+        else:
+            result = fetch_card_page(
+                role,
+                username,
+                company_name=company_name,
+                page=page,
+                page_size=CARD_PAGE_SIZE,
+                token=token
+            )
+        cards = result["items"]
+        if not cards and page == 0:
+            st.info("找不到符合的名片" if query.strip() else "尚未有名片資料")
+        else:
+            total = result["total"]
+            page_count = f" / {(total - 1) // CARD_PAGE_SIZE + 1}" if total else ""
+            st.caption(f"第 {page + 1}{page_count} 頁" + (f"，共 {total} 張" if total else ""))
+
+            render_card_grid(cards, page, username)
+
+        col1, col2 = st.columns(2)
+        with col1:
+            if page > 0 and st.button("⬅️ 上一頁"):
+                st.session_state["card_page"] = page - 1
+                st.rerun()
+        with col2:
+            if result["has_more"] and st.button("下一頁 ➡️"):
+                st.session_state["card_page"] = page + 1
+                st.rerun()
+
+    except Exception as e:
+        st.error("❌ 讀取名片清單失敗")
+        st.code(str(e))
+
+    # 匯出功能：逐頁從後端讀取並串流寫檔，不會把所有名片一次載入記憶體
+    st.markdown("---")
+    col1, col2 = st.columns(2)
+    with col1:
+        fmt_label = st.selectbox("匯出格式", list(EXPORT_LABELS), key="export_format")
+    with col2:
+        compress = st.checkbox("gzip 壓縮", key="export_gzip")
+
+    export = st.session_state.get("card_export")
+    if export and export["options"] != (fmt_label, compress):
+        discard_export()
+
+    if st.button("📦 產生匯出檔"):
+        discard_export()
+        try:
+            with st.spinner("匯出中..."):
+                out, filename, mime, count = export_cards(
+                    iter_all_cards(role, username, company_name, token=token),
+                    EXPORT_LABELS[fmt_label],
+                    compress=compress
+                )
+            # 等待下載時只留磁碟上的暫存檔，不佔 session 的記憶體；下載或改變匯出選項時就關閉
+            out.rollover()
+            st.session_state["card_export"] = {
+                "options": (fmt_label, compress),
+                "file": out,
+                "filename": filename,
+                "mime": mime,
+                "count": count,
+            }
+        except Exception as e:
+            st.error("❌ 匯出失敗")
+            st.code(str(e))
+
+    export = st.session_state.get("card_export")
+    if export:
+        export["file"].seek(0)
+        st.download_button(
+            f"📤 下載 {export['filename']}（{export['count']} 筆）",
+            data=export["file"].read(),
+            file_name=export["filename"],
+            mime=export["mime"],
+            on_click=discard_export
+        )
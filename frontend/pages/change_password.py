@@ -1,18 +1,19 @@
 import streamlit as st
-import requests
-from core.config import API_BASE
+from api.client import get_client
+from services.user_service import list_users, users_scope, UserApiError
 
 def run():
     st.title("修改密碼")
 
     # 取得所有帳號
     try:
-        res = requests.get(f"{API_BASE}/get_users")
-        if res.status_code == 200:
-            users = res.json()
-        else:
-            st.error("❌ 無法取得使用者清單")
-            return
+        users = list_users(
+            users_scope(st.session_state.get("username", ""), st.session_state.get("company_name", "")),
+            path="/get_users"
+        )
+    except UserApiError:
+        st.error("❌ 無法取得使用者清單")
+        return
     except Exception as e:
         st.error("❌ 發生錯誤")
         st.code(str(e))
@@ -32,8 +33,8 @@ def run():
             st.warning("⚠️ 密碼不可為空")
         else:
             try:
-                res = requests.put(
-                    f"{API_BASE}/update_password",
+                res = get_client().put(
+                    "/update_password",
                     params={"username": selected_user, "new_password": new_pass}
                 )
                 if res.status_code == 200:
@@ -44,4 +45,4 @@ def run():
                 st.error("❌ 更新錯誤")
                 st.code(str(e))
 
-st.button("⬅️ 返回首頁", on_click=lambda: st.session_state.update(current_page="home"))
+    st.button("⬅️ 返回首頁", on_click=lambda: st.session_state.update(current_page="home"))
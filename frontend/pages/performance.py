@@ -0,0 +1,106 @@
+import streamlit as st
+from api.client import get_client
+from api.limiter import limiter_stats, prometheus as limiter_prometheus
+from core.metrics import get_metrics, RERUN
+from core.profiler import get_import_profiler
+from frontend.registry import PAGES
+from services.auth_service import is_logged_in
+from services.job_scheduler import get_scheduler
+from services.ocr_cache import get_ocr_cache
+from services.result_store import store_usage
+
+
+def run():
+    st.title("📈 效能監控")
+
+    if not is_logged_in() or st.session_state.get("role") != "admin":
+        st.error("❌ 僅限管理員使用")
+        st.stop()
+
+    if st.button("🔙 返回首頁"):
+        st.session_state["current_page"] = "home"
+        st.rerun()
+    st.button("🔄 重新整理")
+
+    metrics = get_metrics()
+    st.caption(f"統計範圍：本 process 最近 {metrics.size} 筆紀錄（所有 session 共用）")
+
+    # ------------------------
+    # 後端 API
+    # ------------------------
+    st.subheader("🌐 後端 API")
+    rows = metrics.summary()
+    if rows:
+        st.dataframe(rows, use_container_width=True, hide_index=True)
+    else:
+        st.info("尚無後端請求紀錄")
+
+    st.markdown("#### 🐢 最慢的請求")
+    slowest = metrics.slowest(20)
+    if slowest:
+        st.dataframe(slowest, use_container_width=True, hide_index=True)
+
+    st.markdown("#### 🚦 併發上限與斷路器")
+    limiters = limiter_stats()
+    if limiters:
+        st.dataframe(limiters, use_container_width=True, hide_index=True)
+        for row in limiters:
+            if row["state"] != "closed":
+                st.warning(f"⚠️ {row['endpoint']} 斷路器{'開啟中，請求會直接失敗' if row['state'] == 'open' else '半開，正在探測後端'}")
+    else:
+        st.caption("尚未呼叫 /ocr/ 或 /whisper")
+
+    # ------------------------
+    # 頁面 rerun
+    # ------------------------
+    st.subheader("🖥️ 頁面 rerun 耗時")
+    reruns = metrics.summary(kind=RERUN)
+    for row in reruns:
+        page = PAGES.get(row["name"])
+        row["name"] = page.title if page else row["name"]
+        for key in ("error_rate", "bytes_out", "bytes_in", "status"):
+            row.pop(key)
+    if reruns:
+        st.dataframe(reruns, use_container_width=True, hide_index=True)
+
+    # ------------------------
+    # 背景工作與快取
+    # ------------------------
+    st.subheader("⚙️ 背景工作與快取")
+    col1, col2 = st.columns(2)
+    with col1:
+        st.markdown("**背景工作排程器**")
+        st.json(get_scheduler().stats())
+    with col2:
+        st.markdown("**OCR 快取**")
+        cache = get_ocr_cache()
+        if cache is not None:
+            st.json(cache.stats())
+        else:
+            st.caption("OCR 快取未啟用")
+
+    st.markdown("**GET 回應快取（ETag）**")
+    st.json(get_client().cache.stats())
+
+    usage = store_usage()
+    st.markdown("**暫存辨識結果（各 session）**")
+    st.caption(
+        f"記憶體 {usage['memory_bytes'] / 1024 / 1024:.1f}MB / {usage['global_budget'] / 1024 / 1024:.0f}MB，"
+        f"磁碟暫存 {usage['spilled_bytes'] / 1024 / 1024:.1f}MB，共 {usage['records']} 筆"
+    )
+    if usage["sessions"]:
+        st.dataframe(usage["sessions"], use_container_width=True, hide_index=True)
+
+    profiler = get_import_profiler()
+    if profiler is not None:
+        with st.expander("📦 import 耗時（IMPORT_PROFILE=1）"):
+            st.json(profiler.top_level_cost())
+            st.dataframe(profiler.report(top=30), use_container_width=True, hide_index=True)
+
+    # ------------------------
+    # Prometheus 匯出
+    # ------------------------
+    with st.expander("📤 Prometheus 格式匯出"):
+        text = metrics.prometheus() + limiter_prometheus()
+        st.code(text, language="text")
+        st.download_button("⬇️ 下載 metrics.prom", text, file_name="metrics.prom", mime="text/plain")
@@ -0,0 +1,70 @@
+# frontend/registry.py
+
+import importlib
+import threading
+import time
+
+import streamlit as st
+
+from core.metrics import record_rerun
+from core.profiler import get_import_profiler
+
+
+class Page:
+    """一個頁面：模組只 import 一次，之後每次 rerun 都呼叫它的 run()"""
+
+    def __init__(self, module, title, admin_only=False):
+        self.module = module
+        self.title = title
+        self.admin_only = admin_only
+        self.import_ms = None
+
+
+# current_page -> 頁面；pandas / st_aggrid 等重量級套件只在用到的頁面模組中 import
+PAGES = {
+    "account_manage": Page("frontend.pages.account_manager", "帳號管理", admin_only=True),
+    "add_card": Page("frontend.pages.add_card", "新增名片"),
+    "card_list": Page("frontend.pages.card_list", "名片清單"),
+    "change_password": Page("frontend.pages.change_password", "修改密碼"),
+    "performance": Page("frontend.pages.performance", "效能監控", admin_only=True),
+}
+
+_loaded = {}
+_load_lock = threading.Lock()
+
+
+def load_page(name):
+    """import 頁面模組（每個 process 只做一次），並記錄 import 耗時"""
+    module = _loaded.get(name)
+    if module is not None:
+        return module
+    page = PAGES[name]
+    with _load_lock:
+        if name not in _loaded:
+            start = time.perf_counter()
+            _loaded[name] = importlib.import_module(page.module)
+            page.import_ms = (time.perf_counter() - start) * 1000
+            if get_import_profiler() is not None:
+                print(f"📦 載入頁面 {page.module}：{page.import_ms:.0f}ms")
+    return _loaded[name]
+
+
+def render_page(name, role="user"):
+    """執行頁面並記錄本次 rerun 耗時；回傳 False 代表沒有這個頁面
+
+    admin_only 的頁面在 role 不是 admin 時直接拒絕，不載入頁面模組。
+    """
+    page = PAGES.get(name)
+    if page is None:
+        return False
+    if page.admin_only and role != "admin":
+        st.error(f"🚫 「{page.title}」僅限管理員使用")
+        return True
+    module = load_page(name)
+    start = time.perf_counter()
+    try:
+        module.run()
+    finally:
+        # st.rerun() / st.stop() 以例外中斷 run()，同樣計入
+        record_rerun(name, time.perf_counter() - start)
+    return True
@@ -0,0 +1,55 @@
+# models/ocr_result.py
+
+import json
+
+# 每筆紀錄的固定開銷估計（物件本身 + slots + 小字串）
+_RECORD_OVERHEAD = 200
+
+
+class OcrResult:
+    """暫存中的單張名片辨識結果
+
+    以 __slots__ 儲存，fields 存成 (key, value) tuple，比 dict 版本省下每筆的 __dict__
+    與雜湊表；nbytes 為建立時估算的記憶體用量，供 ResultStore 計算預算。
+    review 為正規化時標記需要人工確認的欄位名稱。
+    """
+
+    __slots__ = ("filename", "raw_text", "hash", "_fields", "review", "nbytes")
+
+    def __init__(self, filename, raw_text="", fields=None, hash=None, review=()):
+        self.filename = filename
+        self.raw_text = raw_text or ""
+        self.hash = hash
+        self._fields = tuple((fields or {}).items())
+        self.review = tuple(review or ())
+        self.nbytes = (
+            _RECORD_OVERHEAD
+            + len(self.filename.encode("utf-8"))
+            + len(self.raw_text.encode("utf-8"))
+            + sum(len(str(k).encode("utf-8")) + len(str(v).encode("utf-8")) for k, v in self._fields)
+        )
+
+    @property
+    def fields(self):
+        return dict(self._fields)
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["filename"], data.get("raw_text", ""), data.get("fields"), data.get("hash"),
+                   data.get("review"))
+
+    def to_dict(self):
+        """轉回 ocr_image() 的 dict 格式（送出到後端時使用）"""
+        data = {"filename": self.filename, "raw_text": self.raw_text, "fields": self.fields}
+        if self.hash is not None:
+            data["hash"] = self.hash
+        if self.review:
+            data["review"] = list(self.review)
+        return data
+
+    def dumps(self):
+        return json.dumps(self.to_dict(), ensure_ascii=False)
+
+    @classmethod
+    def loads(cls, text):
+        return cls.from_dict(json.loads(text))
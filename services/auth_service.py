@@ -1,10 +1,7 @@
-import os
 import streamlit as st
-import requests
-import psycopg2
-from core.config import API_BASE
-
-DB_URL = os.getenv("DB_URL")
+from api.client import get_client
+from core.config import DB_URL
+from services.result_store import close_result_store
 
 # ✅ 建立新帳號
 def create_user(username, password, company_name=None, is_admin=False):
@@ -15,7 +12,7 @@ def create_user(username, password, company_name=None, is_admin=False):
         "is_admin": is_admin
     }
     try:
-        res = requests.post(f"{API_BASE}/register", json=payload)
+        res = get_client().post("/register", json=payload, auth=False)
         if res.status_code == 200:
             return True
         else:
@@ -26,9 +23,10 @@ def create_user(username, password, company_name=None, is_admin=False):
 # ✅ 登入驗證 + 寫入 token 與 user_info
 def check_login(username, password):
     try:
-        res = requests.post(
-            f"{API_BASE}/login",
-            json={"username": username, "password": password}
+        res = get_client().post(
+            "/login",
+            json={"username": username, "password": password},
+            auth=False
         )
         if res.status_code == 200:
             data = res.json()
@@ -53,6 +51,8 @@ def check_login(username, password):
 
 # ✅ 測試資料庫連線
 def test_db_connection():
+    import psycopg2  # 只有這裡用到，延後 import 以縮短冷啟動
+
     try:
         conn = psycopg2.connect(DB_URL)
         conn.close()
@@ -70,8 +70,13 @@ def is_logged_in():
         return user_info
     return None
 
+# ✅ 登出：先釋放暫存的辨識結果（含磁碟暫存檔），再清空 session
+def logout():
+    close_result_store()
+    st.session_state.clear()
+
 # ✅ 登出按鈕
 def logout_button():
     if st.button("🔓 登出", key="logout_button"):
-        st.session_state.clear()
+        logout()
         st.rerun()
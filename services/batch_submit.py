@@ -0,0 +1,198 @@
+# services/batch_submit.py
+
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+from urllib3.exceptions import NewConnectionError
+
+from api.client import get_client
+from core.config import (
+    SUBMIT_CONCURRENCY,
+    SUBMIT_CHUNK_SIZE,
+    SUBMIT_MAX_ATTEMPTS,
+    SUBMIT_BACKOFF,
+    SUBMIT_BULK,
+)
+
+# 只重試「確定後端沒有處理」的情況，避免 POST 重送造成重複寫入
+TRANSIENT_STATUS = (429, 503)
+
+
+def build_payload(record, uid, note=""):
+    payload = {
+        "user_id": uid,
+        "raw_text": record["raw_text"],
+        "filename": record["filename"],
+        "fields": record["fields"]
+    }
+    if note:
+        payload["note"] = note
+    return payload
+
+
+def _not_sent(error):
+    """連線還沒建立就失敗（連不上 / 連線逾時），後端一定沒有收到請求，可以安全重送
+
+    連線後才中斷（RemoteDisconnected、connection reset）時後端可能已寫入，不能重送。
+    """
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    reason = error.args[0] if error.args else None
+    reason = getattr(reason, "reason", reason)     # urllib3 的 MaxRetryError 包著實際原因
+    return isinstance(reason, NewConnectionError)
+
+
+def _backoff(attempt, backoff):
+    time.sleep(backoff * (2 ** attempt) * (0.5 + random.random()))
+
+
+def _post_with_retry(path, json, token, max_attempts, backoff):
+    """POST 並在暫時性錯誤時指數退避重試，回傳 (status_code, response 或錯誤訊息)"""
+    last = (None, "未送出")
+    for attempt in range(max_attempts):
+        try:
+            res = get_client().post(path, json=json, token=token)
+        except requests.ConnectionError as e:
+            if not _not_sent(e):
+                return None, str(e)
+            last = (None, str(e))
+        except requests.RequestException as e:
+            return None, str(e)
+        else:
+            if res.status_code not in TRANSIENT_STATUS:
+                return res.status_code, res
+            last = (res.status_code, res)
+        if attempt < max_attempts - 1:
+            _backoff(attempt, backoff)
+    return last
+
+
+class SubmitReport:
+    """每筆紀錄的送出結果：statuses[i] = (ok, 狀態碼或錯誤訊息)"""
+
+    def __init__(self, total):
+        self.statuses = [None] * total
+        self.created = []       # 後端有回傳 id 的新名片，供搜尋索引增量更新
+        self.card_ids = {}      # 紀錄位置 -> 新名片 id（後端有回傳 id 時）
+        self.elapsed = 0.0
+
+    def set(self, index, ok, detail):
+        """成功時 detail 為新名片 dict（或 None），失敗時為狀態碼或錯誤訊息"""
+        if ok:
+            if detail:
+                self.created.append(detail)
+                self.card_ids[index] = detail["id"]
+            detail = 200
+        self.statuses[index] = (ok, detail)
+
+    @property
+    def success(self):
+        return sum(1 for s in self.statuses if s and s[0])
+
+    @property
+    def failed_indexes(self):
+        return [i for i, s in enumerate(self.statuses) if not s or not s[0]]
+
+    @property
+    def records_per_sec(self):
+        return len(self.statuses) / self.elapsed if self.elapsed > 0 else 0.0
+
+
+def _created_card(payload, data):
+    """後端回傳 {"id": ...} 時組出新名片 dict，否則回傳 None"""
+    if not isinstance(data, dict) or data.get("id") is None:
+        return None
+    card = {"raw_text": payload["raw_text"], **(payload.get("fields") or {})}
+    card.update(data)
+    return card
+
+
+def _submit_one(index, payload, token, max_attempts, backoff):
+    status, res = _post_with_retry("/ocr", payload, token, max_attempts, backoff)
+    if status == 200:
+        try:
+            card = _created_card(payload, res.json())
+        except ValueError:
+            card = None
+        return [(index, True, card)]
+    detail = status if status is not None else res
+    return [(index, False, detail)]
+
+
+def _submit_bulk(indexes, payloads, token, max_attempts, backoff):
+    """POST /ocr/bulk 一次送出整個 chunk；後端回傳 {"results": [{"ok": bool, "card": {...}}]}
+
+    後端尚未支援（404 / 405）時回傳 None，由呼叫端改為逐筆送出。
+    """
+    status, res = _post_with_retry("/ocr/bulk", {"records": payloads}, token, max_attempts, backoff)
+    if status in (404, 405):
+        return None
+    if status != 200:
+        detail = status if status is not None else res
+        return [(i, False, detail) for i in indexes]
+
+    try:
+        data = res.json()
+    except ValueError:
+        return [(i, False, "後端回傳的不是 JSON") for i in indexes]
+    results = data.get("results", []) if isinstance(data, dict) else []
+    out = []
+    for pos, i in enumerate(indexes):
+        item = results[pos] if pos < len(results) else {}
+        ok = bool(item.get("ok"))
+        detail = _created_card(payloads[pos], item.get("card")) if ok else item.get("error", "後端未回傳結果")
+        out.append((i, ok, detail))
+    return out
+
+
+def submit_records(records, uid, note="", token=None, concurrency=SUBMIT_CONCURRENCY,
+                   chunk_size=SUBMIT_CHUNK_SIZE, bulk=SUBMIT_BULK, max_attempts=SUBMIT_MAX_ATTEMPTS,
+                   backoff=SUBMIT_BACKOFF, on_progress=None):
+    """併發送出多筆辨識結果到 /ocr，回傳 SubmitReport
+
+    逐筆模式（預設）每筆一個 POST /ocr，同時在途的請求數由 concurrency 限制；chunk_size 只用於
+    bulk=True，每 chunk_size 筆以一次 /ocr/bulk 送出，後端不支援時自動退回逐筆送出。
+    on_progress(done, total) 在呼叫端執行緒中被呼叫。
+    """
+    payloads = [build_payload(r, uid, note) for r in records]
+    report = SubmitReport(len(payloads))
+    start = time.perf_counter()
+    done = 0
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="submit") as pool:
+        futures = {}
+        if bulk:
+            for lo in range(0, len(payloads), max(1, chunk_size)):
+                indexes = list(range(lo, min(lo + chunk_size, len(payloads))))
+                fut = pool.submit(_submit_bulk, indexes, [payloads[i] for i in indexes],
+                                  token, max_attempts, backoff)
+                futures[fut] = indexes
+        else:
+            for i, payload in enumerate(payloads):
+                futures[pool.submit(_submit_one, i, payload, token, max_attempts, backoff)] = [i]
+
+        fallback = []
+        for fut in as_completed(futures):
+            outcome = fut.result()
+            if outcome is None:
+                fallback.extend(futures[fut])
+                continue
+            for i, ok, detail in outcome:
+                report.set(i, ok, detail)
+            done += len(outcome)
+            if on_progress:
+                on_progress(done, len(payloads))
+
+        fallback_futures = [pool.submit(_submit_one, i, payloads[i], token, max_attempts, backoff)
+                            for i in fallback]
+        for fut in as_completed(fallback_futures):
+            for i, ok, detail in fut.result():
+                report.set(i, ok, detail)
+            done += 1
+            if on_progress:
+                on_progress(done, len(payloads))
+
+    report.elapsed = time.perf_counter() - start
+    return report
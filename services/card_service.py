@@ -0,0 +1,188 @@
+# services/card_service.py
+
+import logging
+import threading
+
+import streamlit as st
+
+from api.client import get_client
+from core.config import CARD_PAGE_SIZE, CARD_CACHE_TTL
+from services.db_reads import get_db_reader
+from services.image_dedup import get_dedup_index
+from services.search_index import (
+    get_search_index,
+    build_search_index,
+    index_card_added,
+    index_card_removed,
+    drop_search_index,
+)
+
+logger = logging.getLogger(__name__)
+
+ALL_CARDS = "__all__"
+
+# 每個使用者（或管理員的全部名片）一個版本號；資料異動時遞增，讓 st.cache_data 的 key 失效
+_versions = {}
+_versions_lock = threading.Lock()
+
+
+class CardApiError(Exception):
+    """後端 /cards 回傳錯誤"""
+
+
+def card_scope(role, username, company_name=""):
+    """快取範圍：一般使用者看自己的名片；管理員依公司（租戶）區分"""
+    return f"{ALL_CARDS}:{company_name}" if role == "admin" else username
+
+
+def cache_version(scope):
+    with _versions_lock:
+        if scope.startswith(ALL_CARDS):
+            return _versions.get(ALL_CARDS, 0)
+        return _versions.get(scope, 0)
+
+
+def invalidate_cards(username=None):
+    """名片新增 / 編輯 / 刪除後呼叫，讓該使用者與管理員的分頁快取及 HTTP 回應快取失效"""
+    with _versions_lock:
+        for scope in {ALL_CARDS, username or ALL_CARDS}:
+            _versions[scope] = _versions.get(scope, 0) + 1
+    cache = get_client().cache
+    if username:
+        cache.invalidate(scope=f"cards:{username}", prefix=f"cards:{ALL_CARDS}")
+    else:
+        cache.invalidate(prefix="cards:")
+
+
+def _normalize_page(data, offset, limit):
+    """後端可能回傳 {"items", "total"} 或純 list；不支援分頁參數時在本地切片"""
+    if isinstance(data, dict):
+        items = data.get("items", [])
+        total = data.get("total")
+    else:
+        items = data or []
+        total = None
+        if len(items) > limit:
+            total = len(items)
+            items = items[offset:offset + limit]
+    has_more = (offset + len(items) < total) if total is not None else len(items) == limit
+    return {"items": items, "total": total, "has_more": has_more}
+
+
+def _db_company(scope):
+    """可以直接讀資料庫的範圍 -> 公司（租戶）；一般使用者或沒有公司的範圍回傳 None（走後端 API）
+
+    直接讀資料庫會略過後端的 token 權限檢查，因此只給管理員，且一律以公司篩選。
+    """
+    if not scope.startswith(ALL_CARDS + ":"):
+        return None
+    return scope[len(ALL_CARDS) + 1:] or None
+
+
+@st.cache_data(ttl=CARD_CACHE_TTL, show_spinner=False, max_entries=1000)
+def _fetch_page(scope, page, page_size, query, version, _token):
+    offset = page * page_size
+    company = _db_company(scope)
+    reader = get_db_reader() if company else None
+    if reader is not None:
+        try:
+            data = reader.card_page(company, page_size, offset, query)
+            return _normalize_page(data, offset, page_size)
+        except Exception as e:
+            logger.warning("資料庫讀取失敗，改用後端 API：%s", e)
+
+    params = {"limit": page_size, "offset": offset}
+    if not scope.startswith(ALL_CARDS):
+        params["username"] = scope
+    if query:
+        params["q"] = query
+    # st.cache_data 過期後以 ETag 重新驗證，名片沒有變動時後端只需回 304
+    status, data = get_client().get_json("/cards", f"cards:{scope}", params=params, token=_token)
+    if status != 200:
+        raise CardApiError(f"狀態碼 {status}")
+    return _normalize_page(data, offset, page_size)
+
+
+def fetch_card_page(role, username, company_name="", page=0, page_size=CARD_PAGE_SIZE, query="", token=None):
+    """取得一頁名片，依 (使用者 / 租戶, 查詢, 頁碼) 快取；回傳 {items, total, has_more}"""
+    scope = card_scope(role, username, company_name)
+    return _fetch_page(scope, page, page_size, query.strip(), cache_version(scope), token)
+
+
+def iter_all_cards(role, username, company_name="", page_size=500, token=None):
+    """逐頁讀出所有名片（不經 st.cache_data），供建立搜尋索引 / 匯出使用
+
+    管理員且有設定 DB_URL 時直接以 server-side cursor 從資料庫串流（依公司篩選）。
+    """
+    scope = card_scope(role, username, company_name)
+    company = _db_company(scope)
+    reader = get_db_reader() if company else None
+    if reader is not None:
+        started = False
+        try:
+            for card in reader.iter_cards(company):
+                started = True
+                yield card
+            return
+        except Exception as e:
+            if started:
+                raise CardApiError(f"資料庫讀取中斷：{e}") from e
+            logger.warning("資料庫讀取失敗，改用後端 API：%s", e)
+
+    page = 0
+    while True:
+        params = {"limit": page_size, "offset": page * page_size}
+        if not scope.startswith(ALL_CARDS):
+            params["username"] = scope
+        res = get_client().get("/cards", params=params, token=token)
+        if res.status_code != 200:
+            raise CardApiError(f"狀態碼 {res.status_code}")
+        result = _normalize_page(res.json(), params["offset"], page_size)
+        yield from result["items"]
+        if not result["has_more"]:
+            break
+        page += 1
+
+
+def _card_search_index(role, username, company_name="", token=None):
+    """該範圍的本機倒排索引；第一次搜尋時才從後端載入並建立"""
+    scope = card_scope(role, username, company_name)
+    index = get_search_index(scope)
+    if index is None:
+        index = build_search_index(scope, iter_all_cards(role, username, company_name, token=token))
+    return index
+
+
+def search_cards(role, username, query, company_name="", token=None, limit=200):
+    """在本機倒排索引中搜尋名片，回傳依相關度排序的前 limit 筆"""
+    return _card_search_index(role, username, company_name, token).search(query, limit=limit)
+
+
+def search_card_page(role, username, query, company_name="", page=0, page_size=CARD_PAGE_SIZE, token=None):
+    """搜尋結果的一頁，格式與 fetch_card_page 相同；total 為全部符合的筆數"""
+    index = _card_search_index(role, username, company_name, token)
+    return index.search_page(query, page * page_size, page_size)
+
+
+def cards_added(username, company_name="", cards=None):
+    """一鍵送出後呼叫：分頁快取失效，有 id 的新名片直接加入搜尋索引，否則讓索引重建"""
+    invalidate_cards(username)
+    scopes = [card_scope("user", username), card_scope("admin", username, company_name)]
+    if cards:
+        for card in cards:
+            index_card_added(card, scopes)
+    else:
+        drop_search_index(scopes)
+
+
+def delete_card(card_id, username, token=None):
+    res = get_client().delete(f"/cards/{card_id}", token=token)
+    if res.status_code == 200:
+        invalidate_cards(username)
+        index_card_removed(card_id)
+        # 名片刪除後，同一張圖片可以再次上傳
+        index = get_dedup_index(username)
+        if index is not None:
+            index.remove([card_id])
+        return True
+    return False
@@ -0,0 +1,163 @@
+# services/db_reads.py
+
+import logging
+import threading
+import uuid
+from contextlib import contextmanager
+
+from core.config import (
+    DB_URL,
+    DB_READS_ENABLED,
+    DB_POOL_MIN,
+    DB_POOL_MAX,
+    DB_FETCH_SIZE,
+    DB_CARDS_TABLE,
+    DB_USERS_TABLE,
+)
+
+logger = logging.getLogger(__name__)
+
+# 名片清單的欄位；username 由 users 表 join 而來，與後端 /cards 回傳的格式一致
+# 直接讀資料庫會略過後端以 token 做的權限檢查，因此只提供管理員使用，且一律以公司（租戶）篩選
+CARD_COLUMNS = ("id", "name", "company_name", "title", "phone", "email", "note", "raw_text")
+USER_COLUMNS = ("id", "username", "is_admin", "is_active", "note", "company_name")
+
+
+def _statements():
+    """(名稱, SQL)；參數以 $n 表示，第一次在某條連線上使用時才 PREPARE；所有查詢都必須帶公司條件"""
+    from psycopg2 import sql
+
+    cards = sql.Identifier(DB_CARDS_TABLE)
+    users = sql.Identifier(DB_USERS_TABLE)
+    card_cols = sql.SQL(", ").join(sql.SQL("c.") + sql.Identifier(col) for col in CARD_COLUMNS)
+    user_cols = sql.SQL(", ").join(sql.Identifier(col) for col in USER_COLUMNS)
+    # $1 公司（租戶）、$2 ILIKE 樣式（NULL = 不篩選，% _ \ 已跳脫）
+    card_filter = sql.SQL(
+        "u.company_name = $1 AND ($2::text IS NULL OR c.name ILIKE $2 "
+        "OR c.company_name ILIKE $2 OR c.phone ILIKE $2 OR c.email ILIKE $2)"
+    )
+    return {
+        "card_page": sql.SQL(
+            "SELECT {cols}, u.username, count(*) OVER () AS _total FROM {cards} c "
+            "JOIN {users} u ON u.id = c.user_id WHERE {filter} ORDER BY c.id DESC LIMIT $3 OFFSET $4"
+        ).format(cols=card_cols, cards=cards, users=users, filter=card_filter),
+        "user_list": sql.SQL("SELECT {cols} FROM {users} WHERE company_name = $1 ORDER BY id").format(
+            cols=user_cols, users=users),
+        # server-side cursor 不能 DECLARE ... FOR EXECUTE，串流時改用一般參數化查詢（%s）
+        "card_stream": sql.SQL(
+            "SELECT {cols}, u.username FROM {cards} c JOIN {users} u ON u.id = c.user_id "
+            "WHERE u.company_name = %(company)s ORDER BY c.id DESC"
+        ).format(cols=card_cols, cards=cards, users=users),
+    }
+
+
+def escape_like(text):
+    """跳脫 LIKE / ILIKE 的萬用字元，使用者輸入的 % _ 只比對字面"""
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+class DbReader:
+    """唯讀的 PostgreSQL 存取：ThreadedConnectionPool + 每條連線各自 PREPARE 的查詢
+
+    - 分頁、使用者清單等小結果集以 EXECUTE 執行已 prepare 的查詢，省去每次的解析與規劃
+    - 全部名片（建立搜尋索引 / 匯出）以 server-side named cursor 分批串流，不會整批載入記憶體
+    """
+
+    def __init__(self, dsn=DB_URL, minconn=DB_POOL_MIN, maxconn=DB_POOL_MAX, fetch_size=DB_FETCH_SIZE):
+        import psycopg2.extensions
+        from psycopg2.pool import ThreadedConnectionPool
+
+        class _Connection(psycopg2.extensions.connection):
+            """記錄這條連線上已 PREPARE 的查詢名稱"""
+
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, **kwargs)
+                self.prepared = set()
+                self.set_session(readonly=True)
+
+        self.fetch_size = fetch_size
+        self._pool = ThreadedConnectionPool(minconn, maxconn, dsn, connection_factory=_Connection)
+        # 連線池用完時 getconn() 會直接丟例外，先以 semaphore 排隊
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._sql = None
+
+    def _statement(self, name):
+        if self._sql is None:
+            self._sql = _statements()
+        return self._sql[name]
+
+    @contextmanager
+    def _connection(self):
+        """借出一條連線；歸還時連線池會 rollback 未結束的交易，斷線的連線直接關閉"""
+        with self._slots:
+            conn = self._pool.getconn()
+            try:
+                yield conn
+            finally:
+                self._pool.putconn(conn, close=bool(conn.closed))
+
+    def _execute(self, name, params):
+        """以 EXECUTE 執行已 prepare 的查詢，回傳 [dict]"""
+        from psycopg2.extras import RealDictCursor
+
+        with self._connection() as conn:
+            with conn.cursor(cursor_factory=RealDictCursor) as cur:
+                if name not in conn.prepared:
+                    cur.execute(f"PREPARE {name} AS {self._statement(name).as_string(conn)}")
+                    conn.prepared.add(name)
+                if params:
+                    placeholders = ", ".join(["%s"] * len(params))
+                    cur.execute(f"EXECUTE {name} ({placeholders})", params)
+                else:
+                    cur.execute(f"EXECUTE {name}")
+                return cur.fetchall()
+
+    def card_page(self, company, limit=100, offset=0, query=""):
+        """公司（租戶）的一頁名片，與 GET /cards 相同的格式：{"items": [...], "total": n}"""
+        pattern = f"%{escape_like(query)}%" if query else None
+        rows = self._execute("card_page", (company, pattern, limit, offset))
+        total = rows[0]["_total"] if rows else (0 if offset == 0 else None)
+        items = []
+        for row in rows:
+            row = dict(row)
+            row.pop("_total", None)
+            items.append(row)
+        return {"items": items, "total": total}
+
+    def iter_cards(self, company):
+        """以 server-side cursor 逐批讀出公司（租戶）的名片"""
+        from psycopg2.extras import RealDictCursor
+
+        with self._connection() as conn:
+            with conn.cursor(name=f"cards_{uuid.uuid4().hex}", cursor_factory=RealDictCursor) as cur:
+                cur.itersize = self.fetch_size
+                cur.execute(self._statement("card_stream"), {"company": company})
+                for row in cur:
+                    yield dict(row)
+
+    def users(self, company):
+        return [dict(row) for row in self._execute("user_list", (company,))]
+
+    def close(self):
+        self._pool.closeall()
+
+
+_reader = None
+_reader_failed = False
+_reader_lock = threading.Lock()
+
+
+def get_db_reader():
+    """取得共用的 DbReader；未設定 DB_URL、停用或無法連線時回傳 None（呼叫端改走 HTTP API）"""
+    global _reader, _reader_failed
+    if not DB_URL or not DB_READS_ENABLED or _reader_failed:
+        return None
+    if _reader is None:
+        with _reader_lock:
+            if _reader is None and not _reader_failed:
+                try:
+                    _reader = DbReader()
+                except Exception as e:
+                    logger.warning("無法建立資料庫連線池，改用後端 API：%s", e)
+                    _reader_failed = True
+    return _reader
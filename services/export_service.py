@@ -0,0 +1,120 @@
+# services/export_service.py
+
+import csv
+import gzip
+import io
+import json
+import tempfile
+
+CSV_COLUMNS = ["id", "name", "company_name", "title", "phone", "email", "note", "raw_text"]
+CSV_HEADERS = ["ID", "姓名", "公司", "職稱", "電話", "Email", "備註", "原始文字"]
+
+# 匯出檔超過這個大小才寫到磁碟，小檔直接留在記憶體
+SPOOL_MAX_BYTES = 8 * 1024 * 1024
+
+EXPORT_FORMATS = {
+    "jsonl": ("cards.jsonl", "application/x-ndjson"),
+    "csv": ("cards.csv", "text/csv"),
+    "vcf": ("cards.vcf", "text/vcard"),
+}
+
+
+def iter_jsonl(cards):
+    for card in cards:
+        yield json.dumps(card, ensure_ascii=False, default=str) + "\n"
+
+
+def iter_csv(cards):
+    """UTF-8 BOM 開頭，Excel 開啟中文不會亂碼"""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(CSV_HEADERS)
+    yield "\ufeff" + buf.getvalue()
+    for card in cards:
+        buf.seek(0)
+        buf.truncate()
+        writer.writerow(["" if card.get(col) is None else card.get(col) for col in CSV_COLUMNS])
+        yield buf.getvalue()
+
+
+def _vcard_escape(value):
+    return (str(value).replace("\\", "\\\\").replace(",", "\\,")
+            .replace(";", "\\;").replace("\r\n", "\\n").replace("\n", "\\n"))
+
+
+def _vcard_fold(line):
+    """依 RFC 2425 以 75 octets 折行（不切斷 UTF-8 字元）"""
+    out = []
+    current = ""
+    size = 0
+    for ch in line:
+        n = len(ch.encode("utf-8"))
+        if size + n > 75:
+            out.append(current)
+            current = " "
+            size = 1
+        current += ch
+        size += n
+    out.append(current)
+    return "\r\n".join(out)
+
+
+def iter_vcard(cards):
+    """vCard 3.0"""
+    for card in cards:
+        name = card.get("name") or ""
+        lines = [
+            "BEGIN:VCARD",
+            "VERSION:3.0",
+            f"FN:{_vcard_escape(name)}",
+            f"N:{_vcard_escape(name)};;;;",
+        ]
+        if card.get("company_name"):
+            lines.append(f"ORG:{_vcard_escape(card['company_name'])}")
+        if card.get("title"):
+            lines.append(f"TITLE:{_vcard_escape(card['title'])}")
+        if card.get("phone"):
+            lines.append(f"TEL;TYPE=WORK,VOICE:{_vcard_escape(card['phone'])}")
+        if card.get("email"):
+            lines.append(f"EMAIL;TYPE=INTERNET:{_vcard_escape(card['email'])}")
+        if card.get("note"):
+            lines.append(f"NOTE:{_vcard_escape(card['note'])}")
+        lines.append("END:VCARD")
+        yield "".join(_vcard_fold(line) + "\r\n" for line in lines)
+
+
+_WRITERS = {
+    "jsonl": iter_jsonl,
+    "csv": iter_csv,
+    "vcf": iter_vcard,
+}
+
+
+def export_cards(cards, fmt="jsonl", compress=False):
+    """把名片 iterable 串流寫成匯出檔，回傳 (檔案物件, 檔名, MIME, 筆數)
+
+    cards 可以是逐頁從後端讀取的 generator；記憶體中只會有目前這一筆與寫入緩衝。
+    回傳的檔案物件已 seek 到開頭，用完請 close()。
+    """
+    if fmt not in _WRITERS:
+        raise ValueError(f"不支援的匯出格式：{fmt}")
+    filename, mime = EXPORT_FORMATS[fmt]
+
+    count = 0
+
+    def counted():
+        nonlocal count
+        for card in cards:
+            count += 1
+            yield card
+
+    out = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+    target = gzip.GzipFile(fileobj=out, mode="wb") if compress else out
+    for chunk in _WRITERS[fmt](counted()):
+        target.write(chunk.encode("utf-8"))
+    if compress:
+        target.close()
+        filename += ".gz"
+        mime = "application/gzip"
+    out.seek(0)
+    return out, filename, mime, count
@@ -0,0 +1,197 @@
+# services/field_normalizer.py
+
+import re
+
+# 全形 ASCII（！～）與全形空白轉半形；只處理這個範圍，中文字不受影響
+_FULLWIDTH = {0xFF01 + i: 0x21 + i for i in range(94)}
+_FULLWIDTH[0x3000] = 0x20
+_SPACES = re.compile(r"\s+")
+
+PHONE_FIELDS = ("phone", "mobile", "tel", "fax")
+EMAIL_FIELDS = ("email",)
+
+# --- 電話 ---
+_PHONE_LABEL = re.compile(r"^(?:tel|phone|mobile|mob|cell|fax|電話|手機|行動|傳真|[tmf])\s*[.:：]?\s*(?=[+(\doOlI|])", re.I)
+_PHONE_EXT = re.compile(r"\s*(?:#|ext\.?|x|分機|轉)\s*(\d{1,6})\s*$", re.I)
+# OCR 常把 0 看成 O / o、1 看成 l / I / |
+_PHONE_CONFUSABLE = str.maketrans("OolI|", "00111")
+_PHONE_CHARS = re.compile(r"^\+?[\d\s\-().]+$")
+_NON_DIGIT = re.compile(r"\D")
+
+# --- Email ---
+_EMAIL_LABEL = re.compile(r"^(?:e-?mail|信箱|電子郵件)\s*[:：]?\s*", re.I)
+_EMAIL_AT = re.compile(r"\(at\)|\[at\]")
+_EMAIL_DOTS = re.compile(r"[,。，]|\.{2,}")
+_EMAIL_RE = re.compile(r"^[a-z0-9._%+\-]+@[a-z0-9\-]+(?:\.[a-z0-9\-]+)*\.[a-z]{2,}$")
+# 網域中 OCR 把 o 看成 0、l 看成 1；頂層網域不會有數字，其他部分只在修正後是常見網域時才換
+_DOMAIN_CONFUSABLE = str.maketrans("01", "ol")
+KNOWN_DOMAINS = frozenset([
+    "gmail.com", "yahoo.com", "yahoo.com.tw", "hotmail.com", "outlook.com",
+    "icloud.com", "msa.hinet.net", "ms1.hinet.net", "seed.net.tw",
+])
+
+# --- 從 raw_text 萃取 ---
+_EMAIL_FIND = re.compile(r"[a-z0-9._%+\-]+\s*@\s*[a-z0-9\-]+(?:\.[a-z0-9\-]+)+", re.I)
+_PHONE_FIND = re.compile(
+    r"(?:\+?886[\s\-]?(?:\(0\))?[\s\-]?|(?<!\d)0)"
+    r"(?:9\d{2}[\s\-]?\d{3}[\s\-]?\d{3}|[2-8]\d?[\s\-)]{0,2}\d{3,4}[\s\-]?\d{4})"
+    r"(?:\s*(?:#|ext\.?|分機)\s*\d{1,6})?",
+    re.I,
+)
+_COMPANY_FIND = re.compile(r"[一-鿿\w（）()]{2,}(?:股份有限公司|有限公司|公司|企業社|事務所|集團)")
+# 英文公司名只取同一行、緊接在後綴前的 1～4 個字，避免把姓名、職稱一起吃進去
+_COMPANY_FIND_EN = re.compile(
+    r"(?<![\w&.\-])(?:[a-z0-9&][\w&.\-]*,?[ ]){1,4}"
+    r"(?:co\.?,?[ ]?ltd\.?|inc\.?|corp\.?|corporation|company)(?!\w)",
+    re.I,
+)
+_TITLE_FIND = re.compile(
+    r"[一-鿿]{0,4}(?:董事長|執行長|總經理|副總經理|副總|協理|經理|副理|襄理|主任|課長|組長|處長|"
+    r"總監|工程師|設計師|專員|顧問|業務)"
+    r"|\b(?:sales\s+)?(?:manager|director|engineer|president|consultant|ceo|cto|cfo)\b",
+    re.I,
+)
+_NAME_FIND = re.compile(r"(?<![一-鿿])[一-鿿]{2,4}(?![一-鿿])")
+
+
+def fold_width(text):
+    """全形英數 / 符號 / 空白轉半形，並合併多餘空白"""
+    text = str(text)
+    if not text.isascii():
+        text = text.translate(_FULLWIDTH)
+    return _SPACES.sub(" ", text).strip()
+
+
+def normalize_phone(value):
+    """台灣電話轉 E.164（+886...，分機以 # 接在後面），回傳 (值, 是否需要確認)
+
+    無法判斷區碼或長度不對時保留原字串並標記需要確認；修正過 O/0、l/1 的也要確認。
+    """
+    text = _PHONE_LABEL.sub("", value)
+    ext = ""
+    match = _PHONE_EXT.search(text)
+    if match:
+        ext = "#" + match.group(1)
+        text = text[:match.start()]
+    repaired = text.translate(_PHONE_CONFUSABLE)
+    guessed = repaired != text
+    if not _PHONE_CHARS.match(repaired):
+        return value, True
+
+    digits = _NON_DIGIT.sub("", repaired)
+    international = repaired.startswith("+") or digits.startswith("00")
+    if digits.startswith("00"):
+        digits = digits[2:]
+    if digits.startswith("886") and (international or len(digits) in (11, 12)):
+        national = digits[3:]
+        if national.startswith("0"):
+            national = national[1:]
+    elif international:
+        # 國外號碼只檢查 E.164 長度
+        if 8 <= len(digits) <= 15:
+            return "+" + digits + ext, guessed
+        return value, True
+    elif digits.startswith("0"):
+        national = digits[1:]
+    else:
+        # 沒有區碼，無法判斷
+        return value, True
+
+    if national.startswith("9"):
+        valid = len(national) == 9
+    else:
+        valid = national[:1] in "2345678" and len(national) in (8, 9)
+    if not valid:
+        return value, True
+    return "+886" + national + ext, guessed
+
+
+def _repair_domain(domain):
+    """修正網域中的 0/1：整個網域修正後是常見網域才換，否則只修正頂層網域"""
+    fixed = domain.translate(_DOMAIN_CONFUSABLE)
+    if fixed in KNOWN_DOMAINS:
+        return fixed
+    head, dot, tld = domain.rpartition(".")
+    return head + dot + tld.translate(_DOMAIN_CONFUSABLE)
+
+
+def normalize_email(value):
+    """小寫、去空白並修正常見的 OCR 錯誤，回傳 (值, 是否需要確認)
+
+    格式正確的地址（例如 abc@gmai1.com）也會檢查網域；有任何修正就標記需要確認。
+    """
+    cleaned = _EMAIL_LABEL.sub("", value.lower()).replace(" ", "")
+    text = _EMAIL_DOTS.sub(".", _EMAIL_AT.sub("@", cleaned)).strip(".")
+    if "@" not in text:
+        # 漏掉 @：結尾是常見網域時補上
+        for domain in KNOWN_DOMAINS:
+            if text.endswith("." + domain) and len(text) > len(domain) + 1:
+                text = text[:-len(domain) - 1] + "@" + domain
+                break
+    local, at, domain = text.rpartition("@")
+    if at:
+        text = f"{local}@{_repair_domain(domain)}"
+    if _EMAIL_RE.match(text):
+        return text, text != cleaned
+    return value, True
+
+
+def extract_fields(raw_text):
+    """fields 為空時從 raw_text 萃取；規則比較粗略，萃取出的欄位全部標記需要確認
+
+    逐行處理並保留換行，萃取過的片段以換行取代，後面的規則不會跨到別的欄位。
+    英文公司名在職稱之後才找，避免 "Sales Manager ACME Inc." 整段被當成公司。
+    """
+    text = "\n".join(fold_width(line) for line in raw_text.splitlines()) if raw_text else ""
+    fields = {}
+    if not text.strip():
+        return fields
+
+    for key, pattern in (("email", _EMAIL_FIND), ("phone", _PHONE_FIND), ("company_name", _COMPANY_FIND),
+                         ("title", _TITLE_FIND), ("company_name", _COMPANY_FIND_EN), ("name", _NAME_FIND)):
+        if key in fields:
+            continue
+        match = pattern.search(text)
+        if match:
+            fields[key] = match.group(0).strip()
+            text = text.replace(match.group(0), "\n")
+    return fields
+
+
+def normalize_record(record):
+    """就地正規化一筆 ocr_image() 格式的 dict：改寫 fields，並在 review 列出需要人工確認的欄位
+
+    可以重複呼叫：已正規化的值不會再改變，先前標記的 review 會保留。
+    """
+    fields = record.get("fields") or {}
+    review = set(record.get("review") or ())
+    if not any(str(v).strip() for v in fields.values() if v is not None):
+        fields = extract_fields(record.get("raw_text", ""))
+        review.update(fields)
+
+    out = {}
+    for key, value in fields.items():
+        if value is None or isinstance(value, (bool, int, float)):
+            out[key] = value
+            continue
+        value = fold_width(value)
+        if value and key in PHONE_FIELDS:
+            value, guessed = normalize_phone(value)
+        elif value and key in EMAIL_FIELDS:
+            value, guessed = normalize_email(value)
+        else:
+            guessed = False
+        if guessed:
+            review.add(key)
+        out[key] = value
+
+    record["fields"] = out
+    record["review"] = sorted(review & set(out))
+    return record
+
+
+def normalize_batch(records):
+    """就地正規化一批紀錄並回傳同一個 list（規則皆為預先編譯的 regex / translate 表）"""
+    for record in records:
+        normalize_record(record)
+    return records
@@ -0,0 +1,147 @@
+# services/image_dedup.py
+
+import io
+import threading
+
+from PIL import Image, ImageOps
+
+from core.config import DEDUP_ENABLED, DEDUP_MAX_DISTANCE, DEDUP_MAX_ENTRIES
+
+HASH_SIZE = 8
+
+
+def dhash(image_bytes, size=HASH_SIZE):
+    """difference hash：縮成 (size+1) x size 灰階後比較左右相鄰像素，回傳 size*size bits 的 int
+
+    同一張名片的拍照 / 掃描 / 重新壓縮版本距離通常在個位數；無法解碼時回傳 None。
+    """
+    try:
+        with Image.open(io.BytesIO(image_bytes)) as img:
+            # JPEG 直接以縮小比例解碼，不必先解出整張原圖
+            img.draft("L", ((size + 1) * 8, size * 8))
+            img = ImageOps.exif_transpose(img).convert("L").resize((size + 1, size), Image.LANCZOS)
+            pixels = list(img.getdata())
+    except Exception:
+        return None
+
+    bits = 0
+    for row in range(size):
+        offset = row * (size + 1)
+        for col in range(size):
+            bits = (bits << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return bits
+
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+
+class HashIndex:
+    """以漢明距離查詢 64-bit 雜湊的 multi-index hashing 索引
+
+    雜湊切成 8 個 byte，各建一張「byte 值 -> 項目」的表。距離 <= 7 的兩個雜湊至少有一個
+    byte 完全相同（鴿籠原理），查詢時只需比對這 8 個桶中的候選，不必掃過全部項目。
+    """
+
+    CHUNKS = 8
+
+    def __init__(self):
+        self._hashes = []
+        self._values = []
+        self._tables = [{} for _ in range(self.CHUNKS)]
+
+    def __len__(self):
+        return len(self._hashes)
+
+    def add(self, h, value):
+        idx = len(self._hashes)
+        self._hashes.append(h)
+        self._values.append(value)
+        for c, table in enumerate(self._tables):
+            table.setdefault((h >> (8 * c)) & 0xFF, []).append(idx)
+
+    def search(self, h, max_distance):
+        """回傳 [(距離, value)]，依距離排序"""
+        if max_distance >= self.CHUNKS:
+            candidates = range(len(self._hashes))
+        else:
+            candidates = set()
+            for c, table in enumerate(self._tables):
+                candidates.update(table.get((h >> (8 * c)) & 0xFF, ()))
+        found = []
+        for idx in candidates:
+            d = hamming(h, self._hashes[idx])
+            if d <= max_distance:
+                found.append((d, self._values[idx]))
+        found.sort(key=lambda item: item[0])
+        return found
+
+    def nearest(self, h, max_distance):
+        """距離 <= max_distance 中最近的 (距離, value)，沒有時回傳 None"""
+        found = self.search(h, max_distance)
+        return found[0] if found else None
+
+
+class DedupIndex:
+    """一組可以移除的圖片雜湊（跨批次比對用），最多保留 max_entries 筆
+
+    每筆以 key 登記（上傳帳本用圖片內容雜湊，已送出的名片用名片 id），
+    檔案從上傳框移除或名片被刪除時以 remove() 移除，之後同一張圖片可以再次辨識。
+    """
+
+    def __init__(self, max_entries=DEDUP_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = {}      # key -> (dHash, 檔名)，依加入順序
+        self._index = HashIndex()
+        self._lock = threading.Lock()
+
+    def _rebuild(self):
+        """索引不支援刪除：依 _entries 重建；呼叫端須持有 self._lock"""
+        self._index = HashIndex()
+        for h, name in self._entries.values():
+            self._index.add(h, name)
+
+    def add(self, h, name, key=None):
+        key = name if key is None else key
+        with self._lock:
+            replaced = self._entries.pop(key, None) is not None
+            self._entries[key] = (h, name)
+            if len(self._entries) > self.max_entries:
+                # 丟掉最舊的一半
+                for old in list(self._entries)[:len(self._entries) - self.max_entries // 2]:
+                    del self._entries[old]
+                self._rebuild()
+            elif replaced:
+                self._rebuild()
+            else:
+                self._index.add(h, name)
+
+    def remove(self, keys):
+        """移除指定 key 的項目，回傳 {key: (dHash, 檔名)}"""
+        with self._lock:
+            taken = {key: self._entries.pop(key) for key in keys if key in self._entries}
+            if taken:
+                self._rebuild()
+            return taken
+
+    def nearest(self, h, max_distance=DEDUP_MAX_DISTANCE):
+        with self._lock:
+            return self._index.nearest(h, max_distance)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_dedup_index(owner):
+    """取得使用者已送出名片的 DedupIndex（key 為名片 id）；停用時回傳 None"""
+    if not DEDUP_ENABLED:
+        return None
+    with _indexes_lock:
+        index = _indexes.get(owner)
+        if index is None:
+            index = _indexes[owner] = DedupIndex()
+        return index
@@ -0,0 +1,153 @@
+# services/image_preprocess.py
+
+import atexit
+import io
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from PIL import Image, ImageOps
+
+from core.config import (
+    PREPROCESS_ENABLED,
+    PREPROCESS_MAX_SIDE,
+    PREPROCESS_FORMAT,
+    PREPROCESS_QUALITY,
+    PREPROCESS_GRAYSCALE,
+    PREPROCESS_WORKERS,
+)
+
+logger = logging.getLogger(__name__)
+
+
+# 重新壓縮後的副檔名；上傳時檔名要與實際格式一致，後端才不會依副檔名誤判
+FORMAT_EXTENSIONS = {"JPEG": ".jpg", "PNG": ".png", "WEBP": ".webp"}
+
+
+def preprocess_image(image_bytes, max_side=PREPROCESS_MAX_SIDE, fmt=PREPROCESS_FORMAT,
+                     quality=PREPROCESS_QUALITY, grayscale=PREPROCESS_GRAYSCALE):
+    """EXIF 轉正、縮到最長邊 max_side、轉灰階後重新壓縮
+
+    結果沒有比原檔小、或無法解碼時，直接回傳原始 bytes。
+    """
+    try:
+        with Image.open(io.BytesIO(image_bytes)) as img:
+            img = ImageOps.exif_transpose(img)
+            if max(img.size) > max_side:
+                img.thumbnail((max_side, max_side), Image.LANCZOS)
+            if grayscale:
+                img = img.convert("L")
+            elif img.mode not in ("RGB", "L"):
+                img = img.convert("RGB")
+
+            out = io.BytesIO()
+            img.save(out, format=fmt, quality=quality, optimize=True)
+    except Exception:
+        return image_bytes
+
+    data = out.getvalue()
+    return data if len(data) < len(image_bytes) else image_bytes
+
+
+def preprocessed_name(filename, original, processed, fmt=PREPROCESS_FORMAT):
+    """前處理有重新壓縮時（結果一定比原檔小）把副檔名換成 fmt 的副檔名，例如 card.png -> card.jpg"""
+    if len(processed) >= len(original):
+        return filename
+    return os.path.splitext(filename)[0] + FORMAT_EXTENSIONS.get(fmt, "." + fmt.lower())
+
+
+def _preprocess_item(item):
+    filename, image_bytes, *rest = item
+    processed = preprocess_image(image_bytes)
+    return (preprocessed_name(filename, image_bytes, processed), processed, *rest)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    """整個 process 共用的前處理 process pool（spawn，避免 fork 有執行緒的 Streamlit server）"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ProcessPoolExecutor(
+                    max_workers=max(1, PREPROCESS_WORKERS),
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+                atexit.register(shutdown_pool)
+    return _pool
+
+
+def shutdown_pool():
+    """關閉共用的前處理 process pool（程式結束前呼叫，否則結束時會卡在等待 worker）"""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown()
+
+
+class PreprocessStats:
+    def __init__(self):
+        self.original_bytes = 0
+        self.processed_bytes = 0
+        self._lock = threading.Lock()
+
+    def add(self, original, processed):
+        with self._lock:
+            self.original_bytes += original
+            self.processed_bytes += processed
+
+    @property
+    def saved_bytes(self):
+        return self.original_bytes - self.processed_bytes
+
+    def summary(self):
+        if not self.original_bytes:
+            return "未進行影像前處理"
+        ratio = self.saved_bytes / self.original_bytes * 100
+        return (
+            f"上傳量 {self.original_bytes / 1024 / 1024:.1f}MB → "
+            f"{self.processed_bytes / 1024 / 1024:.1f}MB（節省 {ratio:.0f}%）"
+        )
+
+
+def preprocess_in_pool(image_bytes, stats=None):
+    """在共用 process pool 中前處理單張圖片（會阻塞呼叫端執行緒，適合在 OCR worker 中呼叫）"""
+    global _pool
+    if not PREPROCESS_ENABLED:
+        return image_bytes
+    try:
+        processed = _get_pool().submit(preprocess_image, image_bytes).result()
+    except (BrokenProcessPool, OSError) as e:
+        logger.warning("前處理 process pool 失敗，改為在本執行緒處理：%s", e)
+        _pool = None
+        processed = preprocess_image(image_bytes)
+    if stats is not None:
+        stats.add(len(image_bytes), len(processed))
+    return processed
+
+
+def preprocess_items(items, stats=None):
+    """以 process pool 前處理 (filename, image_bytes, ...) 清單，回傳新清單（重新壓縮的項目副檔名會換成實際格式）與 PreprocessStats"""
+    global _pool
+    stats = stats or PreprocessStats()
+    items = list(items)
+    if not PREPROCESS_ENABLED or not items:
+        return items, stats
+
+    try:
+        processed = list(_get_pool().map(_preprocess_item, items, chunksize=4))
+    except (BrokenProcessPool, OSError) as e:
+        logger.warning("前處理 process pool 失敗，改為單執行緒處理：%s", e)
+        _pool = None
+        processed = [_preprocess_item(item) for item in items]
+
+    for before, after in zip(items, processed):
+        stats.add(len(before[1]), len(after[1]))
+    return processed, stats
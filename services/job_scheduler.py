@@ -0,0 +1,216 @@
+# services/job_scheduler.py
+
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+
+from core.config import JOB_WORKERS, JOB_MAX_QUEUED_BYTES, JOB_MAX_USER_QUEUED_BYTES, JOB_RESULT_TTL
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+
+class SchedulerFull(Exception):
+    """排隊中的工作資料量已達上限"""
+
+
+class Job:
+    """背景工作：由 worker 執行 func(job)，回傳值存進 job.result 供 session 輪詢"""
+
+    def __init__(self, owner, kind, func, payload_bytes):
+        self.id = uuid.uuid4().hex
+        self.owner = owner
+        self.kind = kind
+        self.func = func
+        self.payload_bytes = payload_bytes
+        self.status = QUEUED
+        self.done = 0
+        self.total = 0
+        self.result = None
+        self.error = ""
+        self.created = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._cancel = threading.Event()
+
+    @property
+    def cancelled(self):
+        """工作函式應定期檢查，為 True 時儘快結束"""
+        return self._cancel.is_set()
+
+    @property
+    def finished(self):
+        return self.status in (DONE, FAILED, CANCELLED)
+
+    @property
+    def progress(self):
+        return min(self.done / self.total, 1.0) if self.total else 0.0
+
+    @property
+    def rate(self):
+        """開始執行後每秒完成的項目數"""
+        if self.started_at is None:
+            return 0.0
+        elapsed = (self.finished_at or time.time()) - self.started_at
+        return self.done / elapsed if elapsed > 0 else 0.0
+
+    def set_progress(self, done, total=None):
+        self.done = done
+        if total is not None:
+            self.total = total
+
+
+class JobScheduler:
+    """整個 process 共用的背景工作排程器
+
+    - 固定數量的 worker 執行緒，所有 session 共用
+    - 每個使用者一條佇列，worker 依序輪流取用（round-robin），大批次不會餓死其他人
+    - 排隊 + 執行中的工作資料量有全域與每位使用者上限
+    - 完成的工作保留 result_ttl 秒供 session 取回
+    """
+
+    def __init__(self, workers=JOB_WORKERS, max_queued_bytes=JOB_MAX_QUEUED_BYTES,
+                 max_user_bytes=JOB_MAX_USER_QUEUED_BYTES, result_ttl=JOB_RESULT_TTL):
+        self.workers = max(1, workers)
+        self.max_queued_bytes = max_queued_bytes
+        self.max_user_bytes = max_user_bytes
+        self.result_ttl = result_ttl
+        self._queues = OrderedDict()    # owner -> deque[Job]
+        self._jobs = {}                 # job id -> Job
+        self._bytes = 0
+        self._user_bytes = {}
+        self._running = 0
+        self._cond = threading.Condition()
+        self._threads = []
+
+    def _ensure_workers(self):
+        if self._threads:
+            return
+        for i in range(self.workers):
+            t = threading.Thread(target=self._worker, name=f"job-worker-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def submit(self, owner, func, kind="", payload_bytes=0):
+        with self._cond:
+            self._cleanup()
+            user_bytes = self._user_bytes.get(owner, 0)
+            if self._bytes + payload_bytes > self.max_queued_bytes:
+                raise SchedulerFull("系統忙碌中，排隊中的工作已達上限")
+            if user_bytes + payload_bytes > self.max_user_bytes:
+                raise SchedulerFull("你排隊中的工作已達上限，請等目前的工作完成")
+
+            job = Job(owner, kind, func, payload_bytes)
+            self._jobs[job.id] = job
+            self._queues.setdefault(owner, deque()).append(job)
+            self._bytes += payload_bytes
+            self._user_bytes[owner] = user_bytes + payload_bytes
+            self._ensure_workers()
+            self._cond.notify()
+            return job
+
+    def get(self, job_id):
+        with self._cond:
+            return self._jobs.get(job_id)
+
+    def jobs_for(self, owner):
+        with self._cond:
+            return [job for job in self._jobs.values() if job.owner == owner]
+
+    def cancel(self, job_id):
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None or job.finished:
+                return
+            job._cancel.set()
+            queue = self._queues.get(job.owner)
+            if job.status == QUEUED and queue is not None and job in queue:
+                queue.remove(job)
+                if not queue:
+                    del self._queues[job.owner]
+                self._finish(job, CANCELLED)
+
+    def discard(self, job_id):
+        """session 已取回結果後呼叫，不必等 result_ttl 就釋放結果的記憶體"""
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is not None and job.finished:
+                del self._jobs[job_id]
+
+    def stats(self):
+        with self._cond:
+            return {
+                "workers": self.workers,
+                "running": self._running,
+                "queued": sum(len(q) for q in self._queues.values()),
+                "queued_users": len(self._queues),
+                "payload_bytes": self._bytes,
+                "jobs": len(self._jobs),
+            }
+
+    def _finish(self, job, status):
+        """呼叫端須持有 self._cond"""
+        job.status = status
+        job.finished_at = time.time()
+        job.func = None
+        self._bytes -= job.payload_bytes
+        self._user_bytes[job.owner] = self._user_bytes.get(job.owner, 0) - job.payload_bytes
+        if self._user_bytes[job.owner] <= 0:
+            del self._user_bytes[job.owner]
+
+    def _cleanup(self):
+        """呼叫端須持有 self._cond"""
+        cutoff = time.time() - self.result_ttl
+        expired = [jid for jid, job in self._jobs.items() if job.finished and job.finished_at < cutoff]
+        for jid in expired:
+            del self._jobs[jid]
+
+    def _next_job(self):
+        """依使用者輪流取出下一個工作；呼叫端須持有 self._cond"""
+        owner, queue = next(iter(self._queues.items()))
+        job = queue.popleft()
+        if queue:
+            self._queues.move_to_end(owner)
+        else:
+            del self._queues[owner]
+        return job
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while not self._queues:
+                    self._cond.wait()
+                job = self._next_job()
+                job.status = RUNNING
+                job.started_at = time.time()
+                self._running += 1
+
+            status = DONE
+            try:
+                job.result = job.func(job)
+                if job.cancelled:
+                    status = CANCELLED
+            except Exception as e:
+                job.error = str(e)
+                status = FAILED
+
+            with self._cond:
+                self._running -= 1
+                self._finish(job, status)
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = JobScheduler()
+    return _scheduler
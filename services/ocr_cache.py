@@ -0,0 +1,141 @@
+# services/ocr_cache.py
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from core.config import OCR_CACHE_ENABLED, OCR_CACHE_PATH, OCR_CACHE_TTL, OCR_CACHE_MAX_BYTES
+
+logger = logging.getLogger(__name__)
+
+# 每寫入幾筆檢查一次容量，避免每次 put 都要 SUM 整張表
+EVICT_EVERY = 50
+
+
+class OcrCache:
+    """以圖片 SHA-256 為 key 的 /ocr/ 結果快取（SQLite）
+
+    - 每個執行緒各自持有連線；WAL 模式讓同一台機器上的多個 worker process 可同時讀寫
+    - 超過 ttl 的項目視為過期，總大小超過 max_bytes 時依最久未使用淘汰
+    """
+
+    def __init__(self, path=OCR_CACHE_PATH, ttl=OCR_CACHE_TTL, max_bytes=OCR_CACHE_MAX_BYTES):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._puts = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._connect().executescript("""
+            CREATE TABLE IF NOT EXISTS ocr_cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created REAL NOT NULL,
+                accessed REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_ocr_cache_accessed ON ocr_cache (accessed);
+        """)
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, key):
+        now = time.time()
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT value FROM ocr_cache WHERE key = ? AND created > ?",
+            (key, now - self.ttl)
+        ).fetchone()
+        if row is None:
+            self._count(False)
+            return None
+        conn.execute("UPDATE ocr_cache SET accessed = ? WHERE key = ?", (now, key))
+        self._count(True)
+        return json.loads(row[0])
+
+    def put(self, key, value):
+        now = time.time()
+        data = json.dumps(value, ensure_ascii=False)
+        self._connect().execute(
+            "INSERT OR REPLACE INTO ocr_cache (key, value, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+            (key, data, len(data.encode("utf-8")), now, now)
+        )
+        with self._lock:
+            self._puts += 1
+            check = self._puts % EVICT_EVERY == 1
+        if check:
+            self.evict()
+
+    def evict(self):
+        """刪除過期項目，並把總大小壓回 max_bytes 以內"""
+        conn = self._connect()
+        conn.execute("DELETE FROM ocr_cache WHERE created <= ?", (time.time() - self.ttl,))
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM ocr_cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        rows = conn.execute("SELECT key, size FROM ocr_cache ORDER BY accessed").fetchall()
+        victims = []
+        for key, size in rows:
+            if excess <= 0:
+                break
+            victims.append((key,))
+            excess -= size
+        conn.executemany("DELETE FROM ocr_cache WHERE key = ?", victims)
+
+    def stats(self):
+        entries, size = self._connect().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM ocr_cache"
+        ).fetchone()
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        total = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / total if total else 0.0,
+            "entries": entries,
+            "bytes": size,
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_ocr_cache():
+    """取得整個 process 共用的 OcrCache；停用或無法開啟時回傳 None"""
+    global _cache
+    if not OCR_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                try:
+                    _cache = OcrCache()
+                except (sqlite3.Error, OSError) as e:
+                    logger.warning("無法開啟 OCR 快取：%s", e)
+                    return None
+    return _cache
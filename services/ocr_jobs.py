@@ -0,0 +1,150 @@
+# services/ocr_jobs.py
+
+import io
+
+from core.config import DEDUP_MAX_DISTANCE, DEDUP_ACTION
+from services.field_normalizer import normalize_batch
+from services.image_dedup import dhash, HashIndex
+from services.image_preprocess import preprocess_in_pool, preprocessed_name, PreprocessStats
+from services.ocr_cache import get_ocr_cache
+from services.ocr_pipeline import ocr_image, run_ocr_batch
+from services.upload_ledger import content_hash
+from services.zip_stream import ZipStream, ZipRejected
+
+
+def make_ocr_upload_job(files, known_digests, token=None, dedup_indexes=(),
+                        max_distance=DEDUP_MAX_DISTANCE, action=DEDUP_ACTION):
+    """建立在背景 worker 執行的批次辨識工作
+
+    files 為 [(filename, bytes, source)]，source 是上傳檔的內容雜湊。工作不碰
+    st.session_state，辨識結果整批正規化欄位後以 dict 回傳，由 session 下次 rerun 時套用到上傳帳本：
+        outcomes:   [(digest, filename, source, result 或 None, 錯誤訊息 或 None)]
+                    result 與錯誤皆為 None 代表圖片已辨識過，只需登記來源
+        errors:     [(filename, 錯誤訊息)] 整個檔案無法處理（例如 ZIP 被拒）
+        duplicates: [(filename, 相似的檔名, 距離)] 與本批或先前辨識過的圖片近似重複
+        hashes:     {圖片雜湊: dHash} 辨識成功的圖片，由上傳帳本登記到 session 的比對索引
+        summary:    效能摘要字串
+
+    dedup_indexes（DedupIndex 的序列，例如 session 暫存中的圖片與已送出的名片）不為空時，
+    送出辨識前先以 dHash 比對；action 為 "skip" 時略過近似重複的圖片，"flag" 時照常辨識、
+    只列在 duplicates 中。工作只讀取這些索引，不會加入項目。
+    """
+    def work(job):
+        outcomes = []
+        errors = []
+        seen = set(known_digests)
+        names = {}
+        duplicates = []
+        hashes = {}             # 圖片雜湊 -> dHash
+        batch_tree = HashIndex()
+
+        # 先只讀 ZIP 目錄做安全檢查，計算待處理張數
+        plan = []
+        total = 0
+        for filename, data, source in files:
+            if filename.lower().endswith(".zip"):
+                try:
+                    archive = ZipStream(io.BytesIO(data))
+                except ZipRejected as e:
+                    errors.append((filename, str(e)))
+                    continue
+                plan.append((filename, source, archive))
+                total += len(archive)
+            else:
+                plan.append((filename, source, [(filename, data)]))
+                total += 1
+        job.set_progress(0, total)
+
+        def generate_items():
+            seq = 0
+            for filename, source, members in plan:
+                try:
+                    for name, img_bytes in members:
+                        if job.cancelled:
+                            return
+                        seq += 1
+                        digest = content_hash(img_bytes)
+                        if digest in seen:
+                            outcomes.append((seq, (digest, name, source, None, None)))
+                            continue
+                        seen.add(digest)
+                        if dedup_indexes and is_near_duplicate(seq, name, digest, img_bytes):
+                            continue
+                        names[digest] = (seq, name, source)
+                        yield name, img_bytes, digest
+                except ZipRejected as e:
+                    errors.append((filename, str(e)))
+                finally:
+                    if isinstance(members, ZipStream):
+                        members.close()
+
+        def is_near_duplicate(seq, name, digest, img_bytes):
+            h = dhash(img_bytes)
+            if h is None:
+                return False
+            matches = [m for m in [batch_tree.nearest(h, max_distance)]
+                       + [index.nearest(h, max_distance) for index in dedup_indexes] if m]
+            if matches:
+                distance, other = min(matches)
+                duplicates.append((seq, (name, other, distance)))
+                if action == "skip":
+                    return True
+            batch_tree.add(h, name)
+            hashes[digest] = h
+            return False
+
+        prep_stats = PreprocessStats()
+
+        def preprocess(filename, image_bytes):
+            processed = preprocess_in_pool(image_bytes, prep_stats)
+            return preprocessed_name(filename, image_bytes, processed), processed
+
+        def ocr_preprocessed(filename, image_bytes, token):
+            # 先以原始內容查 OCR 快取，命中時不必再前處理
+            return ocr_image(filename, image_bytes, token, prepare=preprocess)
+
+        def on_result(digest, result, error):
+            seq, name, source = names[digest]
+            outcomes.append((seq, (digest, name, source, result, error)))
+            if error is not None:
+                hashes.pop(digest, None)
+
+        def on_progress(done, report):
+            job.set_progress(len(outcomes))
+
+        report = run_ocr_batch(
+            generate_items(),
+            token=token,
+            on_progress=on_progress,
+            on_result=on_result,
+            func=ocr_preprocessed
+        )
+
+        # 電話 / Email / 全形字元整批正規化，需要人工確認的欄位記在 result["review"]
+        normalized = normalize_batch([o[3] for _, o in outcomes if o[3] is not None])
+        needs_review = sum(1 for result in normalized if result["review"])
+
+        summary = report.summary()
+        cache = get_ocr_cache()
+        if cache is not None:
+            cache_stats = cache.stats()
+            summary += f"，快取命中 {cache_stats['hits']} / {cache_stats['hits'] + cache_stats['misses']}"
+        summary += f"；{prep_stats.summary()}"
+        if duplicates:
+            verb = "略過" if action == "skip" else "發現"
+            summary += f"；{verb} {len(duplicates)} 張疑似重複"
+        if needs_review:
+            summary += f"；{needs_review} 張有待確認的欄位"
+        job.set_progress(total)
+        # 依上傳順序排回，session 套用後 extracted_results 才會與上傳順序一致
+        outcomes.sort(key=lambda item: item[0])
+        duplicates.sort(key=lambda item: item[0])
+        return {
+            "outcomes": [outcome for _, outcome in outcomes],
+            "errors": errors,
+            "duplicates": [dup for _, dup in duplicates],
+            "hashes": hashes,
+            "summary": summary,
+        }
+
+    return work
@@ -0,0 +1,177 @@
+# services/ocr_pipeline.py
+
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from api.client import get_client
+from api.limiter import get_limiter, BackendUnavailable
+from core.config import OCR_CONCURRENCY, OCR_MAX_INFLIGHT_BYTES, OCR_POOL_SIZE, API_CONNECT_TIMEOUT, OCR_TIMEOUT
+from core.stats import percentile
+from services.ocr_cache import get_ocr_cache
+
+logger = logging.getLogger(__name__)
+
+
+class OcrError(Exception):
+    """單一檔案辨識失敗（後端回傳非 200 或連線錯誤）"""
+
+
+def ocr_image(filename, image_bytes, token=None, prepare=None):
+    """呼叫後端 /ocr/ 辨識單張名片，回傳 {filename, raw_text, fields}
+
+    prepare(filename, image_bytes) -> (upload_name, upload_bytes) 只在快取沒有命中、要呼叫後端前才執行
+    （例如影像前處理）；回傳的 filename 仍是原檔名。快取一律以原始圖片內容的雜湊為 key，
+    重複上傳的圖片不必再前處理，前處理設定改變也不會讓快取失效。
+
+    不會碰 st.session_state / st.* 元件，可安全地在背景執行緒中呼叫。
+    相同內容的圖片會直接從 OCR 快取取得結果，不再呼叫後端。
+    呼叫後端時受 /ocr/ 的自適應併發上限與斷路器管制，後端過載時會快速失敗而不是卡住。
+    """
+    cache = get_ocr_cache()
+    digest = hashlib.sha256(image_bytes).hexdigest()
+    if cache is not None:
+        try:
+            cached = cache.get(digest)
+        except sqlite3.Error as e:
+            logger.warning("讀取 OCR 快取失敗：%s", e)
+            cached = None
+        if cached is not None:
+            return {"filename": filename, **cached}
+
+    upload_name, upload_bytes = prepare(filename, image_bytes) if prepare else (filename, image_bytes)
+    files = {"file": (upload_name, upload_bytes)}
+    try:
+        res = get_limiter("/ocr/").call(lambda: get_client().post(
+            "/ocr/", files=files, token=token, timeout=(API_CONNECT_TIMEOUT, OCR_TIMEOUT)
+        ))
+    except BackendUnavailable as e:
+        raise OcrError(str(e)) from e
+    except Exception as e:
+        raise OcrError(f"錯誤訊息：{e}") from e
+
+    if res.status_code != 200:
+        raise OcrError(f"狀態碼 {res.status_code}")
+
+    data = res.json()
+    value = {
+        "raw_text": data.get("text", ""),
+        "fields": data.get("fields", {})
+    }
+    if cache is not None:
+        try:
+            cache.put(digest, value)
+        except sqlite3.Error as e:
+            logger.warning("寫入 OCR 快取失敗：%s", e)
+    return {"filename": filename, **value}
+
+
+class BatchReport:
+    """一次批次辨識的結果與效能統計"""
+
+    def __init__(self):
+        self.results = []       # 依上傳順序排列的成功結果
+        self.errors = []        # [(filename, 錯誤訊息)]
+        self.latencies = []     # 每個檔案的往返秒數
+        self.elapsed = 0.0
+
+    @property
+    def total(self):
+        return len(self.results) + len(self.errors)
+
+    @property
+    def files_per_sec(self):
+        return self.total / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def p50(self):
+        return percentile(self.latencies, 50)
+
+    @property
+    def p95(self):
+        return percentile(self.latencies, 95)
+
+    def summary(self):
+        return (
+            f"共 {self.total} 張（成功 {len(self.results)}、失敗 {len(self.errors)}），"
+            f"耗時 {self.elapsed:.1f}s，{self.files_per_sec:.2f} 張/秒，"
+            f"p50 {self.p50 * 1000:.0f}ms / p95 {self.p95 * 1000:.0f}ms"
+        )
+
+
+_ocr_pool = None
+_ocr_pool_lock = threading.Lock()
+
+
+def _get_ocr_pool():
+    """整個 process 共用的 OCR 執行緒池，多個 session 同時上傳也不會無限開執行緒"""
+    global _ocr_pool
+    if _ocr_pool is None:
+        with _ocr_pool_lock:
+            if _ocr_pool is None:
+                _ocr_pool = ThreadPoolExecutor(max_workers=max(1, OCR_POOL_SIZE), thread_name_prefix="ocr")
+    return _ocr_pool
+
+
+def _timed(func, filename, image_bytes, token):
+    start = time.perf_counter()
+    try:
+        return func(filename, image_bytes, token), None, time.perf_counter() - start
+    except Exception as e:
+        return None, str(e), time.perf_counter() - start
+
+
+def run_ocr_batch(items, token=None, concurrency=OCR_CONCURRENCY, on_progress=None,
+                  on_result=None, func=ocr_image, max_inflight_bytes=OCR_MAX_INFLIGHT_BYTES):
+    """以有上限的併發數辨識多張圖片（所有批次共用同一個執行緒池）
+
+    items 為 (filename, image_bytes) 或 (filename, image_bytes, key) 的 iterable，
+    會邊讀邊送出：同時在途的檔案不超過 concurrency 個，在途圖片總位元組超過
+    max_inflight_bytes 時會先等待完成再讀取下一張。單一檔案失敗不會中斷整批。
+    on_result(key, result, error) 與 on_progress(done, report) 都會在呼叫端的執行緒中
+    被呼叫，因此可以直接更新 Streamlit 元件或 session_state。
+    """
+    report = BatchReport()
+    slots = {}                  # 序號 -> 結果，最後依序號排回上傳順序
+    pending = {}
+    inflight = [0]              # 在途圖片位元組
+    start = time.perf_counter()
+    concurrency = max(1, int(concurrency))
+
+    def _collect(done_futures):
+        for fut in done_futures:
+            seq, filename, key, size = pending.pop(fut)
+            inflight[0] -= size
+            result, error, latency = fut.result()
+            report.latencies.append(latency)
+            if error is None:
+                if key is not None:
+                    result["hash"] = key
+                slots[seq] = result
+            else:
+                report.errors.append((filename, error))
+            if on_result:
+                on_result(key, result, error)
+            if on_progress:
+                report.elapsed = time.perf_counter() - start
+                on_progress(len(report.latencies), report)
+
+    pool = _get_ocr_pool()
+    for seq, (filename, image_bytes, *rest) in enumerate(items):
+        while pending and (len(pending) >= concurrency or inflight[0] >= max_inflight_bytes):
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            _collect(done)
+        fut = pool.submit(_timed, func, filename, image_bytes, token)
+        pending[fut] = (seq, filename, rest[0] if rest else None, len(image_bytes))
+        inflight[0] += len(image_bytes)
+        del image_bytes
+    while pending:
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        _collect(done)
+
+    report.results = [slots[seq] for seq in sorted(slots)]
+    report.elapsed = time.perf_counter() - start
+    return report
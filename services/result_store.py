@@ -0,0 +1,245 @@
+# services/result_store.py
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+import weakref
+
+import streamlit as st
+
+from core.config import RESULT_STORE_SESSION_BYTES, RESULT_STORE_GLOBAL_BYTES, RESULT_STORE_SPILL_DIR
+from models.ocr_result import OcrResult
+
+logger = logging.getLogger(__name__)
+
+SESSION_KEY = "extracted_results"
+
+# 所有 session 的 ResultStore；session 結束被回收時自動移除
+_stores = weakref.WeakValueDictionary()
+_stores_lock = threading.Lock()
+
+
+def _drop_spill(disk):
+    """關閉並刪除溢出檔；由 close() 或 store 被回收時的 weakref.finalize 呼叫"""
+    conn, path = disk["conn"], disk["path"]
+    disk.update(conn=None, path=None)
+    if conn is not None:
+        conn.close()
+    if path and os.path.exists(path):
+        try:
+            os.remove(path)
+        except OSError as e:
+            logger.warning("刪除暫存檔失敗：%s", e)
+
+
+class ResultStore:
+    """單一 session 的暫存辨識結果（尚未送出到資料庫的名片）
+
+    以 list 的方式使用（append / pop / 迭代 / 索引），紀錄為 OcrResult。記憶體中的紀錄超過
+    session_bytes，或所有 session 合計超過 global_bytes 時，最早的紀錄會移到暫存目錄的
+    SQLite 檔，讀取時再載入。登出時呼叫 close()；session 過期被回收時同樣會刪除暫存檔。
+    """
+
+    def __init__(self, owner="", session_bytes=RESULT_STORE_SESSION_BYTES,
+                 global_bytes=RESULT_STORE_GLOBAL_BYTES, spill_dir=RESULT_STORE_SPILL_DIR):
+        self.id = uuid.uuid4().hex
+        self.owner = owner
+        self.session_bytes = session_bytes
+        self.global_bytes = global_bytes
+        self.spill_dir = spill_dir
+        self.touched = time.time()
+        self._order = []            # 紀錄序號，依加入順序
+        self._memory = {}           # 序號 -> OcrResult
+        self._spilled = {}          # 序號 -> 估算的 bytes（內容在 SQLite）
+        self._hashes = {}           # 序號 -> 圖片雜湊（常駐記憶體，移除檔案時不必讀磁碟）
+        self._memory_bytes = 0
+        self._seq = 0
+        self._lock = threading.RLock()
+        self._disk = {"conn": None, "path": None}
+        weakref.finalize(self, _drop_spill, self._disk)
+        with _stores_lock:
+            _stores[self.id] = self
+
+    # --- 溢出到磁碟 ---
+    def _conn(self):
+        conn = self._disk["conn"]
+        if conn is None:
+            os.makedirs(self.spill_dir, exist_ok=True)
+            path = os.path.join(self.spill_dir, f"card_results_{self.id}.sqlite3")
+            conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=OFF")
+            conn.execute("PRAGMA synchronous=OFF")
+            conn.execute("CREATE TABLE IF NOT EXISTS results (seq INTEGER PRIMARY KEY, data TEXT NOT NULL)")
+            self._disk.update(conn=conn, path=path)
+        return conn
+
+    def spill(self, target_bytes):
+        """把最早的紀錄移到磁碟，直到記憶體用量不超過 target_bytes；回傳釋放的 bytes"""
+        freed = 0
+        with self._lock:
+            victims = []
+            for seq in self._order:
+                if self._memory_bytes - freed <= target_bytes:
+                    break
+                record = self._memory.get(seq)
+                if record is not None:
+                    victims.append((seq, record))
+                    freed += record.nbytes
+            if not victims:
+                return 0
+            self._conn().executemany(
+                "INSERT OR REPLACE INTO results (seq, data) VALUES (?, ?)",
+                [(seq, record.dumps()) for seq, record in victims]
+            )
+            for seq, record in victims:
+                del self._memory[seq]
+                self._spilled[seq] = record.nbytes
+            self._memory_bytes -= freed
+        return freed
+
+    def _get(self, seq):
+        """呼叫端須持有 self._lock"""
+        record = self._memory.get(seq)
+        if record is None:
+            row = self._conn().execute("SELECT data FROM results WHERE seq = ?", (seq,)).fetchone()
+            record = OcrResult.loads(row[0])
+        return record
+
+    def _delete(self, seqs):
+        for seq in seqs:
+            record = self._memory.pop(seq, None)
+            if record is not None:
+                self._memory_bytes -= record.nbytes
+            elif self._spilled.pop(seq, None) is not None:
+                self._conn().execute("DELETE FROM results WHERE seq = ?", (seq,))
+            self._hashes.pop(seq, None)
+        removed = set(seqs)
+        self._order = [seq for seq in self._order if seq not in removed]
+
+    # --- list 介面 ---
+    def append(self, result):
+        """加入一筆 ocr_image() 回傳的 dict（或 OcrResult）"""
+        record = result if isinstance(result, OcrResult) else OcrResult.from_dict(result)
+        with self._lock:
+            self._seq += 1
+            self._order.append(self._seq)
+            self._memory[self._seq] = record
+            self._hashes[self._seq] = record.hash
+            self._memory_bytes += record.nbytes
+            self.touched = time.time()
+            if self._memory_bytes > self.session_bytes:
+                self.spill(self.session_bytes)
+        _enforce_global_budget(self.global_bytes)
+
+    def __len__(self):
+        return len(self._order)
+
+    def __bool__(self):
+        return bool(self._order)
+
+    def __iter__(self):
+        with self._lock:
+            order = list(self._order)
+        for seq in order:
+            with self._lock:
+                if seq not in self._hashes:
+                    continue    # 迭代期間已被移除
+                record = self._get(seq)
+            yield record
+
+    def __getitem__(self, index):
+        with self._lock:
+            return self._get(self._order[index])
+
+    def pop(self, index=-1):
+        with self._lock:
+            record = self[index]
+            self._delete([self._order[index]])
+            return record
+
+    def keep(self, indexes):
+        """只保留指定位置的紀錄（例如送出失敗的那幾筆）"""
+        with self._lock:
+            wanted = {self._order[i] for i in indexes}
+            self._delete([seq for seq in self._order if seq not in wanted])
+
+    def remove_hashes(self, hashes):
+        """移除指定圖片雜湊的紀錄（檔案從上傳框移除時）"""
+        if not hashes:
+            return
+        with self._lock:
+            self._delete([seq for seq in self._order if self._hashes.get(seq) in hashes])
+
+    def to_dicts(self):
+        return [record.to_dict() for record in self]
+
+    def clear(self):
+        with self._lock:
+            self._order = []
+            self._memory = {}
+            self._spilled = {}
+            self._hashes = {}
+            self._memory_bytes = 0
+            _drop_spill(self._disk)
+
+    def close(self):
+        self.clear()
+        with _stores_lock:
+            _stores.pop(self.id, None)
+
+    def usage(self):
+        with self._lock:
+            return {
+                "owner": self.owner,
+                "records": len(self._order),
+                "memory_bytes": self._memory_bytes,
+                "spilled_records": len(self._spilled),
+                "spilled_bytes": sum(self._spilled.values()),
+                "idle_sec": round(time.time() - self.touched, 1),
+            }
+
+
+def _enforce_global_budget(global_bytes):
+    """所有 session 合計超過 global_bytes 時，從記憶體用量最大的 store 開始移到磁碟"""
+    with _stores_lock:
+        stores = list(_stores.values())
+    total = sum(s._memory_bytes for s in stores)
+    for store in sorted(stores, key=lambda s: s._memory_bytes, reverse=True):
+        if total <= global_bytes:
+            break
+        total -= store.spill(max(0, store._memory_bytes - (total - global_bytes)))
+
+
+def get_result_store():
+    """取得目前 session 的 ResultStore（存在 st.session_state["extracted_results"]）"""
+    store = st.session_state.get(SESSION_KEY)
+    if not isinstance(store, ResultStore):
+        store = ResultStore(owner=st.session_state.get("username", ""))
+        st.session_state[SESSION_KEY] = store
+    store.touched = time.time()
+    return store
+
+
+def close_result_store():
+    """登出時呼叫：釋放記憶體並刪除暫存檔"""
+    store = st.session_state.get(SESSION_KEY)
+    if isinstance(store, ResultStore):
+        store.close()
+
+
+def store_usage():
+    """各 session 的暫存用量與合計，供效能監控頁面與 benchmark 讀取"""
+    with _stores_lock:
+        stores = list(_stores.values())
+    sessions = [s.usage() for s in stores]
+    return {
+        "sessions": sessions,
+        "memory_bytes": sum(s["memory_bytes"] for s in sessions),
+        "spilled_bytes": sum(s["spilled_bytes"] for s in sessions),
+        "records": sum(s["records"] for s in sessions),
+        "session_budget": RESULT_STORE_SESSION_BYTES,
+        "global_budget": RESULT_STORE_GLOBAL_BYTES,
+    }
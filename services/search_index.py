@@ -0,0 +1,314 @@
+# services/search_index.py
+
+import heapq
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from operator import itemgetter
+
+_t2s = None
+_t2s_loaded = False
+
+# 欄位權重：名字、公司命中排在前面
+FIELD_WEIGHTS = {
+    "name": 5,
+    "company_name": 4,
+    "title": 2,
+    "phone": 3,
+    "email": 3,
+    "raw_text": 1,
+}
+QUERY_CACHE_SIZE = 256
+# 每個欄位一個 bit；posting 記錄 token 出現在哪些欄位，完全命中的查詢詞可直接查表計分
+FIELD_BITS = {field: 1 << i for i, field in enumerate(FIELD_WEIGHTS)}
+MASK_FIELDS = [[(f, w) for f, w in FIELD_WEIGHTS.items() if mask & FIELD_BITS[f]]
+               for mask in range(1 << len(FIELD_WEIGHTS))]
+MASK_SCORES = [sum(w for _, w in fields) for fields in MASK_FIELDS]
+ALL_FIELDS = (1 << len(FIELD_WEIGHTS)) - 1
+
+_CJK_RE = re.compile(r"[㐀-鿿豈-﫿]+")
+_WORD_RE = re.compile(r"[0-9a-z@._+\-]+")
+_PHONE_RE = re.compile(r"[0-9+\-() ]+")
+# 查詢中以空白分段的電話（"+886 912 345 678"、"(02) 2345 6789"），先合併成一個數字串再切詞
+_PHONE_SPAN_RE = re.compile(r"\+?\(?\d[\d\-() ]*\d")
+PHONE_SPAN_DIGITS = 7
+
+
+def _get_t2s():
+    """第一次用到時才載入 opencc 字典，避免拖慢頁面冷啟動"""
+    global _t2s, _t2s_loaded
+    if not _t2s_loaded:
+        try:
+            from opencc import OpenCC
+            _t2s = OpenCC("t2s")
+        except Exception:  # opencc 未安裝或設定檔缺失時，只做全形 / 大小寫正規化
+            _t2s = None
+        _t2s_loaded = True
+    return _t2s
+
+
+def normalize_text(text):
+    """全形轉半形、小寫、繁體轉簡體"""
+    if not text:
+        return ""
+    text = unicodedata.normalize("NFKC", str(text)).lower()
+    t2s = _get_t2s()
+    if t2s is not None:
+        text = t2s.convert(text)
+    return text
+
+
+def normalize_phone(phone):
+    """只保留數字，+886 開頭轉回國內格式（0 開頭）"""
+    digits = re.sub(r"\D", "", unicodedata.normalize("NFKC", str(phone or "")))
+    if digits.startswith("886"):
+        digits = "0" + digits[3:]
+    return digits
+
+
+def normalize_email(email):
+    return unicodedata.normalize("NFKC", str(email or "")).strip().lower()
+
+
+def join_phone_spans(text):
+    """把查詢中含空白、至少 PHONE_SPAN_DIGITS 位數字的電話片段換成 normalize_phone 後的數字"""
+    def repl(match):
+        span = match.group(0)
+        digits = normalize_phone(span)
+        if " " not in span or len(digits) < PHONE_SPAN_DIGITS:
+            return span
+        return digits
+
+    return _PHONE_SPAN_RE.sub(repl, text)
+
+
+def _ngrams(text, n):
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+def tokenize(text):
+    """索引用 token：中文字 unigram + bigram，英數字串整段 + trigram"""
+    tokens = set()
+    for run in _CJK_RE.findall(text):
+        tokens.update(run)
+        tokens.update(_ngrams(run, 2))
+    for word in _WORD_RE.findall(text):
+        tokens.add(word)
+        tokens.update(_ngrams(word, 3))
+    return tokens
+
+
+def query_tokens(text):
+    """查詢用 token：盡量用長 n-gram 以縮小候選集合"""
+    tokens = set()
+    for run in _CJK_RE.findall(text):
+        tokens.update(_ngrams(run, 2) if len(run) >= 2 else {run})
+    for word in _WORD_RE.findall(text):
+        tokens.update(_ngrams(word, 3) if len(word) >= 3 else {word})
+    return tokens
+
+
+class CardSearchIndex:
+    """名片的記憶體內倒排索引，支援增量新增 / 刪除"""
+
+    def __init__(self):
+        self.cards = {}         # card id -> 原始名片 dict
+        self.fields = {}        # card id -> {欄位: 正規化後文字}
+        self.postings = {}      # token -> {card id: 欄位 bit mask}
+        self._cache = OrderedDict()
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def _card_fields(card):
+        fields = {}
+        for key in FIELD_WEIGHTS:
+            value = card.get(key)
+            if not value:
+                continue
+            if key == "phone":
+                fields[key] = normalize_phone(value)
+            elif key == "email":
+                fields[key] = normalize_email(value)
+            else:
+                fields[key] = normalize_text(value)
+        return fields
+
+    def add(self, card):
+        card_id = card.get("id")
+        if card_id is None:
+            return
+        with self._lock:
+            if card_id in self.cards:
+                self._remove(card_id)
+            fields = self._card_fields(card)
+            self.cards[card_id] = card
+            self.fields[card_id] = fields
+            for key, text in fields.items():
+                bit = FIELD_BITS[key]
+                for token in tokenize(text):
+                    ids = self.postings.setdefault(token, {})
+                    ids[card_id] = ids.get(card_id, 0) | bit
+            self._cache.clear()
+
+    def add_many(self, cards):
+        for card in cards:
+            self.add(card)
+
+    def remove(self, card_id):
+        with self._lock:
+            if card_id in self.cards:
+                self._remove(card_id)
+                self._cache.clear()
+
+    def _remove(self, card_id):
+        for text in self.fields.pop(card_id).values():
+            for token in tokenize(text):
+                ids = self.postings.get(token)
+                if ids is not None:
+                    ids.pop(card_id, None)
+                    if not ids:
+                        del self.postings[token]
+        del self.cards[card_id]
+
+    def __len__(self):
+        return len(self.cards)
+
+    def search(self, query, limit=200):
+        """回傳符合的名片 list（依欄位權重排序，最多 limit 筆）"""
+        return self.search_page(query, 0, limit)["items"]
+
+    def search_page(self, query, offset=0, limit=200):
+        """回傳一頁結果，格式與 fetch_card_page 相同：{"items", "total", "has_more"}
+
+        total 是全部符合的筆數，不受 limit 限制；只有前 offset + limit 筆需要排序。
+        """
+        text = join_phone_spans(normalize_text(query)).strip()
+        if not text:
+            return {"items": [], "total": 0, "has_more": False}
+        with self._lock:
+            key = (text, offset + limit)
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                ids, total = self._cache[key]
+            else:
+                ids, total = self._search_ids(text, offset + limit)
+                self._cache[key] = (ids, total)
+                if len(self._cache) > QUERY_CACHE_SIZE:
+                    self._cache.popitem(last=False)
+            items = [self.cards[i] for i in ids[offset:offset + limit]]
+        return {"items": items, "total": total, "has_more": offset + len(items) < total}
+
+    def _search_ids(self, text, limit):
+        """回傳 (依分數排序的前 limit 個 id, 符合的總筆數)"""
+        # 每個查詢詞：(token 集合, 用來確認的字串, 是否為電話)
+        terms = []
+        for term in text.split():
+            digits = normalize_phone(term)
+            if _PHONE_RE.fullmatch(term) and len(digits) >= 3:
+                terms.append((query_tokens(digits), digits, True))
+            else:
+                terms.append((query_tokens(term), term, False))
+
+        # 候選為所有 token posting 的交集；每個查詢詞的欄位 mask 取最短的 posting
+        # （查詢詞出現的欄位一定包含它的每個 n-gram，所以任一 token 的 mask 都涵蓋這些欄位）
+        term_masks = []
+        candidates = None
+        for tokens, _, _ in terms:
+            if not tokens:
+                term_masks.append(None)
+                continue
+            postings = sorted((self.postings.get(t, {}) for t in tokens), key=len)
+            matched = postings[0].keys()
+            for ids in postings[1:]:
+                matched = matched & ids.keys()
+                if not matched:
+                    break
+            term_masks.append(postings[0])
+            candidates = matched if candidates is None else candidates & matched
+            if not candidates:
+                return [], 0
+        if candidates is None:
+            return [], 0
+
+        # mask 中的欄位可能是誤判，要以子字串確認；但查詢詞本身是 n-gram（兩個字以內的中文、
+        # 三個字元的英數）時 mask 就是正確答案（whole 為 None），查詢詞是索引中完整的英數字串時，
+        # 該 token 的 mask 一定命中（whole），只需確認其餘欄位。
+        # 少於三個字元的英數 token 是整個字而不是 n-gram，mask 不涵蓋子字串命中的欄位，改為檢查全部欄位
+        plans = []
+        for (tokens, needle, is_phone), masks in zip(terms, term_masks):
+            if masks is not None:
+                exact = tokens == {needle} and (len(needle) == 3 or _CJK_RE.fullmatch(needle))
+                whole = None if exact else self.postings.get(needle, {})
+                if any(len(t) < 3 and not _CJK_RE.fullmatch(t) for t in tokens):
+                    masks = dict.fromkeys(candidates, ALL_FIELDS)
+                plans.append((masks, needle, FIELD_BITS["phone"] if is_phone else ALL_FIELDS, whole))
+        if len(plans) == 1 and plans[0][3] is None:
+            # 單一且完全命中的查詢詞（最常見的寬鬆查詢，例如「經理」）：直接查表計分
+            masks, _, allowed, _ = plans[0]
+            scored = [(-MASK_SCORES[m & allowed], i) for i, m in masks.items() if m & allowed]
+            return self._top(scored, limit)
+
+        scored = []
+        for card_id in candidates:
+            fields = None
+            score = 0
+            for masks, needle, allowed, whole in plans:
+                mask = masks[card_id] & allowed
+                known = mask if whole is None else whole.get(card_id, 0) & mask
+                term_score = MASK_SCORES[known]
+                for f, w in MASK_FIELDS[mask & ~known]:
+                    fields = fields or self.fields[card_id]
+                    if needle in fields[f]:
+                        term_score += w
+                if not term_score:
+                    break
+                score += term_score
+            else:
+                scored.append((-score, card_id))
+        return self._top(scored, limit)
+
+    @staticmethod
+    def _top(scored, limit):
+        """scored 為 [(-分數, card id)]，回傳 (前 limit 個 id, 總筆數)；只比較分數，id 型別不必可比較"""
+        top = heapq.nsmallest(limit, scored, key=itemgetter(0))
+        return [card_id for _, card_id in top], len(scored)
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_search_index(scope):
+    """取得某個快取範圍（使用者或管理員租戶）的索引；尚未建立時回傳 None"""
+    with _indexes_lock:
+        return _indexes.get(scope)
+
+
+def build_search_index(scope, cards):
+    index = CardSearchIndex()
+    index.add_many(cards)
+    with _indexes_lock:
+        _indexes[scope] = index
+    return index
+
+
+def index_card_added(card, scopes):
+    for scope in scopes:
+        index = get_search_index(scope)
+        if index is not None:
+            index.add(card)
+
+
+def index_card_removed(card_id, scopes=None):
+    with _indexes_lock:
+        indexes = list(_indexes.values()) if scopes is None else [_indexes[s] for s in scopes if s in _indexes]
+    for index in indexes:
+        index.remove(card_id)
+
+
+def drop_search_index(scopes):
+    """無法增量更新時（例如後端沒回傳新名片的 id）丟掉索引，下次查詢時重建"""
+    with _indexes_lock:
+        for scope in scopes:
+            _indexes.pop(scope, None)
@@ -0,0 +1,273 @@
+# services/transcription.py
+
+import hashlib
+import io
+import logging
+import threading
+import time
+import wave
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from api.client import get_client
+from api.limiter import get_limiter, BackendUnavailable
+from services.job_scheduler import get_scheduler, SchedulerFull
+from core.config import (
+    WHISPER_SEGMENT_CONCURRENCY,
+    WHISPER_RESAMPLE,
+    WHISPER_MIN_SEGMENT_SEC,
+    WHISPER_MAX_SEGMENT_SEC,
+    WHISPER_SEGMENT_FORMAT,
+    WHISPER_SEGMENT_BITRATE,
+    WHISPER_CACHE_SIZE,
+    WHISPER_TIMEOUT,
+    API_CONNECT_TIMEOUT,
+)
+
+try:
+    import audioop
+except ImportError:  # Python 3.13 起移除；沒有時不做降取樣與切段
+    audioop = None
+
+try:
+    from pydub import AudioSegment
+except ImportError:  # 選用：有 pydub + ffmpeg 時 mp3 / m4a 也能切段
+    AudioSegment = None
+
+logger = logging.getLogger(__name__)
+
+TARGET_RATE = 16000
+FRAME_MS = 30
+# 低於整段最大音量的這個比例視為靜音
+SILENCE_RATIO = 0.05
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class TranscriptionError(Exception):
+    """/whisper 回傳失敗"""
+
+
+def audio_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def _decode_to_pcm(filename, data):
+    """回傳 (pcm bytes, sample width, channels, rate)；無法解碼時回傳 None"""
+    if filename.lower().endswith(".wav"):
+        try:
+            with wave.open(io.BytesIO(data), "rb") as w:
+                return w.readframes(w.getnframes()), w.getsampwidth(), w.getnchannels(), w.getframerate()
+        except (wave.Error, EOFError):
+            return None
+    if AudioSegment is not None:
+        try:
+            seg = AudioSegment.from_file(io.BytesIO(data))
+        except Exception:
+            return None
+        return seg.raw_data, seg.sample_width, seg.channels, seg.frame_rate
+    return None
+
+
+def _to_mono_16k(pcm, width, channels, rate):
+    if channels == 2:
+        pcm = audioop.tomono(pcm, width, 0.5, 0.5)
+    elif channels > 2:
+        return pcm, width, channels, rate
+    if width != 2:
+        pcm = audioop.lin2lin(pcm, width, 2)
+        width = 2
+    if rate != TARGET_RATE:
+        pcm, _ = audioop.ratecv(pcm, width, 1, rate, TARGET_RATE, None)
+        rate = TARGET_RATE
+    return pcm, width, 1, rate
+
+
+def _encode_wav(pcm, width, channels, rate):
+    out = io.BytesIO()
+    with wave.open(out, "wb") as w:
+        w.setnchannels(channels)
+        w.setsampwidth(width)
+        w.setframerate(rate)
+        w.writeframes(pcm)
+    return out.getvalue()
+
+
+def _encode_compressed(pcm, width, channels, rate, fmt=WHISPER_SEGMENT_FORMAT, bitrate=WHISPER_SEGMENT_BITRATE):
+    """以 pydub（ffmpeg）把一段 PCM 壓縮成 fmt"""
+    out = io.BytesIO()
+    AudioSegment(data=pcm, sample_width=width, frame_rate=rate, channels=channels).export(
+        out, format=fmt, bitrate=bitrate
+    )
+    return out.getvalue()
+
+
+def split_on_silence(pcm, width, channels, rate,
+                     min_sec=WHISPER_MIN_SEGMENT_SEC, max_sec=WHISPER_MAX_SEGMENT_SEC):
+    """把 PCM 切成數段：長度超過 min_sec 後遇到靜音就切，最長不超過 max_sec
+
+    達到 max_sec 仍沒有靜音時，在最近 10 秒內音量最低的位置切開。
+    """
+    frame_bytes = int(rate * FRAME_MS / 1000) * width * channels
+    if not frame_bytes or len(pcm) <= frame_bytes:
+        return [pcm]
+    levels = [audioop.rms(pcm[i:i + frame_bytes], width) for i in range(0, len(pcm), frame_bytes)]
+    threshold = max(levels) * SILENCE_RATIO
+    min_frames = int(min_sec * 1000 / FRAME_MS)
+    max_frames = int(max_sec * 1000 / FRAME_MS)
+    window = int(10 * 1000 / FRAME_MS)
+
+    cuts = []
+    start = 0
+    i = 0
+    while i < len(levels):
+        length = i - start
+        if length >= min_frames and levels[i] <= threshold:
+            cuts.append(i)
+            start = i
+        elif length >= max_frames:
+            lo = max(start + 1, i - window)
+            cut = min(range(lo, i + 1), key=lambda k: levels[k])
+            cuts.append(cut)
+            start = cut
+        i += 1
+
+    segments = []
+    prev = 0
+    for cut in cuts + [len(levels)]:
+        chunk = pcm[prev * frame_bytes:cut * frame_bytes]
+        if chunk:
+            segments.append(chunk)
+        prev = cut
+    return segments
+
+
+def prepare_segments(filename, data, resample=WHISPER_RESAMPLE):
+    """回傳要上傳的 [(filename, bytes)]；無法解碼時原檔整段上傳
+
+    WAV 切段後仍以 WAV 上傳；mp3 / m4a 等壓縮格式解碼後的 PCM 比原檔大好幾倍，
+    只有一段時直接上傳原檔，多段時每段以 WHISPER_SEGMENT_FORMAT 重新壓縮。
+    """
+    if audioop is None:
+        return [(filename, data)]
+    decoded = _decode_to_pcm(filename, data)
+    if decoded is None:
+        return [(filename, data)]
+    pcm, width, channels, rate = decoded
+    if resample:
+        pcm, width, channels, rate = _to_mono_16k(pcm, width, channels, rate)
+
+    segments = split_on_silence(pcm, width, channels, rate)
+    base = filename.rsplit(".", 1)[0]
+    if filename.lower().endswith(".wav"):
+        return [
+            (f"{base}_{i:03d}.wav", _encode_wav(seg, width, channels, rate))
+            for i, seg in enumerate(segments)
+        ]
+
+    if len(segments) <= 1:
+        return [(filename, data)]
+    try:
+        return [
+            (f"{base}_{i:03d}.{WHISPER_SEGMENT_FORMAT}", _encode_compressed(seg, width, channels, rate))
+            for i, seg in enumerate(segments)
+        ]
+    except Exception as e:
+        logger.warning("音檔分段壓縮失敗，改為整段上傳：%s", e)
+        return [(filename, data)]
+
+
+def transcribe_bytes(filename, data, token=None):
+    """上傳一段音檔到 /whisper；受自適應併發上限與斷路器管制，後端過載時快速失敗"""
+    try:
+        res = get_limiter("/whisper").call(lambda: get_client().post(
+            "/whisper", files={"file": (filename, data)}, token=token,
+            timeout=(API_CONNECT_TIMEOUT, WHISPER_TIMEOUT)
+        ))
+    except BackendUnavailable as e:
+        raise TranscriptionError(str(e)) from e
+    if res.status_code != 200:
+        raise TranscriptionError(f"狀態碼 {res.status_code}")
+    return res.json().get("text", "")
+
+
+class TranscriptionJob:
+    def __init__(self, key, filename):
+        self.key = key
+        self.filename = filename
+        self.status = PENDING
+        self.total = 0
+        self.done = 0
+        self.text = ""
+        self.error = ""
+        self.started = time.time()
+
+    @property
+    def finished(self):
+        return self.status in (DONE, FAILED)
+
+    @property
+    def progress(self):
+        return self.done / self.total if self.total else 0.0
+
+
+_segment_executor = ThreadPoolExecutor(max_workers=max(1, WHISPER_SEGMENT_CONCURRENCY),
+                                       thread_name_prefix="whisper-seg")
+_jobs = OrderedDict()           # 音檔雜湊 -> TranscriptionJob（完成的結果即為快取）
+_jobs_lock = threading.Lock()
+
+
+def _run_job(job, data, token, scheduled=None):
+    job.status = RUNNING
+    try:
+        segments = prepare_segments(job.filename, data)
+        job.total = len(segments)
+        futures = [_segment_executor.submit(transcribe_bytes, name, seg, token) for name, seg in segments]
+        texts = []
+        for fut in futures:
+            if scheduled is not None and scheduled.cancelled:
+                raise TranscriptionError("已取消")
+            texts.append(fut.result().strip())
+            job.done += 1
+            if scheduled is not None:
+                scheduled.set_progress(job.done, job.total)
+        job.text = "\n".join(t for t in texts if t)
+        job.status = DONE
+    except Exception as e:
+        job.error = str(e)
+        job.status = FAILED
+
+
+def start_transcription(filename, data, token=None, owner="", retry=False):
+    """以音檔內容雜湊啟動（或取回）背景轉錄工作，立即回傳 TranscriptionJob
+
+    工作交給共用的 JobScheduler 依使用者輪流執行。同一段音檔已完成或進行中時不會
+    重複呼叫 /whisper；失敗的工作只有 retry=True 才重新開始。
+    """
+    key = audio_hash(data)
+    with _jobs_lock:
+        job = _jobs.get(key)
+        if job is not None and (job.status != FAILED or not retry):
+            _jobs.move_to_end(key)
+            return job
+        job = TranscriptionJob(key, filename)
+        _jobs[key] = job
+        while len(_jobs) > WHISPER_CACHE_SIZE:
+            oldest_key, oldest = next(iter(_jobs.items()))
+            if not oldest.finished:
+                break
+            del _jobs[oldest_key]
+    try:
+        get_scheduler().submit(
+            owner,
+            lambda scheduled: _run_job(job, data, token, scheduled),
+            kind="whisper",
+            payload_bytes=len(data)
+        )
+    except SchedulerFull as e:
+        job.error = str(e)
+        job.status = FAILED
+    return job
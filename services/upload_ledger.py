@@ -0,0 +1,175 @@
+# services/upload_ledger.py
+
+import hashlib
+
+import streamlit as st
+
+from services.image_dedup import DedupIndex
+
+PENDING = "pending"
+DONE = "done"
+FAILED = "failed"
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+class UploadLedger:
+    """每個 session 一份的上傳帳本，以檔案內容雜湊記錄辨識狀態
+
+    Streamlit 每次互動都會 rerun 整個 script；帳本讓已辨識（或辨識中）的圖片不會
+    再被送去 /ocr/，並在使用者從上傳框移除檔案時一併移除其辨識結果。
+
+    換頁後再回來時 Streamlit 會清空上傳框，這不代表使用者移除了檔案：只有上傳框的
+    on_change（使用者實際增刪檔案）才會透過 uploader_changed 移除結果。
+    """
+
+    def __init__(self):
+        self.entries = {}       # 圖片雜湊 -> {filename, sources, status, run, result, published}
+        self.order = []         # 圖片雜湊，依上傳順序
+        self.file_keys = {}     # 上傳元件的 file_id -> 上傳檔案雜湊
+        self.expanded = set()   # 已展開（ZIP 已逐一登記）的上傳檔案雜湊
+        self.shown = set()      # 上一次 rerun 上傳框中顯示的上傳檔案雜湊
+        self.cancelled = set()  # 使用者取消辨識的上傳檔案雜湊，按「重新辨識」前不會自動重送
+        self.dedup = DedupIndex()   # 暫存中（尚未送出）圖片的 dHash，key 為圖片雜湊
+        self.run = 0
+
+    def begin_run(self):
+        """每次 rerun 開始時呼叫；上一輪遺留的 pending 項目代表被中斷，可重新認領"""
+        self.run += 1
+
+    def source_key(self, file):
+        """上傳檔案本身的內容雜湊，同一個 file_id 只計算一次"""
+        file_id = getattr(file, "file_id", None) or f"{file.name}:{file.size}"
+        if file_id not in self.file_keys:
+            self.file_keys[file_id] = content_hash(file.getvalue())
+        return self.file_keys[file_id]
+
+    def is_expanded(self, source):
+        return source in self.expanded
+
+    def mark_expanded(self, source):
+        self.expanded.add(source)
+
+    def cancel_sources(self, sources):
+        """使用者取消辨識：清除已展開標記，之後可以用 retry_sources 重新送出"""
+        sources = set(sources)
+        self.expanded -= sources
+        self.cancelled |= sources
+
+    def retry_sources(self, sources):
+        """重新辨識先前取消或辨識失敗的檔案（下一次 rerun 會當作新檔案送出）"""
+        sources = set(sources)
+        self.cancelled -= sources
+        self.expanded -= sources
+
+    def failed_sources(self):
+        """含有辨識失敗圖片的上傳檔案雜湊"""
+        sources = set()
+        for entry in self.entries.values():
+            if entry["status"] == FAILED:
+                sources |= entry["sources"]
+        return sources
+
+    def claim(self, digest, filename, source):
+        """登記一張圖片；回傳 True 代表需要送出辨識（辨識失敗過的圖片可以再次認領）"""
+        entry = self.entries.get(digest)
+        if entry is None:
+            self.entries[digest] = {
+                "filename": filename,
+                "sources": {source},
+                "status": PENDING,
+                "run": self.run,
+                "result": None,
+                "published": False,
+            }
+            self.order.append(digest)
+            return True
+
+        entry["sources"].add(source)
+        if entry["status"] == FAILED or (entry["status"] == PENDING and entry["run"] != self.run):
+            entry["status"] = PENDING
+            entry["run"] = self.run
+            entry.pop("error", None)
+            return True
+        return False
+
+    def done_digests(self):
+        """已辨識完成的圖片雜湊（交給背景工作略過這些圖片）"""
+        return frozenset(d for d, e in self.entries.items() if e["status"] == DONE)
+
+    def complete(self, digest, result, image_hash=None):
+        entry = self.entries.get(digest)
+        if entry is not None:
+            entry["status"] = DONE
+            entry["result"] = result
+            if image_hash is not None:
+                self.dedup.add(image_hash, entry["filename"], digest)
+
+    def fail(self, digest, error):
+        entry = self.entries.get(digest)
+        if entry is not None:
+            entry["status"] = FAILED
+            entry["result"] = None
+            entry["error"] = error
+
+    def publish(self, results):
+        """把已完成但尚未顯示的結果依上傳順序加入 results（ResultStore）
+
+        加入後帳本不再保留結果本身，記憶體只算在 ResultStore 的預算內。
+        """
+        for digest in self.order:
+            entry = self.entries[digest]
+            if entry["status"] == DONE and not entry["published"]:
+                results.append(entry["result"])
+                entry["result"] = None
+                entry["published"] = True
+
+    def uploader_changed(self, current_sources, results):
+        """上傳框 on_change 時呼叫：移除上一次顯示、這次已不在上傳框中的檔案"""
+        current_sources = set(current_sources)
+        removed_sources = self.shown - current_sources
+        self.shown = current_sources
+        return self.remove_sources(removed_sources, results)
+
+    def remove_sources(self, removed_sources, results):
+        """移除上傳檔案及只屬於這些檔案的辨識結果（從 ResultStore 中移除），回傳被移除的圖片雜湊"""
+        removed_sources = set(removed_sources)
+        removed = set()
+        if not removed_sources:
+            return removed
+        for digest in self.order:
+            entry = self.entries[digest]
+            entry["sources"] -= removed_sources
+            if not entry["sources"]:
+                removed.add(digest)
+
+        if removed:
+            for digest in removed:
+                del self.entries[digest]
+            self.order = [d for d in self.order if d not in removed]
+            results.remove_hashes(removed)
+            self.dedup.remove(removed)
+
+        self.expanded -= removed_sources
+        self.cancelled -= removed_sources
+        self.file_keys = {k: v for k, v in self.file_keys.items() if v not in removed_sources}
+        return removed
+
+    def forget(self, digests):
+        """送出成功後呼叫：移除這些圖片的紀錄，回傳其 dHash {圖片雜湊: (dHash, 檔名)}
+
+        之後由已送出名片的索引負責比對；名片被刪除後，同一張圖片可以再次上傳辨識。
+        """
+        digests = set(digests) & set(self.entries)
+        for digest in digests:
+            del self.entries[digest]
+        self.order = [d for d in self.order if d not in digests]
+        return self.dedup.remove(digests)
+
+
+def get_ledger():
+    if "upload_ledger" not in st.session_state:
+        st.session_state["upload_ledger"] = UploadLedger()
+    return st.session_state["upload_ledger"]
@@ -0,0 +1,103 @@
+# services/user_service.py
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from api.client import get_client
+from core.config import USER_UPDATE_CONCURRENCY
+from services.db_reads import get_db_reader
+
+logger = logging.getLogger(__name__)
+
+EDITABLE_COLUMNS = ["是否為管理員", "使用者狀況", "備註"]
+
+
+class UserApiError(Exception):
+    """取得使用者清單失敗"""
+
+
+def users_scope(username, company_name=""):
+    """使用者清單的快取範圍：依登入帳號與租戶區分，不同管理員不會共用"""
+    return f"users:{company_name}:{username}"
+
+
+def invalidate_users():
+    """使用者資料異動後呼叫，清除所有帳號的使用者清單快取"""
+    get_client().cache.invalidate(prefix="users:")
+
+
+def list_users(scope, token=None, path="/users", company=None):
+    """使用者清單：呼叫後端 path（ETag 快取，依 scope 區分）
+
+    company 只有管理員才應傳入：有設定 DB_URL 時直接查資料庫中該公司的使用者。
+    其他呼叫端（例如修改密碼頁）一律走後端，由後端以 token 檢查權限。
+    """
+    reader = get_db_reader() if company else None
+    if reader is not None:
+        try:
+            return reader.users(company)
+        except Exception as e:
+            logger.warning("資料庫讀取失敗，改用後端 API：%s", e)
+
+    status, data = get_client().get_json(path, scope, token=token)
+    if status != 200:
+        raise UserApiError(f"狀態碼 {status}")
+    return data
+
+
+def diff_users(original_df, edited_df):
+    """以 ID merge 比對原始與編輯後的表格，回傳有變更的列（欄位為編輯後的值）
+
+    依 ID 對齊而非列位置，AgGrid 排序或篩選後也不會更新到錯的使用者。
+    """
+    import pandas as pd  # 修改密碼頁也會用到本模組，pandas 只在比對時載入
+    cols = ["ID"] + EDITABLE_COLUMNS
+    old = original_df[cols].copy()
+    new = edited_df[cols].copy()
+    for df in (old, new):
+        df["ID"] = pd.to_numeric(df["ID"]).astype("int64")
+        df["備註"] = df["備註"].fillna("").astype(str)
+        df["是否為管理員"] = df["是否為管理員"].astype(bool)
+
+    merged = new.merge(old, on="ID", how="inner", suffixes=("", "_old"))
+    changed = pd.Series(False, index=merged.index)
+    for col in EDITABLE_COLUMNS:
+        changed |= merged[col] != merged[f"{col}_old"]
+    return merged.loc[changed, cols]
+
+
+def build_update_payloads(changed_df):
+    """變更列 -> [(user_id, payload)]"""
+    return [
+        (int(user_id), {
+            "note": note,
+            "is_admin": bool(is_admin),
+            "is_active": status == "啟用"
+        })
+        for user_id, is_admin, status, note in changed_df[["ID"] + EDITABLE_COLUMNS].itertuples(index=False)
+    ]
+
+
+def _update_one(user_id, data, token):
+    try:
+        res = get_client().put(f"/update_user/{user_id}", json=data, token=token)
+    except requests.RequestException as e:
+        return user_id, False, str(e)
+    if res.status_code == 200:
+        return user_id, True, ""
+    return user_id, False, res.text
+
+
+def update_users(updates, token=None, concurrency=USER_UPDATE_CONCURRENCY):
+    """併發送出多筆 PUT /update_user/{id}，依輸入順序回傳 [(user_id, ok, 錯誤訊息)]"""
+    if not updates:
+        return []
+    with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(updates))),
+                            thread_name_prefix="user-update") as pool:
+        futures = [pool.submit(_update_one, user_id, data, token) for user_id, data in updates]
+        results = [fut.result() for fut in futures]
+    if any(ok for _, ok, _ in results):
+        invalidate_users()
+    return results
@@ -0,0 +1,92 @@
+# services/zip_stream.py
+
+import zipfile
+
+from core.config import ZIP_MAX_MEMBERS, ZIP_MAX_RATIO, ZIP_MAX_MEMBER_BYTES, ZIP_MAX_TOTAL_BYTES
+
+IMAGE_EXTS = (".jpg", ".jpeg", ".png")
+NESTED_ARCHIVE_EXTS = (".zip", ".rar", ".7z", ".tar", ".gz", ".tgz", ".bz2", ".xz")
+
+
+class ZipRejected(Exception):
+    """ZIP 不符合安全限制（疑似 zip bomb、檔案過多、巢狀壓縮檔或格式錯誤）"""
+
+
+def _is_hidden(name):
+    parts = name.replace("\\", "/").split("/")
+    return any(p == "__MACOSX" or p.startswith(".") for p in parts if p)
+
+
+class ZipStream:
+    """逐一解壓縮 ZIP 內圖片的 iterator，不會一次把所有成員讀進記憶體
+
+    建立時只讀取中央目錄並檢查限制；迭代時才依序解壓縮每張圖片。
+    """
+
+    def __init__(self, fileobj, max_members=ZIP_MAX_MEMBERS, max_ratio=ZIP_MAX_RATIO,
+                 max_member_bytes=ZIP_MAX_MEMBER_BYTES, max_total_bytes=ZIP_MAX_TOTAL_BYTES):
+        self.max_member_bytes = max_member_bytes
+        if hasattr(fileobj, "seek"):
+            fileobj.seek(0)
+        try:
+            self.zf = zipfile.ZipFile(fileobj, "r")
+        except zipfile.BadZipFile as e:
+            raise ZipRejected(f"不是有效的 ZIP 檔：{e}") from e
+
+        try:
+            self.infos = self._scan(max_members, max_ratio, max_total_bytes)
+        except ZipRejected:
+            self.zf.close()
+            raise
+
+    def _scan(self, max_members, max_ratio, max_total_bytes):
+        infolist = self.zf.infolist()
+        if len(infolist) > max_members:
+            raise ZipRejected(f"檔案數量 {len(infolist)} 超過上限 {max_members}")
+
+        infos = []
+        total = 0
+        for info in infolist:
+            name = info.filename
+            if info.is_dir() or _is_hidden(name):
+                continue
+            lower = name.lower()
+            if lower.endswith(NESTED_ARCHIVE_EXTS):
+                raise ZipRejected(f"不支援巢狀壓縮檔：{name}")
+            if not lower.endswith(IMAGE_EXTS):
+                continue
+            if info.file_size > self.max_member_bytes:
+                raise ZipRejected(f"{name} 解壓縮後超過 {self.max_member_bytes // 1024 // 1024}MB")
+            if info.compress_size and info.file_size / info.compress_size > max_ratio:
+                raise ZipRejected(f"{name} 壓縮比異常，疑似 zip bomb")
+            total += info.file_size
+            if total > max_total_bytes:
+                raise ZipRejected(f"解壓縮總量超過 {max_total_bytes // 1024 // 1024}MB")
+            infos.append(info)
+        return infos
+
+    def __len__(self):
+        return len(self.infos)
+
+    def __iter__(self):
+        for info in self.infos:
+            yield info.filename, self._read(info)
+
+    def _read(self, info):
+        try:
+            with self.zf.open(info) as f:
+                data = f.read(self.max_member_bytes + 1)
+        except (zipfile.BadZipFile, zipfile.LargeZipFile, RuntimeError, EOFError) as e:
+            raise ZipRejected(f"{info.filename} 解壓縮失敗：{e}") from e
+        if len(data) > self.max_member_bytes:
+            raise ZipRejected(f"{info.filename} 解壓縮後超過上限")
+        return data
+
+    def close(self):
+        self.zf.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()